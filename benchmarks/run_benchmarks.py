@@ -0,0 +1,329 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Бенчмарки Scanner: пропускная способность (символов в секунду), пиковая память и
+время по этапам -- нормализация, извлечение первых букв, поиск по словарю, отбор
+кандидатов (соседи) и построение таблицы результатов. Этапы запускаются так же,
+как их вызывает Scanner.scan_text, только каждый отдельно и с замером времени.
+
+Входные данные -- романы из data/texts (каждый файл сканируется отдельно, как в
+BatchScanner) и синтетические тексты растущего размера из слов этих романов.
+Словари по умолчанию -- wordforms_20k.txt и test_dict.txt. wordforms_20k.txt лежит
+в data/dicts в двойной кодировке (UTF-8, прочитанный как cp1251 и снова записанный
+в UTF-8), и в таком виде в нём нет ни одного русского слова; бенчмарк перекодирует
+такие словари обратно при загрузке (см. load_words), чтобы поиск шёл по настоящим
+словоформам.
+Результаты сохраняются в JSON, который можно сравнить с прошлым прогоном:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --compare benchmarks/results/<прошлый>.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+ROOT = Path(__file__).parent.parent
+
+# Поднимаем путь, чтобы импортировать Scanner из src
+sys.path.append(str(ROOT / "src"))
+
+from acrofinder.matcher import MATCHERS
+from acrofinder.normalizer import OffsetMap
+from acrofinder.scanner import Scanner
+from acrofinder.tokenizer import LEVELS
+
+
+TEXTS_DIR = ROOT / "data" / "texts"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# этапы в порядке выполнения
+STAGES = ['normalization', 'extraction', 'matching', 'candidates', 'dataframe']
+
+# размеры синтетических текстов (символов): полный прогон и --quick
+SYNTHETIC_SIZES = [100_000, 1_000_000, 4_000_000]
+QUICK_SYNTHETIC_SIZES = [100_000, 1_000_000]
+
+# по этим полям сопоставляются случаи двух прогонов
+CASE_KEY = ['input', 'dictionary', 'level', 'filter_by_neighbours', 'min_word_size']
+
+
+def synthetic_text(size: int, words: List[str], seed: int = 0) -> str:
+    """
+    Текст из случайных слов словаря: предложения по 5-15 слов, абзацы по 3-8
+    предложений. При одинаковых seed и словаре текст всегда один и тот же
+
+    Аргументы:
+        size (int): примерная длина текста в символах (текст обрезается по ней)
+        words [str, ...]: слова
+        seed (int): зерно генератора
+
+    Возвращает:
+        str: текст
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    length = 0
+    while length < size:
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(5, 15)))
+            sentences.append(sentence.capitalize() + rng.choice(".!?"))
+        paragraphs.append(" ".join(sentences))
+        length += len(paragraphs[-1]) + 1
+    return "\n".join(paragraphs)[:size]
+
+
+def load_inputs(sizes: List[int], with_texts: bool) -> Dict[str, List[str]]:
+    """
+    Входные данные: имя -> тексты (каждый сканируется отдельно). Слова синтетических
+    текстов выбираются из всех слов романов подряд, с повторами, так что частоты слов
+    и первых букв -- как у настоящего русского текста
+    """
+    paths = sorted(TEXTS_DIR.glob("*.txt"))
+    if not paths:
+        raise FileNotFoundError(f"Тексты не найдены: {TEXTS_DIR}")
+    texts = [path.read_text(encoding='utf-8') for path in paths]
+    words = [word for text in texts for word in re.findall(r'[а-яё]+', text.lower())]
+
+    inputs = {}
+    if with_texts:
+        inputs["data/texts"] = texts
+    for size in sizes:
+        inputs[f"synthetic_{size}"] = [synthetic_text(size, words)]
+    return inputs
+
+
+def run_stages(scanner: Scanner, text: str, level: str, filter_by_neighbours: bool,
+               min_neighbour_len: int, timings: Dict[str, float]) -> int:
+    """
+    Сканирует текст на одном уровне по этапам (как scan_text с with_context=True),
+    прибавляя время каждого этапа к timings. Возвращает число кандидатов
+    """
+    clock = time.perf_counter
+
+    start = clock()
+    offsets = OffsetMap()
+    normalized = scanner.normalizer.normalize(text, offsets)
+    timings['normalization'] += clock() - start
+
+    start = clock()
+    first_letters, starts = scanner.tokenizer.tokenize(normalized, [level])[level]
+    timings['extraction'] += clock() - start
+
+    start = clock()
+    letters = first_letters if scanner.folding is None else scanner.folding.fold_letters(first_letters)
+    matches = list(scanner.matcher.find_all(letters))
+    timings['matching'] += clock() - start
+
+    start = clock()
+    ids, sizes, neighbours = scanner._get_candidates(first_letters, filter_by_neighbours,
+                                                     min_neighbour_len, matches=matches)
+    timings['candidates'] += clock() - start
+
+    start = clock()
+    columns = scanner.result_columns()
+    data = {column: [] for column in columns}
+    scanner._extend_columns(data, normalized, level, first_letters, starts,
+                            ids, sizes, neighbours, offsets=offsets)
+    results = pd.DataFrame(data, columns=columns)
+    timings['dataframe'] += clock() - start
+
+    return len(results)
+
+
+def run_case(scanner: Scanner, texts: List[str], level: str, filter_by_neighbours: bool,
+             min_neighbour_len: int, repeat: int) -> dict:
+    """
+    Один случай: первый проход -- под tracemalloc (пиковая память и разогрев),
+    затем repeat проходов с замером времени; по каждому этапу берётся лучшее время
+    """
+    tracemalloc.start()
+    peak = 0
+    candidates = 0
+    for text in texts:
+        tracemalloc.reset_peak()
+        candidates += run_stages(scanner, text, level, filter_by_neighbours,
+                                 min_neighbour_len, dict.fromkeys(STAGES, 0.0))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    best = dict.fromkeys(STAGES, float('inf'))
+    for _ in range(repeat):
+        timings = dict.fromkeys(STAGES, 0.0)
+        for text in texts:
+            run_stages(scanner, text, level, filter_by_neighbours, min_neighbour_len, timings)
+        best = {stage: min(best[stage], timings[stage]) for stage in STAGES}
+
+    total = sum(best.values())
+    chars = sum(map(len, texts))
+    return {
+        "chars": chars,
+        "candidates": candidates,
+        "seconds": {stage: round(best[stage], 6) for stage in STAGES},
+        "total_seconds": round(total, 6),
+        "chars_per_sec": round(chars / total) if total else None,
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def load_words(dictionary: str) -> List[str]:
+    """
+    Слова словаря из data/dicts; словарь в двойной кодировке (как wordforms_20k.txt)
+    перекодируется обратно, остальные возвращаются как есть
+    """
+    words = (ROOT / "data" / "dicts" / dictionary).read_text(encoding="utf-8").splitlines()
+    try:
+        return [word.encode("cp1251").decode("utf-8") for word in words]
+    except UnicodeError:
+        return words
+
+
+def iter_cases(args) -> Iterator[Tuple[str, str, bool, int]]:
+    for dictionary in args.dicts:
+        for min_word_size in args.minlens:
+            for level in args.levels:
+                for filter_by_neighbours in (False, True):
+                    yield dictionary, level, filter_by_neighbours, min_word_size
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> int:
+    """
+    Печатает для общих случаев двух прогонов изменение пропускной способности и
+    времени этапов; возвращает число случаев, ставших медленнее больше чем на tolerance
+    """
+    def key(case):
+        return tuple(case[field] for field in CASE_KEY)
+
+    old_cases = {key(case): case for case in baseline["cases"]}
+    rows = []
+    for case in current["cases"]:
+        old = old_cases.get(key(case))
+        if old is None or not old["chars_per_sec"] or not case["chars_per_sec"]:
+            continue
+        change = case["chars_per_sec"] / old["chars_per_sec"] - 1
+        row = {field: case[field] for field in CASE_KEY}
+        row["chars_per_sec"] = case["chars_per_sec"]
+        row["was"] = old["chars_per_sec"]
+        row["change"] = f"{change:+.1%}"
+        for stage in STAGES:
+            row[stage] = f"{case['seconds'][stage] - old['seconds'][stage]:+.3f}s"
+        row["regression"] = "!" if change < -tolerance else ""
+        rows.append(row)
+
+    if not rows:
+        print("Общих случаев с прошлым прогоном нет")
+        return 0
+    table = pd.DataFrame(rows)
+    print(f"\nСравнение с прогоном {baseline['meta']['created']} ({baseline['meta'].get('commit')}):")
+    print(table.to_string(index=False))
+    regressions = int((table.regression == "!").sum())
+    if regressions:
+        print(f"\nМедленнее больше чем на {tolerance:.0%}: {regressions} из {len(table)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Бенчмарки Scanner: скорость, память и время по этапам"
+    )
+    parser.add_argument("--dicts", nargs="+", default=["wordforms_20k.txt", "test_dict.txt"],
+                        help="Словари из data/dicts (по умолчанию wordforms_20k.txt и test_dict.txt; "
+                             "словари в двойной кодировке перекодируются при загрузке)")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=list(LEVELS),
+                        help="Уровни поиска (по умолчанию все)")
+    parser.add_argument("--minlens", nargs="+", type=int, default=[3, 5, 7],
+                        help="Значения min_word_size (по умолчанию 3 5 7)")
+    parser.add_argument("--minneighbourlen", type=int, default=2,
+                        help="min_neighbour_len для случаев с фильтрацией по соседям (по умолчанию 2)")
+    parser.add_argument("--matcher", choices=sorted(MATCHERS), default="trie",
+                        help="Движок поиска по словарю (по умолчанию trie)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Сколько раз замерять каждый случай (берётся лучшее время, по умолчанию 3)")
+    parser.add_argument("--quick", action="store_true",
+                        help="Быстрый прогон: без романов, синтетика до 1 млн символов, "
+                             "одна минимальная длина и один замер")
+    parser.add_argument("--output", "-o", type=Path, default=None,
+                        help="Файл JSON с результатами (по умолчанию benchmarks/results/<дата>_<время>.json)")
+    parser.add_argument("--compare", type=Path, default=None,
+                        help="JSON прошлого прогона, с которым сравнить результаты")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Насколько может упасть пропускная способность, чтобы это ещё "
+                             "не считалось регрессией (по умолчанию 0.1 -- 10%%)")
+    args = parser.parse_args()
+
+    sizes = SYNTHETIC_SIZES
+    if args.quick:
+        sizes = QUICK_SYNTHETIC_SIZES
+        args.minlens = args.minlens[1:2] or args.minlens
+        args.repeat = 1
+
+    inputs = load_inputs(sizes, with_texts=not args.quick)
+
+    created = datetime.now()
+    report = {
+        "meta": {
+            "created": created.strftime('%Y-%m-%d %H:%M:%S'),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "matcher": args.matcher,
+            "repeat": args.repeat,
+            "min_neighbour_len": args.minneighbourlen,
+            "stages": STAGES,
+        },
+        "cases": [],
+    }
+
+    scanners = {}
+    for dictionary, level, filter_by_neighbours, min_word_size in iter_cases(args):
+        if (dictionary, min_word_size) not in scanners:
+            scanners[dictionary, min_word_size] = Scanner(min_word_size=min_word_size, 
+                                                          custom_dict_search=load_words(dictionary),
+                                                          matcher=args.matcher)
+        scanner = scanners[dictionary, min_word_size]
+        for name, texts in inputs.items():
+            case = {"input": name, "dictionary": dictionary, "level": level,
+                    "filter_by_neighbours": filter_by_neighbours, "min_word_size": min_word_size}
+            case.update(run_case(scanner, texts, level, filter_by_neighbours, args.minneighbourlen, args.repeat))
+            report["cases"].append(case)
+            print(f"{name:>18} {dictionary:>18} {level:>9} n={int(filter_by_neighbours)} m={min_word_size}: "
+                  f"{case['chars_per_sec']:>10} симв/с, {case['total_seconds']:.3f} с, "
+                  f"{case['peak_memory_mb']} МБ, кандидатов {case['candidates']}")
+
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{created.strftime('%y%m%d')}_{int(created.timestamp())}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nРезультаты сохранены в {output}")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,21 +10,241 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from acrofinder.scanner import Scanner
+from acrofinder.matcher import MATCHERS
 from acrofinder.batch_scanner import BatchScanner
+from acrofinder.sources import RECORD_SOURCES, DirectorySource, ShardedSource, XmlSource
+from acrofinder.shards import ShardMerge
+from acrofinder.corpus_index import AcrosticIndex
+from acrofinder.dictionary import LetterFolding, NamedDictionary
+from acrofinder.letter_store import LetterStreamStore
+from acrofinder.tokenizer import FIRST, LEVELS, canonical_position
 
-def main():
+
+def add_source_arguments(parser):
+    parser.add_argument(
+        "--input", "-i",
+        type=Path,
+        required=True,
+        help="""
+        Путь к директории с текстами (.txt, .txt.gz, .txt.bz2, архивы .zip и .tar) или 
+        к корпусу в одном файле (.xml, .jsonl, .csv), где каждая запись -- отдельный текст
+        """
+    )
+
+    parser.add_argument(
+        "--record",
+        type=str,
+        default="item",
+        help="Для XML: тег элемента записи (по умолчанию item, как в PoetryCorpus)"
+    )
+
+    parser.add_argument(
+        "--textfield",
+        type=str,
+        default="text",
+        help="""
+        Для корпуса в одном файле: поле записи с текстом (для XML -- путь относительно 
+        элемента записи). По умолчанию text
+        """
+    )
+
+    parser.add_argument(
+        "--idfield",
+        type=str,
+        default=None,
+        help="""
+        Для корпуса в одном файле: поле записи с её id (для XML можно @атрибут). 
+        По умолчанию записи нумеруются с 0
+        """
+    )
+
+    parser.add_argument(
+        "--meta",
+        type=str,
+        nargs="+",
+        metavar="COLUMN[=FIELD]",
+        default=None,
+        help="""
+        Для корпуса в одном файле: поля записи, которые добавить в результаты 
+        отдельными столбцами (например --meta author title=name). Для XML по 
+        умолчанию author и title=name
+        """
+    )
+
+
+def make_source(parser, args):
+    """
+    Источник для корпуса в одном файле (для директории -- None, BatchScanner создаст его сам)
+    """
+    if not args.input.is_file():
+        return None
+    source_class = RECORD_SOURCES.get(args.input.suffix.lower())
+    if source_class is None:
+        parser.error(f"Неизвестный формат корпуса: {args.input.name} "
+                     f"(ожидается директория или {', '.join(RECORD_SOURCES)})")
+    metadata = None
+    if args.meta:
+        metadata = dict(item.split("=", 1) if "=" in item else (item, item) for item in args.meta)
+    source_kwargs = {"text_field": args.textfield, "metadata": metadata, "id_field": args.idfield}
+    if source_class is XmlSource:
+        source_kwargs["record_tag"] = args.record
+    return source_class(args.input, **source_kwargs)
+
+
+def index_main(argv):
     parser = argparse.ArgumentParser(
-        description="Поиск акростихов в текстах по первым буквам слов, предложений или абзацев.",
-        add_help=False
+        prog="scan.py index",
+        description="""
+        Построить индекс первых букв корпуса для быстрого поиска отдельных слов 
+        среди акростихов (см. scan.py query)
+        """
     )
-    
+    add_source_arguments(parser)
+
     parser.add_argument(
-        "--input", "-i",
+        "--output", "-o",
         type=Path,
         required=True,
-        help="Путь к директории с .txt файлами для сканирования"
+        help="Файл индекса (например data/corpus.acroindex)"
+    )
+
+    parser.add_argument(
+        "--levels", "-l",
+        type=str,
+        nargs="+",
+        metavar="LEVEL",
+        choices=LEVELS,
+        default=list(LEVELS),
+        help="Уровни, которые попадут в индекс (по умолчанию все: word sentence paragraph)"
+    )
+
+    parser.add_argument(
+        "--streamcache",
+        type=Path,
+        default=None,
+        help="Директория хранилища первых букв (см. scan.py --streamcache)"
+    )
+
+    args = parser.parse_args(argv)
+    source = make_source(parser, args) or DirectorySource(args.input)
+    store = LetterStreamStore(args.streamcache) if args.streamcache else None
+    index = AcrosticIndex.build(args.output, source, levels=args.levels, store=store)
+    print(f"📇 Индекс {args.output}: документов {len(index.documents)}, "
+          f"не удалось прочитать {len(index.header['failed'])}")
+
+
+def query_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="scan.py query",
+        description="""
+        Найти слова среди акростихов корпуса по индексу (scan.py index). Столбцы 
+        результатов -- как у обычного сканирования с --custom_dict
+        """
+    )
+
+    parser.add_argument("index", type=Path, help="Файл индекса")
+    parser.add_argument("words", type=str, nargs="+", help="Искомые слова")
+
+    parser.add_argument(
+        "--levels", "-l",
+        type=str,
+        nargs="+",
+        metavar="LEVEL",
+        default=None,
+        help="Уровни поиска (по умолчанию все уровни индекса)"
+    )
+
+    parser.add_argument("--vicinity", "-v", type=int, default=5,
+                        help="Размер окрестностей, как у scan.py (по умолчанию 5)")
+    parser.add_argument("--neighbours", "-n", default=False, action='store_true',
+                        help="Фильтровать по наличию соседей, как у scan.py")
+    parser.add_argument("--minneighbourlen", "-mn", type=int, default=2,
+                        help="Минимальная длина соседей (по умолчанию 2)")
+    parser.add_argument("--neighbourwords", "-nw", type=int, choices=[1, 2], default=1,
+                        help="Сколько соседних слов подряд искать (по умолчанию 1)")
+    parser.add_argument("--nocontext", default=False, action='store_true',
+                        help="Не строить context (тексты корпуса тогда не открываются)")
+
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        default=None,
+        help="Куда сохранить результаты в CSV (по умолчанию -- вывести в консоль)"
+    )
+
+    args = parser.parse_args(argv)
+    index = AcrosticIndex(args.index)
+    try:
+        results = index.query(args.words, levels=args.levels, vicinity_range=args.vicinity,
+                              with_context=not args.nocontext,
+                              filter_by_neighbours=args.neighbours,
+                              min_neighbour_len=args.minneighbourlen,
+                              neighbour_words=args.neighbourwords)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.output is None:
+        results.to_csv(sys.stdout, index=False)
+    else:
+        results.to_csv(args.output, index=False)
+        print(f"🔎 Найдено {len(results)}, результаты: {args.output}")
+
+
+def merge_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="scan.py merge",
+        description="""
+        Собрать результаты шардов корпуса (scan.py --shard K/N) в один файл результатов 
+        и один отчёт. Перед сборкой проверяется, что есть все шарды, каждый -- один раз, 
+        и что все они сканировались одним словарём, с одними параметрами и на одном корпусе
+        """
+    )
+
+    parser.add_argument(
+        "shards",
+        type=Path,
+        nargs="+",
+        metavar="PATH",
+        help="Сводки шардов (..._shard.json) или директории, в которых они лежат"
+    )
+
+    parser.add_argument(
+        "--output", "-o",
+        type=Path,
+        default=Path(__file__).parent.parent / "data" / "results",
+        help="Куда сохранить общие результаты и отчёт (по умолчанию data/results)"
     )
 
+    args = parser.parse_args(argv)
+    try:
+        results_path, report_path = ShardMerge(args.shards).merge(args.output)
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+    print(f"✅ Результаты шардов собраны: {results_path}")
+    print(f"📄 Отчёт сохранён: {report_path}")
+
+
+# подкоманды: scan.py index ..., scan.py query ... и scan.py merge ...; без подкоманды -- сканирование
+COMMANDS = {"index": index_main, "query": query_main, "merge": merge_main}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Поиск акростихов в текстах по первым буквам слов, предложений или абзацев.",
+        epilog="""
+        Подкоманды: scan.py index -- построить индекс первых букв корпуса, 
+        scan.py query -- искать слова по индексу, scan.py merge -- собрать результаты 
+        шардов (подробнее: scan.py index -h)
+        """,
+        add_help=False
+    )
+    
+    add_source_arguments(parser)
+
     parser.add_argument(
         "--dict", "-d",
         type=str,
@@ -47,6 +267,21 @@ def main():
         """
     )
 
+    parser.add_argument(
+        "--positions", "-p",
+        type=str,
+        nargs="+",
+        metavar="POSITION",
+        default=["first"],
+        help="""
+        Какие буквы единиц складывать в последовательности: first -- первые (акростих, 
+        по умолчанию), last -- последние (телестих), число -- буквы с этим номером 
+        (мезостих), например --positions first last 3. Все последовательности 
+        извлекаются за один проход по тексту и ищутся на каждом уровне из --levels; 
+        из какой последовательности кандидат, показывает столбец position
+        """
+    )
+
     parser.add_argument(
         "--vicinity", "-v",
         type=int,
@@ -60,7 +295,6 @@ def main():
     
     parser.add_argument(
         "--neighbours", "-n",
-        type=bool,
         default=False,
         action='store_true',
         help="""
@@ -75,11 +309,42 @@ def main():
     parser.add_argument(
         "--minneighbourlen", "-mn",
         type=int,
-        default=2,
+        nargs="+",
+        default=[2],
         help="""
         Если включена фильтрация по наличию слов среди соседей найденной формы, 
         минимальная длина соседей (например, чтобы можно было исключать одно- 
-        и двухбуквенные слова, попадающиеся случайно). Значение по умолчанию 2
+        и двухбуквенные слова, попадающиеся случайно). Значение по умолчанию 2. 
+        С --sweep можно перечислить несколько значений
+        """
+    )
+
+    parser.add_argument(
+        "--neighbourwords", "-nw",
+        type=int,
+        nargs="+",
+        choices=[1, 2],
+        default=[1],
+        help="""
+        Сколько соседних слов подряд искать: 1 -- одно слово слева или справа, 
+        2 -- два слова (одно слева и одно справа, оба слева или оба справа). 
+        Значение по умолчанию 1. С --sweep можно перечислить оба значения
+        """
+    )
+
+    parser.add_argument(
+        "--dicts",
+        type=str,
+        nargs="+",
+        metavar="NAME=SOURCE[:MINLEN]",
+        default=None,
+        help="""
+        Искать сразу по нескольким словарям (вместо --dict): каждый задаётся как 
+        ИМЯ=ФАЙЛ.txt из data/dicts или ИМЯ=слово,слово и, через двоеточие, со своей 
+        минимальной длиной (по умолчанию --minlen), например 
+        --dicts common=wordforms_20k.txt names=names.txt:4 watch=море,слово:3. 
+        Тексты проходятся один раз, а в результатах появляется столбец dictionary. 
+        Слова из --custom_dict тогда становятся словарём custom
         """
     )
 
@@ -96,8 +361,188 @@ def main():
     parser.add_argument(
         "--minlen", "-m",
         type=int,
-        default=5,
-        help="Минимальная длина сочетания, образующего акростих (по умолчанию 5 символов)"
+        nargs="+",
+        default=[5],
+        help="""
+        Минимальная длина сочетания, образующего акростих (по умолчанию 5 символов). 
+        С --sweep можно перечислить несколько значений
+        """
+    )
+
+    parser.add_argument(
+        "--sweep",
+        default=False,
+        action='store_true',
+        help="""
+        Подбор параметров: корпус сканируется один раз, и для каждого сочетания 
+        значений --minlen, --minneighbourlen и --neighbourwords (без фильтрации по 
+        соседям и с ней) считается, сколько кандидатов оно даёт на каждом уровне. 
+        Сводная таблица сохраняется в data/results/..._sweep.csv
+        """
+    )
+
+    parser.add_argument(
+        "--sweepresults",
+        default=False,
+        action='store_true',
+        help="""
+        С --sweep: сохранить ещё и результаты каждого сочетания параметров отдельным 
+        файлом (..._m<minlen>_n<0|1>_mn<minneighbourlen>_nw<neighbourwords>_results)
+        """
+    )
+
+    parser.add_argument(
+        "--matcher",
+        choices=list(MATCHERS),
+        default='trie',
+        help="""
+        Движок поиска словарных слов: trie -- префиксное дерево (по умолчанию), 
+        numpy -- векторизованный поиск кодов сочетаний (быстрее на больших корпусах), 
+        compact -- дерево в плоских массивах, построенное из отсортированного словаря 
+        (для словарей в миллионы словоформ: занимает в десятки раз меньше памяти)
+        """
+    )
+
+    parser.add_argument(
+        "--fold",
+        type=str,
+        nargs="*",
+        metavar="LETTER=[LETTER]",
+        default=None,
+        help="""
+        Сворачивать буквы словаря при загрузке (и так же первые буквы текста): без 
+        правил -- ъ= ь= ы=и э=е (ъ и ь выбрасываются, ы заменяется на и, э на е), 
+        либо свои правила, например --fold ъ= ь= ё=е. В столбце word тогда 
+        показываются исходные словоформы. Правила, которые выбрасывают буквы, 
+        можно использовать только с --positions first
+        """
+    )
+
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="""
+        Сколько процессов сканируют файлы параллельно (по умолчанию 1; 0 -- по числу 
+        ядер процессора)
+        """
+    )
+
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="""
+        Сколько файлов читать и декодировать заранее (в отдельных потоках), пока 
+        сканируется текущий, -- полезно для сетевых дисков и холодного кэша 
+        (по умолчанию 0 -- без упреждения)
+        """
+    )
+
+    parser.add_argument(
+        "--writebehind",
+        type=int,
+        default=0,
+        help="""
+        Сколько таблиц результатов может ждать записи на диск в отдельном потоке 
+        (по умолчанию 0 -- запись сразу, в основном потоке)
+        """
+    )
+
+    parser.add_argument(
+        "--streamcache",
+        type=Path,
+        default=None,
+        help="""
+        Директория хранилища первых букв: при первом прогоне туда сохраняются первые 
+        буквы каждого текста по уровням, а при следующих (например, с другим словарём, 
+        --minlen или --custom_dict) тексты не разбираются заново и открываются, только 
+        если нужен контекст найденных кандидатов
+        """
+    )
+
+    parser.add_argument(
+        "--incremental",
+        default=False,
+        action='store_true',
+        help="""
+        Инкрементальное сканирование: результаты каждого файла сохраняются сразу, а при 
+        повторном запуске с тем же словарём и параметрами сканируются только новые и 
+        изменившиеся файлы (прерванный прогон продолжается с того же места)
+        """
+    )
+
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="K/N",
+        help="""
+        Сканировать только K-ю из N частей корпуса (например --shard 2/4 на второй из 
+        четырёх машин). Разбиение одинаково на всех машинах: документ попадает в часть 
+        по хэшу своего пути в корпусе, и новые или удалённые файлы не переносят 
+        остальные в другие части. Рядом с результатами сохраняется сводка шарда 
+        ..._shard.json; собрать шарды вместе -- scan.py merge
+        """
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        default=False,
+        action='store_true',
+        help="""
+        Не сканировать копии: документы с одинаковым после нормализации текстом 
+        (например, одно произведение в разных кодировках) сканируются один раз, 
+        кандидаты записываются от первого из них (с его source_file и метаданными), 
+        а остальные копии перечисляются в мета-отчёте. Не сочетается с --incremental
+        """
+    )
+
+    parser.add_argument(
+        "--resultcache",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="""
+        Директория кэша результатов: таблица кандидатов каждого текста сохраняется по 
+        хэшу текста, словаря и параметров, и при следующих прогонах с теми же 
+        настройками такие тексты не сканируются заново
+        """
+    )
+
+    parser.add_argument(
+        "--stats",
+        default=False,
+        action='store_true',
+        help="""
+        Собрать статистику сканирования: время нормализации, извлечения первых букв, 
+        поиска по словарю, поиска соседей и построения таблиц, а по уровням -- число 
+        первых букв, проверенных префиксов, совпадений, отброшенных фильтром по соседям 
+        и кандидатов. Сумма попадает в мета-отчёт, по файлам -- в ..._stats.json
+        """
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="""
+        Вместо сканирования корпуса просканировать один его документ (имя -- как в 
+        столбце source_file) под cProfile и tracemalloc и сохранить профиль в 
+        data/results/..._profile.prof и отчёт в ..._profile.txt
+        """
+    )
+
+    parser.add_argument(
+        "--format", "-f",
+        type=str,
+        choices=["csv", "jsonl", "parquet"],
+        default="csv",
+        help="""
+        Формат файла результатов: csv (по умолчанию), jsonl или parquet (нужен pyarrow). 
+        Результаты каждого файла дописываются сразу после его сканирования
+        """
     )
 
     parser.add_argument(
@@ -109,24 +554,100 @@ def main():
 
     args = parser.parse_args()
 
+    try:
+        for position in args.positions:
+            canonical_position(position)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.sweep and any(canonical_position(position) != FIRST for position in args.positions):
+        parser.error("--sweep подбирает параметры только для первых букв (--positions first)")
+
+    if args.dedupe and args.incremental:
+        parser.error("--dedupe не сочетается с --incremental")
+
+    if not args.sweep and max(len(args.minlen), len(args.minneighbourlen), len(args.neighbourwords)) > 1:
+        parser.error("Несколько значений --minlen, --minneighbourlen и --neighbourwords -- только с --sweep")
+    if args.sweep and min(args.minneighbourlen) < 1:
+        parser.error("--sweep проверяет и фильтрацию по соседям: значения --minneighbourlen должны быть >= 1")
+
     custom_words = None
     if args.custom_dict:
         custom_words = [w.strip() for w in args.custom_dict.split(",") if w.strip()]
 
 
-    scanner = Scanner(min_word_size=args.minlen,
+    folding = None
+    if args.fold is not None:
+        try:
+            folding = LetterFolding.parse(args.fold)
+        except ValueError as e:
+            parser.error(str(e))
+        if folding.deletes_letters and any(canonical_position(position) != FIRST for position in args.positions):
+            parser.error(f"Правила --fold, которые выбрасывают буквы ({folding}), "
+                         f"можно использовать только с --positions first")
+        folding = folding.rules
+
+    dictionaries = None
+    if args.dicts:
+        try:
+            dictionaries = [NamedDictionary.parse(item) for item in args.dicts]
+        except ValueError as e:
+            parser.error(str(e))
+        if custom_words:
+            dictionaries.append(NamedDictionary("custom", words=custom_words))
+
+    scanner = Scanner(min_word_size=min(args.minlen),
                       vicinity_range=args.vicinity,
                       dictionary_name=args.dict,
-                      custom_dict_search=custom_words)
-    batch_scanner = BatchScanner(scanner, args.input)
+                      custom_dict_search=custom_words,
+                      matcher=args.matcher,
+                      folding=folding,
+                      dictionaries=dictionaries,
+                      result_cache_dir=args.resultcache)
+    source = make_source(parser, args)
+    if args.shard is not None:
+        try:
+            source = ShardedSource(source or DirectorySource(args.input), *ShardedSource.parse(args.shard))
+        except ValueError as e:
+            parser.error(str(e))
+
+    batch_scanner = BatchScanner(scanner, args.input, workers=args.jobs, source=source,
+                                 prefetch=args.prefetch, write_behind=args.writebehind,
+                                 stream_store=args.streamcache)
+
+
 
 
 
+    if args.profile is not None:
+        batch_scanner.profile_file(args.profile,
+                                   levels=args.levels,
+                                   filter_by_neighbours=args.neighbours,
+                                   min_neighbour_len=args.minneighbourlen[0],
+                                   neighbour_words=args.neighbourwords[0],
+                                   positions=args.positions)
+        return
 
+    if args.sweep:
+        summary = batch_scanner.sweep(levels=args.levels,
+                                      min_word_sizes=args.minlen,
+                                      min_neighbour_lens=args.minneighbourlen,
+                                      neighbour_words=args.neighbourwords,
+                                      with_context=args.sweepresults,
+                                      config_results=args.sweepresults,
+                                      output_format=args.format)
+        print(summary.to_string(index=False))
+        return
 
     batch_scanner.scan_directory(levels=args.levels, 
                                  filter_by_neighbours=args.neighbours, 
-                                 min_neighbour_len=args.minneighbourlen)
+                                 min_neighbour_len=args.minneighbourlen[0],
+                                 neighbour_words=args.neighbourwords[0],
+                                 incremental=args.incremental,
+                                 output_format=args.format,
+                                 return_results=False,
+                                 stats=args.stats,
+                                 dedupe=args.dedupe,
+                                 positions=args.positions)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,27 @@
 from .scanner import Scanner
+from .manifest import ScanManifest
+from .letter_store import LetterStreamStore, Streams
+from .reader import READ_ERRORS, CorpusReader, Document
+from .sources import CorpusSource, DirectorySource, ShardedSource
+from .stats import LEVEL_STAGES, STAGE_LABELS, ScanStats, timed
+from .normalizer import OffsetMap
 from pathlib import Path
+import cProfile
+import io
+import json
+import os
+import pstats
+import queue
+import threading
+import time
+import tracemalloc
 import pandas as pd
-from typing import List, Optional
+from collections import deque
+from itertools import product
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from datetime import datetime
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, 
+                                as_completed, wait)
 
 # импорт корректного прогресс-бара (для ipynb и командной строки разные)
 try:
@@ -15,6 +34,330 @@ except ImportError:
     from tqdm import tqdm
 
 
+# результат файла: (таблица кандидатов, число символов, ошибка, (секунд на чтение, секунд на сканирование),
+# статистика этапов, если сканер её собирает, ключ текста при поиске копий -- Scanner.result_key; у 
+# копии уже просканированного текста таблицы нет)
+Outcome = Tuple[Optional[pd.DataFrame], int, Optional[str], Tuple[float, float], Optional[ScanStats],
+                Optional[str]]
+
+
+# сканер процесса-воркера: передаётся один раз при запуске пула, а не с каждой задачей
+_worker_scanner: Optional[Scanner] = None
+_worker_reader: Optional[CorpusReader] = None
+_worker_store: Optional[LetterStreamStore] = None
+# ключи текстов, уже просканированных этим воркером (при поиске копий)
+_worker_seen: Optional[Set[str]] = None
+
+
+def _init_worker(scanner: Scanner, store: Optional[LetterStreamStore] = None, dedupe: bool = False) -> None:
+    global _worker_scanner, _worker_reader, _worker_store, _worker_seen
+    _worker_scanner = scanner
+    _worker_reader = CorpusReader()
+    _worker_store = store
+    _worker_seen = set() if dedupe else None
+
+
+def _scan_file_in_worker(document: Document, scan_kwargs: dict, 
+                         data: Optional[bytes] = None) -> Outcome:
+    return _scan_file(_worker_scanner, _worker_reader, document, scan_kwargs, data, _worker_store,
+                      _worker_seen)
+
+
+def _scan_file(scanner: Scanner, reader: CorpusReader, document: Document, scan_kwargs: dict,
+               data: Optional[bytes] = None, store: Optional[LetterStreamStore] = None,
+               seen: Optional[Set[str]] = None) -> Outcome:
+    """
+    Читает (если байты не переданы в data) и сканирует один текст. Возвращает 
+    (таблица кандидатов, число символов, ошибка, время, статистика, ключ текста); 
+    если текст не удалось прочитать, таблицы нет, а ошибка содержит описание
+    """
+    read = _read_file(reader, document, data, store, 
+                      Scanner.stream_names(scan_kwargs["levels"], scan_kwargs.get("positions")))
+    return _scan_text(scanner, reader, document, read, scan_kwargs, store, seen)
+
+
+def _read_file(reader: CorpusReader, document: Document, data: Optional[bytes] = None,
+               store: Optional[LetterStreamStore] = None, 
+               levels: List[str] = ()) -> Tuple[Union[str, Streams, None], Optional[str], float]:
+    """
+    Читает и декодирует текст, а если в хранилище store есть его первые буквы по 
+    всем уровням levels (или другие потоки букв, см. Scanner.stream_names) -- берёт 
+    их вместо текста. Возвращает (текст или сохранённые 
+    первые буквы, ошибка, секунд на чтение)
+    """
+    if document.error is not None:
+        return None, document.error, 0.0
+    start = time.perf_counter()
+    try:
+        if store is not None:
+            stored = store.lookup(document.path, document.member, levels)
+            if stored is not None:
+                return stored, None, time.perf_counter() - start
+        text = reader.read_text(document, data)
+    except READ_ERRORS as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+    return text, None, time.perf_counter() - start
+
+
+def _scan_text(scanner: Scanner, reader: CorpusReader, document: Document, 
+               read: Tuple[Union[str, Streams, None], Optional[str], float], scan_kwargs: dict,
+               store: Optional[LetterStreamStore] = None, seen: Optional[Set[str]] = None) -> Outcome:
+    """
+    Сканирует прочитанный текст (см. _read_file). Если передан seen, считается ключ 
+    нормализованного текста (Scanner.result_key) -- по тому же тексту, который потом 
+    сканируется, без отдельного чтения; текст, ключ которого уже есть в seen, не 
+    сканируется (таблицы нет). Документы, первые буквы которых взяты из хранилища, 
+    ключа не получают
+    """
+    payload, error, read_seconds = read
+    if error is not None:
+        return None, 0, error, (read_seconds, 0.0), None, None
+
+    # статистика собирается для каждого файла отдельно (см. BatchScanner.scan_directory(stats=True))
+    stats = None
+    if scanner.stats is not None:
+        stats = scanner.stats = ScanStats()
+
+    start = time.perf_counter()
+    # подбор параметров (BatchScanner.sweep) -- одна таблица на все наборы параметров
+    sweep = "neighbour_settings" in scan_kwargs
+    scan_streams = scanner.sweep_streams if sweep else scanner.scan_streams
+    key = None
+    if store is None and not sweep and seen is None:
+        chars = len(payload)
+        df = scanner.scan_text(payload, **scan_kwargs)
+    elif store is None and not sweep:
+        chars = len(payload)
+        offsets = OffsetMap()
+        with timed(scanner.stats, 'normalization'):
+            text = scanner.normalizer.normalize(payload, offsets)
+        key = scanner.result_key(text, **scan_kwargs)
+        if key in seen:
+            return None, chars, None, (read_seconds, time.perf_counter() - start), stats, key
+        seen.add(key)
+        df = scanner.scan_normalized(text, offsets, key=key, **scan_kwargs)
+    elif isinstance(payload, str):
+        chars = len(payload)
+        text, offsets, streams = scanner.prepare_text(payload, scanner.stream_names(scan_kwargs["levels"], 
+                                                                                    scan_kwargs.get("positions")))
+        if store is not None:
+            store.save(document.path, document.member, payload, chars, offsets, streams)
+        if seen is not None and not sweep:
+            key = scanner.result_key(text, **scan_kwargs)
+            if key in seen:
+                return None, chars, None, (read_seconds, time.perf_counter() - start), stats, key
+            seen.add(key)
+        df = scan_streams(streams, offsets, lambda: text, **scan_kwargs)
+    else:
+        # первые буквы из хранилища: исходный текст читается, только если нужен context
+        chars, offsets, streams = payload
+        if stats is not None:
+            for name in scanner.stream_names(scan_kwargs["levels"], scan_kwargs.get("positions")):
+                stats.count(name, letters=len(streams[name][0]))
+        get_text = lambda: scanner.normalizer.normalize(reader.read_text(document))
+        try:
+            df = scan_streams(streams, offsets, get_text, **scan_kwargs)
+        except READ_ERRORS as e:
+            return None, 0, f"{type(e).__name__}: {e}", (read_seconds, time.perf_counter() - start), None, None
+    df['source_file'] = document.name
+    for column, value in document.metadata.items():
+        df[column] = value
+
+    return df, chars, None, (read_seconds, time.perf_counter() - start), stats, key
+
+
+class _InOrder:
+    """
+    Принимает результаты файлов в любом порядке и передаёт их в consume строго по 
+    порядку файлов. Результаты, которые можно получить в любой момент (сохранённые 
+    в манифесте), откладываются и загружаются, только когда до них дошла очередь
+    """
+
+    def __init__(self, consume: Callable[[int, tuple], None]) -> None:
+        self.consume = consume
+        self.ready = {}
+        self.deferred = {}
+        self.next_index = 0
+
+    def defer(self, i: int, load: Callable[[], tuple]) -> None:
+        self.deferred[i] = load
+
+    def put(self, i: int, outcome: tuple) -> None:
+        self.ready[i] = outcome
+        self.drain()
+
+    def drain(self) -> None:
+        while True:
+            if self.next_index in self.ready:
+                outcome = self.ready.pop(self.next_index)
+            elif self.next_index in self.deferred:
+                outcome = self.deferred.pop(self.next_index)()
+            else:
+                break
+            self.consume(self.next_index, outcome)
+            self.next_index += 1
+
+
+class ResultSink:
+    """
+    Приёмник результатов: дописывает кандидатов каждого файла в файл результатов, 
+    как только файл просканирован, чтобы не держать весь корпус в памяти
+    """
+
+    EXTENSION = ""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def write(self, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class CsvSink(ResultSink):
+    """
+    CSV в режиме дозаписи: заголовок (и BOM для Excel) -- только при первой записи
+    """
+
+    EXTENSION = "csv"
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self._started = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if not self._started:
+            df.to_csv(self.path, index=False, encoding='utf-8-sig')
+            self._started = True
+        else:
+            df.to_csv(self.path, mode='a', header=False, index=False, encoding='utf-8')
+
+    def close(self) -> None:
+        if not self._started:
+            self.path.write_text("", encoding='utf-8-sig')
+
+
+class JsonlSink(ResultSink):
+    """
+    JSON Lines: по объекту на строку, каждый файл дописывается сразу
+    """
+
+    EXTENSION = "jsonl"
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, df: pd.DataFrame) -> None:
+        if len(df):
+            df.to_json(self._file, orient='records', lines=True, force_ascii=False)
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    """
+    Parquet (нужен pyarrow): строки копятся до row_group_size и пишутся группами строк, 
+    столбцы level и source_file кодируются словарём
+    """
+
+    EXTENSION = "parquet"
+
+    INT_COLUMNS = ('start_pos', 'n_gram_size')
+    DICTIONARY_COLUMNS = ['level', 'source_file']
+
+    def __init__(self, path: Path, row_group_size: int = 65536) -> None:
+        super().__init__(path)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Для сохранения результатов в parquet нужен pyarrow: pip install pyarrow") from e
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.row_group_size = row_group_size
+        self._writer = None
+        self._buffer = []
+        self._buffered_rows = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        schema = self._pa.schema([(column, self._pa.int64() if column in self.INT_COLUMNS else self._pa.string())
+                                  for column in df.columns])
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, schema, use_dictionary=self.DICTIONARY_COLUMNS)
+
+        if len(df):
+            self._buffer.append(self._pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            self._buffered_rows += len(df)
+        if self._buffered_rows >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._writer.write_table(self._pa.concat_tables(self._buffer), row_group_size=self._buffered_rows)
+        self._buffer = []
+        self._buffered_rows = 0
+
+
+class BackgroundSink:
+    """
+    Пишет результаты в приёмник sink в отдельном потоке, чтобы сканирование не ждало
+    записи на диск. Очередь ограничена depth таблицами: если запись не успевает,
+    write ждёт, так что память не растёт
+    """
+
+    def __init__(self, sink: ResultSink, depth: int) -> None:
+        self.sink = sink
+        self.path = sink.path
+        # сколько секунд ушло на запись
+        self.seconds = 0.0
+        self._queue: "queue.Queue[Optional[pd.DataFrame]]" = queue.Queue(maxsize=depth)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="acrofinder-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(df)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        self.sink.close()
+
+    def _run(self) -> None:
+        while True:
+            df = self._queue.get()
+            if df is None:
+                return
+            if self._error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.sink.write(df)
+            except BaseException as e:
+                # ошибка поднимется в основном потоке при следующей записи или закрытии
+                self._error = e
+            self.seconds += time.perf_counter() - start
+
+
+# доступные форматы файла результатов
+SINKS = {'csv': CsvSink, 'jsonl': JsonlSink, 'parquet': ParquetSink}
+
 
 class BatchScanner:
     """
@@ -23,30 +366,54 @@ class BatchScanner:
 
     def __init__(self, scanner: Scanner, 
                  directory_path: Optional[Path] = None,
-                 output_dir: Optional[Path] = None) -> None:
+                 output_dir: Optional[Path] = None,
+                 workers: int = 1,
+                 source: Optional[CorpusSource] = None,
+                 prefetch: int = 0,
+                 io_threads: int = 2,
+                 write_behind: int = 0,
+                 stream_store: Optional[Path] = None) -> None:
         """
         Инициализирует BatchScanner.
 
         Аргументы:
             scanner (Scanner): экземпляр сканера для поиска акростихов.
-            directory_path (Path, optional): путь к директории с текстами (.txt). 
+            directory_path (Path, optional): путь к директории с текстами (.txt, 
+                .txt.gz, .txt.bz2 и архивы .zip/.tar с .txt внутри). 
                 По умолчанию: <project_root>/data/texts.
             output_dir (Path, optional): директория для сохранения результатов. 
                 По умолчанию: <project_root>/results. Создаётся, если не существует.
+            workers (int): сколько процессов сканируют файлы параллельно 
+                (по умолчанию 1 -- всё в текущем процессе, 0 -- по числу ядер).
+            source (CorpusSource, optional): источник текстов вместо директории 
+                (например, XmlSource, JsonlSource или CsvSource для корпуса в одном 
+                файле); тогда directory_path не нужен.
+            prefetch (int): сколько файлов читать и декодировать заранее в отдельных 
+                потоках, пока сканируется текущий (0 -- читать по очереди, без 
+                упреждения). При нескольких процессах так читаются члены архивов, 
+                остальные файлы воркеры читают сами.
+            io_threads (int): сколько потоков читают файлы при prefetch > 0.
+            write_behind (int): сколько таблиц результатов может ждать записи в 
+                отдельном потоке (0 -- писать сразу в основном потоке).
+            stream_store (Path, optional): директория хранилища первых букв 
+                (LetterStreamStore): первые буквы каждого текста по уровням сохраняются 
+                там, и при следующих прогонах (например, с другим словарём) текст не 
+                разбирается заново, а читается, только если нужен context находок.
         """
         self.scanner = scanner
 
         # Определяем корень проекта (поднимаемся от src/acrofinder/ на 2 уровня)
         project_root = Path(__file__).parent.parent.parent
 
-        # Устанавливаем директорию текстов по умолчанию
-        if directory_path is None:
-            directory_path = project_root / "data" / "texts"
+        self.reader = CorpusReader()
 
-        # Проверяем, что директория с текстами существует
-        if not directory_path.exists() or not directory_path.is_dir():
-            raise FileNotFoundError(f"Директория с текстами не найдена: {directory_path}")
+        # Устанавливаем директорию текстов по умолчанию (и проверяем, что она существует)
+        if source is None:
+            if directory_path is None:
+                directory_path = project_root / "data" / "texts"
+            source = DirectorySource(directory_path, self.reader)
 
+        self.source = source
         self.directory = directory_path
 
         # Устанавливаем директорию результатов по умолчанию
@@ -57,74 +424,673 @@ class BatchScanner:
         output_dir.mkdir(parents=True, exist_ok=True)
         self.output_dir = output_dir
 
-        self.scanner = scanner
-        self.directory = directory_path
+        if workers < 0:
+            raise ValueError("workers must be >= 0")
+        self.workers = workers or os.cpu_count() or 1
+
+        if prefetch < 0 or write_behind < 0 or io_threads < 1:
+            raise ValueError("prefetch and write_behind must be >= 0, io_threads must be >= 1")
+        self.prefetch = prefetch
+        self.io_threads = io_threads
+        self.write_behind = write_behind
+        self.stream_store = LetterStreamStore(stream_store) if stream_store is not None else None
 
 
 
     def scan_directory(self, levels: List[str] = ['word'], 
                        filter_by_neighbours: bool = False, 
                        min_neighbour_len: int = 1, 
-                       save_results: bool = True) -> pd.DataFrame:
-        """
-        Сканирует все .txt файлы в директории, возвращает сводный DataFrame с кандидатами.
+                       neighbour_words: int = 1,
+                       save_results: bool = True,
+                       with_context: bool = True,
+                       incremental: bool = False,
+                       output_format: str = 'csv',
+                       return_results: bool = True,
+                       stats: bool = False,
+                       dedupe: bool = False,
+                       positions: List[str] = ['first']) -> Optional[pd.DataFrame]:
         """
+        Сканирует все тексты в директории (или в источнике source), возвращает сводный 
+        DataFrame с кандидатами.
+        Тексты -- это файлы .txt, сжатые .txt.gz и .txt.bz2 и файлы .txt внутри архивов 
+        .zip и .tar (в том числе .tar.gz/.tgz/.tar.bz2); архивы не распаковываются на диск, 
+        а в source_file у члена архива -- имя архива и путь внутри него. Кодировка 
+        (UTF-8, cp1251 или KOI8-R) определяется по началу каждого текста. Записи корпуса 
+        в одном файле читаются по одной, в source_file у них -- имя файла и id записи, 
+        а метаданные записи добавляются отдельными столбцами.
+        Если with_context=False, столбцы vicinity и context не строятся (только подсчёт).
+        neighbour_words -- сколько соседних слов подряд искать, positions -- какие буквы 
+        единиц складывать в последовательности: первые, последние, n-е (см. Scanner.scan_text).
 
-        results = [] 
-        total_chars = 0
+        Если save_results=True, кандидаты каждого файла дописываются в файл результатов 
+        сразу, как только файл просканирован (в порядке файлов), в формате output_format: 
+        'csv', 'jsonl' или 'parquet'. Мета-отчёт пишется в конце. Если return_results=False, 
+        сводный DataFrame не собирается и не возвращается (None), так что память не растёт 
+        с числом кандидатов по корпусу.
 
-        files = list(self.directory.glob("*.txt"))
+        Если incremental=True, результаты каждого файла сохраняются в output_dir сразу 
+        после сканирования и записываются в манифест (размер, время изменения файла, 
+        отпечаток словаря и параметров). Повторный запуск сканирует только новые и 
+        изменившиеся файлы (или все, если поменялись словарь или параметры), а для 
+        остальных берёт сохранённые результаты.
 
-        pbar = tqdm(files, desc="Processing files", mininterval=0.1, miniters=1, dynamic_ncols=True)
-        
-        for file_path in pbar:
-            try:
-                text = file_path.read_text(encoding='utf-8')
-            except:
-                text = file_path.read_text(encoding='windows-1251')
-        
+        Если stats=True, для каждого файла собирается статистика сканирования (ScanStats): 
+        время нормализации, извлечения первых букв, поиска по словарю, поиска соседей, 
+        сборки столбцов и построения DataFrame, а по уровням -- число первых букв, 
+        проверенных префиксов, словарных совпадений, совпадений, отброшенных фильтром 
+        по соседям, и кандидатов. Сумма по корпусу попадает в мета-отчёт, а она же и 
+        статистика каждого файла -- в <дата>_<время>_stats.json рядом с ним.
+
+        Если dedupe=True, копии -- документы с одинаковым после нормализации текстом 
+        (например, одно произведение в разных кодировках) -- в результаты не попадают: 
+        при чтении каждого текста считается его ключ, как у ResultCache (sha256 
+        нормализованного текста вместе со словарём и параметрами, Scanner.result_key), 
+        и текст, ключ которого уже встречался, не сканируется (при нескольких процессах 
+        копия, попавшая в другой процесс, сканируется, но её кандидаты отбрасываются). 
+        Кандидаты группы копий записываются один раз, от первого документа (его 
+        source_file и метаданные), а остальные документы группы перечисляются в 
+        мета-отчёте; их метаданные в результаты не попадают. С incremental=True не 
+        сочетается.
+
+        Если источник -- ShardedSource (одна часть корпуса), рядом с результатами 
+        сохраняется сводка шарда <дата>_<время>_shard.json, по которой результаты 
+        всех шардов собираются вместе (см. shards.ShardMerge).
+        """
 
-            df = self.scanner.scan_text(text, levels, filter_by_neighbours, min_neighbour_len)
+        if output_format not in SINKS:
+            raise ValueError(f"Invalid output_format: {output_format}. Expected one of: {', '.join(SINKS)}")
+        if dedupe and incremental:
+            raise ValueError("dedupe cannot be combined with incremental")
 
-            df['source_file'] = file_path.name 
-            results.append(df)
+        # документы директории отсортированы, чтобы порядок результатов не зависел от 
+        # файловой системы и числа процессов; записи корпуса в одном файле читаются по одной
+        documents = self.source.documents()
+        total = self._total_size(documents)
+        # первый документ группы копий -> все документы группы (dedupe=True); ключ 
+        # текста -> первый документ с ним
+        duplicates: Dict[str, List[str]] = {}
+        first_by_key: Dict[str, str] = {}
 
-            total_chars += len(text)
+        scan_kwargs = {"levels": levels,
+                       "filter_by_neighbours": filter_by_neighbours,
+                       "min_neighbour_len": min_neighbour_len,
+                       "neighbour_words": neighbour_words,
+                       "with_context": with_context,
+                       "positions": positions}
 
-        res = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+        scan_time = datetime.now()
+        timestamp = int(scan_time.timestamp())
+        prefix = f"{scan_time.strftime('%y%m%d')}_{timestamp}"
 
+        sink = None
         if save_results:
-            scan_time = datetime.now()
-            timestamp = int(scan_time.timestamp())
-            csv_filename = f"{scan_time.strftime('%y%m%d')}_{timestamp}_results.csv"
-            txt_filename = f"{scan_time.strftime('%y%m%d')}_{timestamp}_meta.txt"
+            sink_class = SINKS[output_format]
+            sink = sink_class(self.output_dir / f"{prefix}_results.{sink_class.EXTENSION}")
+            if self.write_behind:
+                sink = BackgroundSink(sink, self.write_behind)
 
-            # Сохраняем CSV
-            csv_path = self.output_dir / csv_filename
-            res.to_csv(csv_path, index=False, encoding='utf-8-sig')
-            print(f"✅ Результаты сохранены: {csv_path.name}")
+        results = []
+        failed_files = []
+        totals = {"files": 0, "chars": 0, "candidates": 0}
+        # статистика по корпусу и по файлам (stats=True)
+        corpus_stats = ScanStats() if stats else None
+        file_stats = []
+        # секунды: чтение и сканирование (суммарно по процессам), запись результатов и 
+        # ожидание основным процессом ещё не прочитанных файлов
+        timings = {"read": 0.0, "scan": 0.0, "write": 0.0, "wait": 0.0}
+        started = time.perf_counter()
+        # имена документов, результаты которых ещё не собраны
+        names: Dict[int, str] = {}
+
+        def numbered() -> Iterable[Tuple[int, Document]]:
+            for i, document in enumerate(documents):
+                names[i] = document.name
+                yield i, document
+
+        def collect(i: int, outcome: Outcome) -> None:
+            df, chars, error, (read_seconds, scan_seconds), outcome_stats, key = outcome
+            name = names.pop(i)
+            # результаты приходят по порядку документов, так что первый документ группы 
+            # копий приходит раньше остальных
+            if key is not None:
+                if key in first_by_key:
+                    duplicates.setdefault(first_by_key[key], [first_by_key[key]]).append(name)
+                    timings["read"] += read_seconds
+                    timings["scan"] += scan_seconds
+                    return
+                first_by_key[key] = name
+            totals["files"] += 1
+            totals["chars"] += chars
+            timings["read"] += read_seconds
+            timings["scan"] += scan_seconds
+            if outcome_stats is not None:
+                corpus_stats.merge(outcome_stats)
+                file_stats.append({"file": name, "chars": chars, "read_seconds": round(read_seconds, 6),
+                                   "scan_seconds": round(scan_seconds, 6), **outcome_stats.to_dict()})
+            if error is not None:
+                failed_files.append((name, error))
+                return
+            totals["candidates"] += len(df)
+            if sink is not None:
+                start = time.perf_counter()
+                sink.write(df)
+                if not isinstance(sink, BackgroundSink):
+                    timings["write"] += time.perf_counter() - start
+            if return_results:
+                results.append(df)
+
+        in_order = _InOrder(collect)
+
+        # сканер собирает статистику, пока stats не None (в процессы-воркеры он 
+        # передаётся уже с ней); после сканирования прежнее значение возвращается
+        previous_stats = self.scanner.stats
+        self.scanner.stats = ScanStats() if stats else None
+        try:
+            if incremental:
+                files_reused = self._scan_files_incrementally(numbered(), scan_kwargs, in_order, 
+                                                              total, timings)
+            else:
+                self._scan_files(numbered(), scan_kwargs, on_result=in_order.put, 
+                                 total=total, timings=timings, dedupe=dedupe)
+                files_reused = 0
+        except BaseException:
+            # сканирование прервалось: уже записанные результаты сохраняются в файл
+            if sink is not None:
+                sink.close()
+            raise
+        finally:
+            self.scanner.stats = previous_stats
+            self.reader.close()
+
+        for name, error in failed_files:
+            print(f"⚠️  Не удалось прочитать {name}: {error}")
+
+        res = None
+        if return_results:
+            res = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+        if save_results:
+            sink.close()
+            if isinstance(sink, BackgroundSink):
+                timings["write"] += sink.seconds
+            timings["total"] = time.perf_counter() - started
+            print(f"✅ Результаты сохранены: {sink.path.name}")
 
             # Генерируем и сохраняем TXT-отчёт
+            txt_filename = f"{prefix}_meta.txt"
             scan_params = {
                 "levels": levels,
                 "filter_by_neighbours": filter_by_neighbours,
                 "min_neighbour_len": min_neighbour_len,
+                "neighbour_words": neighbour_words,
+                "positions": positions,
             }
             report = self._generate_scan_report(
                 scan_time=scan_time,
-                files_processed=len(files),
-                total_chars=total_chars,
-                total_candidates=len(res),
-                scan_params=scan_params
+                files_processed=totals["files"],
+                total_chars=totals["chars"],
+                total_candidates=totals["candidates"],
+                scan_params=scan_params,
+                failed_files=failed_files,
+                files_reused=files_reused,
+                timings=timings,
+                stats=corpus_stats,
+                duplicates=duplicates
             )
             txt_path = self.output_dir / txt_filename
             txt_path.write_text(report, encoding='utf-8')
             print(f"📄 Отчёт сохранён: {txt_path.name}")
 
+            if stats:
+                json_path = self.output_dir / f"{prefix}_stats.json"
+                sidecar = {
+                    "scan_time": scan_time.strftime('%Y-%m-%d %H:%M:%S'),
+                    "source": str(self.source),
+                    "params": scan_params,
+                    "files_processed": totals["files"],
+                    "chars": totals["chars"],
+                    "candidates": totals["candidates"],
+                    "chars_per_sec": round(totals["chars"] / timings["total"]) if timings["total"] else None,
+                    "timings": {name: round(seconds, 6) for name, seconds in timings.items()},
+                    "stages": corpus_stats.to_dict(),
+                    "files": file_stats,
+                }
+                json_path.write_text(json.dumps(sidecar, ensure_ascii=False, indent=2), encoding='utf-8')
+                print(f"📄 Статистика сохранена: {json_path.name}")
+
+            if isinstance(self.source, ShardedSource):
+                # сводка шарда для scan.py merge: по ней проверяется, что все шарды 
+                # сканировались с одним словарём и параметрами на одном корпусе
+                shard_path = self.output_dir / f"{prefix}{ShardedSource.SUMMARY_SUFFIX}"
+                summary = {
+                    "shard": {"index": self.source.index, "count": self.source.count},
+                    "scan_time": scan_time.strftime('%Y-%m-%d %H:%M:%S'),
+                    "source": str(self.source.source),
+                    "corpus_documents": self.source.corpus_documents,
+                    "corpus_bytes": self.source.corpus_bytes,
+                    "dictionary_fingerprint": self.scanner.dictionary_fingerprint,
+                    "config": {"min_word_size": self.scanner.min_word_size,
+                               "vicinity_range": self.scanner.vicinity_range,
+                               **scan_kwargs},
+                    "params": scan_params,
+                    "files_processed": totals["files"],
+                    "chars": totals["chars"],
+                    "candidates": totals["candidates"],
+                    "failed_files": failed_files,
+                    "timings": {name: round(seconds, 6) for name, seconds in timings.items()},
+                    "format": output_format,
+                    "results": sink.path.name,
+                    "report": txt_path.name,
+                }
+                shard_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+                print(f"📄 Сводка шарда сохранена: {shard_path.name}")
+
 
         return res
 
 
+    def sweep(self, levels: List[str] = ['word'],
+              min_word_sizes: Optional[List[int]] = None,
+              min_neighbour_lens: List[int] = [1],
+              neighbour_words: List[int] = [1],
+              with_context: bool = False,
+              save_results: bool = True,
+              config_results: bool = False,
+              output_format: str = 'csv') -> pd.DataFrame:
+        """
+        Подбор параметров: сколько кандидатов даёт каждый набор из сетки min_word_size x 
+        (без фильтрации по соседям, с фильтрацией) x min_neighbour_len x neighbour_words. 
+        Корпус сканируется один раз, с самыми мягкими параметрами (Scanner.sweep_streams), 
+        а результаты остальных наборов получаются фильтрацией общих находок -- те же 
+        строки, что дал бы scan_directory с этими параметрами.
+
+        Аргументы:
+            levels [str, ...]: уровни поиска
+            min_word_sizes [int, ...], optional: минимальные длины слов (не меньше 
+            min_word_size сканера; по умолчанию -- только она)
+            min_neighbour_lens, neighbour_words [int, ...]: значения параметров соседей
+            with_context (bool): строить ли vicinity и context (нужны только для 
+            файлов результатов по наборам)
+            save_results (bool): сохранить сводную таблицу в output_dir 
+            (<дата>_<время>_sweep.csv)
+            config_results (bool): сохранить ещё и результаты каждого набора отдельным 
+            файлом в формате output_format (<дата>_<время>_m<длина>_n<0|1>_mn<длина 
+            соседа>_nw<число соседей>_results.<расширение>)
+
+        Возвращает:
+            pd.DataFrame: по строке на набор параметров и уровень: min_word_size, 
+            filter_by_neighbours, min_neighbour_len, neighbour_words, level, candidates
+        """
+        if output_format not in SINKS:
+            raise ValueError(f"Invalid output_format: {output_format}. Expected one of: {', '.join(SINKS)}")
+        min_word_sizes = sorted(set(min_word_sizes or [self.scanner.min_word_size]))
+        if min_word_sizes[0] < self.scanner.min_word_size:
+            raise ValueError(f"min_word_sizes must be >= the scanner's min_word_size "
+                             f"({self.scanner.min_word_size})")
+        # значения соседей проверяются до сканирования корпуса: они же используются в 
+        # наборах с фильтрацией по соседям
+        if min(min_neighbour_lens) < 1:
+            raise ValueError("min_neighbour_lens must be >= 1")
+        for words in neighbour_words:
+            if words not in (1, 2):
+                raise ValueError(f"Invalid neighbour_words: {words}. Expected 1 or 2")
+        neighbour_settings = list(product(sorted(set(min_neighbour_lens)), sorted(set(neighbour_words))))
+        configs = [(size, filter_by_neighbours, min_neighbour_len, words)
+                   for size, filter_by_neighbours, (min_neighbour_len, words)
+                   in product(min_word_sizes, (False, True), neighbour_settings)]
+        unique_levels = list(dict.fromkeys(levels))
+
+        documents = self.source.documents()
+        total = self._total_size(documents)
+        scan_kwargs = {"levels": levels, "neighbour_settings": neighbour_settings,
+                       "with_context": with_context}
+
+        scan_time = datetime.now()
+        prefix = f"{scan_time.strftime('%y%m%d')}_{int(scan_time.timestamp())}"
+        sinks = {}
+        if config_results:
+            sink_class = SINKS[output_format]
+            for size, filter_by_neighbours, min_neighbour_len, words in configs:
+                name = (f"{prefix}_m{size}_n{int(filter_by_neighbours)}_mn{min_neighbour_len}"
+                        f"_nw{words}_results.{sink_class.EXTENSION}")
+                sinks[size, filter_by_neighbours, min_neighbour_len, words] = sink_class(self.output_dir / name)
+
+        counts = {(config, level): 0 for config in configs for level in unique_levels}
+        failed_files = []
+        names: Dict[int, str] = {}
+
+        def numbered() -> Iterable[Tuple[int, Document]]:
+            for i, document in enumerate(documents):
+                names[i] = document.name
+                yield i, document
+
+        def collect(i: int, outcome: Outcome) -> None:
+            df, _, error, _, _, _ = outcome
+            name = names.pop(i)
+            if error is not None:
+                failed_files.append((name, error))
+                return
+            for config in configs:
+                config_df = self._sweep_config(df, *config)
+                for level, count in config_df['level'].value_counts().items():
+                    counts[config, level] += count
+                if config in sinks:
+                    sinks[config].write(config_df)
+
+        try:
+            self._scan_files(numbered(), scan_kwargs, on_result=_InOrder(collect).put, total=total)
+        finally:
+            self.reader.close()
+            for sink in sinks.values():
+                sink.close()
+
+        for name, error in failed_files:
+            print(f"⚠️  Не удалось прочитать {name}: {error}")
+
+        summary = pd.DataFrame([(*config, level, counts[config, level])
+                                for config in configs for level in unique_levels],
+                               columns=['min_word_size', 'filter_by_neighbours', 'min_neighbour_len',
+                                        'neighbour_words', 'level', 'candidates'])
+        if save_results:
+            path = self.output_dir / f"{prefix}_sweep.csv"
+            summary.to_csv(path, index=False, encoding='utf-8-sig')
+            print(f"✅ Сводка по параметрам сохранена: {path.name}")
+        return summary
+
+
+    def profile_file(self, name: str, levels: List[str] = ['word'],
+                     filter_by_neighbours: bool = False,
+                     min_neighbour_len: int = 1,
+                     neighbour_words: int = 1,
+                     with_context: bool = True,
+                     positions: List[str] = ['first'],
+                     memory: bool = True,
+                     top: int = 30) -> Path:
+        """
+        Сканирует один документ источника в текущем процессе под cProfile (и tracemalloc), 
+        чтобы разобраться, куда уходит время на медленном файле. Сохраняет в output_dir 
+        <дата>_<время>_profile.prof (для pstats или snakeviz) и <дата>_<время>_profile.txt: 
+        статистику этапов (ScanStats), функции с наибольшим суммарным временем и строки, 
+        выделившие больше всего памяти
+
+        Аргументы:
+            name (str): документ -- как в столбце source_file результатов
+            levels, filter_by_neighbours, min_neighbour_len, neighbour_words, 
+            with_context, positions: как в scan_directory
+            memory (bool): следить ли за выделением памяти (tracemalloc заметно 
+            замедляет сканирование, но на время этапов в отчёте влияет одинаково)
+            top (int): сколько функций и строк показывать в отчёте
+
+        Возвращает:
+            Path: путь к текстовому отчёту
+        """
+        document = next((document for document in self.source.documents() if document.name == name), None)
+        if document is None:
+            raise FileNotFoundError(f"Документ не найден в источнике: {name}")
+
+        scan_kwargs = {"levels": levels,
+                       "filter_by_neighbours": filter_by_neighbours,
+                       "min_neighbour_len": min_neighbour_len,
+                       "neighbour_words": neighbour_words,
+                       "with_context": with_context,
+                       "positions": positions}
+        # хранилище первых букв не используется: профилируется весь путь от текста
+        read = _read_file(self.reader, document)
+        if read[1] is not None:
+            raise OSError(f"Не удалось прочитать {name}: {read[1]}")
+
+        scan_time = datetime.now()
+        prefix = f"{scan_time.strftime('%y%m%d')}_{int(scan_time.timestamp())}"
+        profiler = cProfile.Profile()
+        previous_stats = self.scanner.stats
+        self.scanner.stats = ScanStats()
+        if memory:
+            tracemalloc.start()
+        try:
+            profiler.enable()
+            outcome = _scan_text(self.scanner, self.reader, document, read, scan_kwargs)
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot() if memory else None
+            peak = tracemalloc.get_traced_memory()[1] if memory else None
+        finally:
+            if memory:
+                tracemalloc.stop()
+            self.scanner.stats = previous_stats
+        self.reader.close()
+        df, chars, _, (read_seconds, scan_seconds), stats, _ = outcome
+
+        prof_path = self.output_dir / f"{prefix}_profile.prof"
+        profiler.dump_stats(prof_path)
+
+        lines = [f"🔬 ПРОФИЛЬ ФАЙЛА {name}", "=" * 50,
+                 f"📅 Дата и время:     {scan_time.strftime('%Y-%m-%d %H:%M:%S')}"]
+        for key, value in scan_kwargs.items():
+            lines.append(f"   • {key:<20} {value}")
+        lines.append(f"📝 Символов:          {chars:,}".replace(",", " "))
+        lines.append(f"🎯 Кандидатов:        {len(df)}")
+        lines.append(f"⏱️  Чтение (с):        {read_seconds:.2f}")
+        lines.append(f"⏱️  Сканирование (с):  {scan_seconds:.2f}")
+        if peak is not None:
+            lines.append(f"💾 Пик памяти:        {peak / 2 ** 20:.1f} МБ")
+        lines.append("")
+        lines.extend(self._stats_lines(stats))
+
+        lines.append("")
+        lines.append(f"🐢 ФУНКЦИИ (cProfile, по суммарному времени; весь профиль -- {prof_path.name}):")
+        buffer = io.StringIO()
+        pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(top)
+        lines.append(buffer.getvalue().strip())
+
+        if snapshot is not None:
+            lines.append("")
+            lines.append("💾 ПАМЯТЬ (tracemalloc, занято к концу сканирования, вместе с таблицей результатов):")
+            for statistic in snapshot.statistics('lineno')[:top]:
+                lines.append(f"   • {statistic}")
+
+        txt_path = self.output_dir / f"{prefix}_profile.txt"
+        txt_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+        print(f"📄 Профиль сохранён: {txt_path.name}")
+        return txt_path
+
+
+    def _sweep_config(self, df: pd.DataFrame, min_word_size: int, filter_by_neighbours: bool,
+                      min_neighbour_len: int, neighbour_words: int) -> pd.DataFrame:
+        """
+        Строки таблицы Scanner.sweep_streams для одного набора параметров -- в том же 
+        виде, что и у scan_directory
+        """
+        neighbour_column = self.scanner.sweep_column(min_neighbour_len, neighbour_words)
+        mask = df['n_gram_size'] >= min_word_size
+        if filter_by_neighbours:
+            mask &= df[neighbour_column].notna()
+
+        config_df = df[mask].rename(columns={neighbour_column: 'neighbour'})
+        result_columns = self.scanner.result_columns(with_context='context' in df.columns)
+        # после столбцов сканера -- source_file и метаданные, столбцы соседей других наборов не нужны
+        other_columns = [column for column in df.columns
+                         if column not in result_columns and not column.startswith('neighbour_')]
+        return config_df[result_columns + other_columns].reset_index(drop=True)
+
+
+    def _scan_files_incrementally(self, documents: Iterable[Tuple[int, Document]], scan_kwargs: dict, 
+                                  in_order: "_InOrder", total: Optional[int] = None,
+                                  timings: Optional[dict] = None) -> int:
+        """
+        Сканирует только те файлы, для которых в манифесте нет актуальных результатов,
+        и сохраняет результаты каждого из них по мере готовности. Сохранённые результаты 
+        остальных файлов читаются с диска только в свою очередь. Возвращает число файлов, 
+        взятых из манифеста
+        """
+        manifest = ScanManifest(self.output_dir)
+        config = ScanManifest.config_fingerprint(self.scanner.dictionary_fingerprint, 
+                                                 {"min_word_size": self.scanner.min_word_size,
+                                                  "vicinity_range": self.scanner.vicinity_range,
+                                                  **scan_kwargs})
+
+        # файл (и член архива или id записи) каждого документа, который сканируется сейчас
+        scanning: Dict[int, Tuple[Path, Optional[str]]] = {}
+        reused = 0
+
+        def to_scan() -> Iterable[Tuple[int, Document]]:
+            nonlocal reused
+            for i, document in documents:
+                record = manifest.lookup(document.path, config, document.member)
+                if record is None:
+                    scanning[i] = (document.path, document.member)
+                    yield i, document
+                else:
+                    reused += 1
+                    in_order.defer(i, lambda record=record: (manifest.load_results(record), 
+                                                             record["chars"], None, (0.0, 0.0), None, None))
+                    in_order.drain()
+
+        def save(i: int, outcome: Outcome) -> None:
+            df, chars, error, _, _, _ = outcome
+            path, member = scanning.pop(i)
+            if error is None:
+                start = time.perf_counter()
+                manifest.save(path, config, df, chars, member)
+                if timings is not None:
+                    timings["write"] += time.perf_counter() - start
+            in_order.put(i, outcome)
+
+        self._scan_files(to_scan(), scan_kwargs, on_result=save, total=total, timings=timings)
+
+        return reused
+
+
+    def _scan_files(self, documents: Iterable[Tuple[int, Document]], scan_kwargs: dict,
+                    on_result: Callable[[int, Outcome], None],
+                    total: Optional[int] = None, timings: Optional[dict] = None,
+                    dedupe: bool = False) -> None:
+        """
+        Сканирует пронумерованные документы в текущем процессе или в пуле из self.workers 
+        процессов и передаёт результат каждого в on_result(номер документа, результат) 
+        сразу по готовности (при нескольких процессах -- в порядке завершения). Документы 
+        берутся из documents по мере того, как освобождаются процессы, так что записи 
+        корпуса в одном файле не читаются все сразу.
+
+        Обычные и сжатые файлы процессы-воркеры читают сами, тексты записей передаются 
+        им вместе с документом, а члены архивов читаются 
+        здесь (по порядку, из одного открытого архива) и передаются воркерам байтами. 
+        Поэтому в работе одновременно не больше двух файлов на воркер: прочитанные 
+        архивы не копятся в памяти, пока воркеры заняты.
+
+        Если self.prefetch > 0, следующие файлы читаются в потоках, пока сканируется 
+        текущий (см. _prefetched)
+
+        Прогресс считается в байтах (размеры файлов корпуса различаются на порядки, так 
+        что по числу файлов время до конца не оценить): total -- сколько байт во всех 
+        документах (см. _total_size), рядом показывается скорость в символах в секунду
+
+        Если dedupe=True, для каждого текста считается его ключ (см. _scan_text), и 
+        текст, уже встречавшийся в этом процессе, не сканируется
+        """
+        if timings is None:
+            timings = {"read": 0.0, "wait": 0.0}
+        pbar = tqdm(total=total, desc="Processing files", unit='B', unit_scale=True, unit_divisor=1024,
+                    mininterval=0.1, miniters=1, dynamic_ncols=True)
+        started = time.perf_counter()
+        scanned_chars = 0
+
+        def done(i: int, document: Document, outcome: Outcome) -> None:
+            nonlocal scanned_chars
+            on_result(i, outcome)
+            scanned_chars += outcome[1]
+            elapsed = time.perf_counter() - started
+            if elapsed > 0:
+                pbar.set_postfix_str(f"{scanned_chars / elapsed:,.0f} симв/с".replace(",", " "), refresh=False)
+            pbar.update(document.size or 0)
+
+        if self.workers == 1:
+            names = Scanner.stream_names(scan_kwargs["levels"], scan_kwargs.get("positions"))
+            read = lambda document: _read_file(self.reader, document, store=self.stream_store,
+                                               levels=names)
+            seen = set() if dedupe else None
+            for i, document, text in self._prefetched(documents, read, timings):
+                done(i, document, _scan_text(self.scanner, self.reader, document, text, scan_kwargs, 
+                                             self.stream_store, seen))
+            pbar.close()
+            return
+
+        def read_member(document: Document) -> Tuple[Optional[bytes], Optional[str], float]:
+            # члены архивов читаются здесь, остальные файлы -- в воркерах (как и члены 
+            # архивов, первые буквы которых есть в хранилище)
+            if not document.in_archive or document.error is not None:
+                return None, None, 0.0
+            if self.stream_store is not None and self.stream_store.known(document.path, document.member):
+                return None, None, 0.0
+            start = time.perf_counter()
+            try:
+                return self.reader.read_bytes(document), None, time.perf_counter() - start
+            except READ_ERRORS as e:
+                return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+        with ProcessPoolExecutor(max_workers=self.workers, 
+                                 initializer=_init_worker, 
+                                 initargs=(self.scanner, self.stream_store, dedupe)) as executor:
+            futures = {}
+
+            def collect(finished) -> None:
+                for future in finished:
+                    done(*futures.pop(future), future.result())
+
+            for i, document, (data, error, read_seconds) in self._prefetched(documents, read_member, timings):
+                if len(futures) >= 2 * self.workers:
+                    collect(wait(futures, return_when=FIRST_COMPLETED).done)
+
+                timings["read"] += read_seconds
+                if error is not None:
+                    done(i, document, (None, 0, error, (0.0, 0.0), None, None))
+                    continue
+                futures[executor.submit(_scan_file_in_worker, document, scan_kwargs, data)] = (i, document)
+
+            collect(as_completed(list(futures)))
+        pbar.close()
+
+
+    @staticmethod
+    def _total_size(documents: Iterable[Document]) -> Optional[int]:
+        """
+        Сколько байт во всех документах (для прогресс-бара), если документы известны 
+        заранее (список), иначе None
+        """
+        if not isinstance(documents, list):
+            return None
+        return sum(document.size or 0 for document in documents)
+
+
+    def _prefetched(self, documents: Iterable[Tuple[int, Document]], read: Callable[[Document], tuple],
+                    timings: dict) -> Iterator[Tuple[int, Document, tuple]]:
+        """
+        Выдаёт (номер, документ, read(документ)) по порядку. Если self.prefetch > 0, 
+        read для следующих self.prefetch документов выполняется заранее в пуле из 
+        self.io_threads потоков; время, которое пришлось ждать чтения, добавляется 
+        в timings["wait"]
+        """
+        if not self.prefetch:
+            for i, document in documents:
+                start = time.perf_counter()
+                result = read(document)
+                timings["wait"] += time.perf_counter() - start
+                yield i, document, result
+            return
+
+        def take() -> Tuple[int, Document, tuple]:
+            i, document, future = window.popleft()
+            start = time.perf_counter()
+            result = future.result()
+            timings["wait"] += time.perf_counter() - start
+            return i, document, result
+
+        with ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="acrofinder-reader") as pool:
+            window = deque()
+            for i, document in documents:
+                window.append((i, document, pool.submit(read, document)))
+                if len(window) > self.prefetch:
+                    yield take()
+            while window:
+                yield take()
 
 
     def _generate_scan_report(self,
@@ -132,7 +1098,12 @@ class BatchScanner:
                               files_processed: int,
                               total_chars: int,
                               total_candidates: int,
-                              scan_params: dict) -> str:
+                              scan_params: dict,
+                              failed_files: Optional[List[Tuple[str, str]]] = None,
+                              files_reused: int = 0,
+                              timings: Optional[dict] = None,
+                              stats: Optional[ScanStats] = None,
+                              duplicates: Optional[Dict[str, List[str]]] = None) -> str:
         """
         Генерирует УПРОЩЁННЫЙ текстовый отчёт о сканировании.
         """
@@ -140,16 +1111,61 @@ class BatchScanner:
         lines.append("📊 КРАТКИЙ ОТЧЁТ О СКАНИРОВАНИИ")
         lines.append("=" * 50)
         lines.append(f"📅 Дата и время:     {scan_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        lines.append(f"📂 Директория:       {self.directory.resolve()}")
+        lines.append(f"📂 {self.source.LABEL + ':':<17} {self.source}")
         lines.append("")
         lines.append("⚙️  ПАРАМЕТРЫ:")
         for key, value in scan_params.items():
             lines.append(f"   • {key:<20} {value}")
         lines.append("")
         lines.append(f"📁 Файлов обработано: {files_processed}")
+        if files_reused:
+            lines.append(f"♻️  Из них взято из прошлых прогонов: {files_reused}")
         lines.append(f"📝 Символов всего:    {total_chars:,}".replace(",", " "))
         lines.append(f"🎯 Кандидатов найдено: {total_candidates}")
+        if failed_files:
+            lines.append(f"⚠️  Не удалось прочитать: {len(failed_files)}")
+            for name, error in failed_files:
+                lines.append(f"   • {name}: {error}")
+        if duplicates:
+            copies = sum(len(group) - 1 for group in duplicates.values())
+            lines.append(f"🪞 Копий пропущено: {copies}")
+            for name, group in duplicates.items():
+                lines.append(f"   • {name} = {', '.join(group[1:])}")
+        if timings:
+            lines.append("")
+            lines.append(f"⏱️  ВРЕМЯ (с):        {timings.get('total', 0.0):.2f}")
+            lines.append(f"   • {'чтение':<20} {timings['read']:.2f}")
+            lines.append(f"   • {'сканирование':<20} {timings['scan']:.2f}")
+            lines.append(f"   • {'запись':<20} {timings['write']:.2f}")
+            lines.append(f"   • {'ожидание чтения':<20} {timings['wait']:.2f}")
+            if self.workers > 1:
+                lines.append("   (чтение и сканирование -- суммарно по всем процессам)")
+            if timings.get('total'):
+                lines.append(f"⚡ Скорость:          {total_chars / timings['total']:,.0f} симв/с".replace(",", " "))
+        if stats is not None:
+            lines.append("")
+            lines.extend(self._stats_lines(stats))
         lines.append("")
         lines.append("✅ Готово.")
 
-        return "\n".join(lines)
\ No newline at end of file
+        return "\n".join(lines)
+
+
+    @staticmethod
+    def _stats_lines(stats: ScanStats) -> List[str]:
+        """
+        Строки отчёта со статистикой этапов и счётчиками по уровням
+        """
+        lines = [f"🔬 ЭТАПЫ СКАНИРОВАНИЯ (с): {stats.total_seconds:.2f}"]
+        for stage, seconds in stats.seconds.items():
+            lines.append(f"   • {STAGE_LABELS[stage]:<20} {seconds:.2f}")
+        for level, level_stats in stats.levels.items():
+            lines.append(f"   {level}:")
+            lines.append(f"   • {'первых букв':<20} {level_stats['letters']}")
+            lines.append(f"   • {'проверено префиксов':<20} {level_stats['probes']}")
+            lines.append(f"   • {'совпадений':<20} {level_stats['hits']}")
+            lines.append(f"   • {'отброшено соседями':<20} {level_stats['dropped']}")
+            lines.append(f"   • {'кандидатов':<20} {level_stats['candidates']}")
+            lines.append("   • " + ", ".join(f"{STAGE_LABELS[stage]} {level_stats['seconds'][stage]:.2f} с"
+                                            for stage in LEVEL_STAGES))
+        return lines
\ No newline at end of file
@@ -0,0 +1,432 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .letter_store import LetterStreamStore
+from .matcher import ALPHABET
+from .normalizer import Normalizer, OffsetMap
+from .reader import READ_ERRORS, CorpusReader, Document
+from .scanner import CONTEXT_COLUMNS, RESULT_COLUMNS, Scanner
+from .sources import RECORD_SOURCES, CorpusSource, DirectorySource, RecordSource
+from .tokenizer import LEVELS, Tokenizer
+
+
+# буква -> код 1..len(ALPHABET); 0 -- граница между документами
+_ENCODE = str.maketrans(ALPHABET, "".join(chr(code) for code in range(1, len(ALPHABET) + 1)))
+_DECODE = str.maketrans("".join(chr(code) for code in range(1, len(ALPHABET) + 1)), ALPHABET)
+
+
+class AcrosticIndex:
+    """
+    Индекс первых букв всего корпуса для мгновенного поиска отдельных слов среди
+    акростихов: для каждого уровня первые буквы всех документов склеены в одну
+    строку (между документами -- разделитель), и по ней построен суффиксный
+    массив. Где встречается слово, находится двоичным поиском по суффиксному
+    массиву, а сканируются потом только документы с совпадениями -- их первые
+    буквы тоже лежат в индексе, так что текст открывается, только если нужен context.
+
+    Формат файла -- как у кэша словаря: MAGIC, длина заголовка (4 байта), заголовок
+    в JSON (документы корпуса, уровни, расположение массивов), массивы с границы,
+    кратной 8 байтам. Файл отображается в память. Индекс не следит за изменениями
+    корпуса: если тексты поменялись, его нужно построить заново
+    """
+
+    MAGIC = b"ACROINDX"
+    VERSION = 1
+    SUFFIX = ".acroindex"
+    # суффиксы упорядочены по первым MAX_DEPTH буквам: длиннее слова не ищутся
+    MAX_DEPTH = 64
+
+    def __init__(self, path: Path) -> None:
+        """
+        Открывает построенный индекс
+
+        Аргументы:
+            path (Path): файл индекса (см. build)
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._buffer[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError(f"Не индекс acrofinder: {self.path}")
+        header_len = int.from_bytes(self._buffer[len(self.MAGIC):len(self.MAGIC) + 4], "little")
+        header = json.loads(self._buffer[len(self.MAGIC) + 4:len(self.MAGIC) + 4 + header_len].decode("utf-8"))
+        if header["version"] != self.VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Индекс {self.path} построен другой версией acrofinder, постройте его заново")
+
+        self.header = header
+        self.levels: List[str] = header["levels"]
+        self.documents: List[dict] = header["documents"]
+        self._data_start = self._align(len(self.MAGIC) + 4 + header_len)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+
+    @classmethod
+    def build(cls, path: Path, source: CorpusSource, levels: Iterable[str] = LEVELS,
+              reader: Optional[CorpusReader] = None,
+              store: Optional[LetterStreamStore] = None) -> "AcrosticIndex":
+        """
+        Строит индекс по всем документам источника и сохраняет его в path
+
+        Аргументы:
+            path (Path): куда сохранить индекс
+            source (CorpusSource): корпус (DirectorySource, XmlSource, ...)
+            levels [str, ...]: уровни, которые попадут в индекс
+            reader (CorpusReader, optional): чем читать документы
+            store (LetterStreamStore, optional): хранилище первых букв: если первые
+            буквы документа там уже есть, текст не разбирается заново
+
+        Возвращает:
+            AcrosticIndex: построенный индекс
+        """
+        levels = list(dict.fromkeys(levels))
+        reader = reader or CorpusReader()
+        normalizer, tokenizer = Normalizer(), Tokenizer()
+
+        letters = {level: bytearray() for level in levels}
+        starts = {level: array('q') for level in levels}
+        doc_starts = {level: array('q', [0]) for level in levels}
+        offset_positions, offset_shifts, offset_doc_starts = array('q'), array('q'), array('q', [0])
+        documents = []
+        failed = []
+
+        for document in source.documents():
+            stored = None
+            if document.error is None and store is not None:
+                stored = store.lookup(document.path, document.member, levels)
+            try:
+                if document.error is not None:
+                    raise ValueError(document.error)
+                if stored is not None:
+                    _, offsets, streams = stored
+                else:
+                    offsets = OffsetMap()
+                    streams = tokenizer.tokenize(normalizer.normalize(reader.read_text(document), offsets),
+                                                 levels)
+            except READ_ERRORS + (ValueError,) as e:
+                failed.append((document.name, str(e)))
+                continue
+
+            documents.append({"name": document.name,
+                              "path": str(document.path),
+                              "member": document.member,
+                              "record": document.text is not None,
+                              "metadata": document.metadata})
+            for level in levels:
+                level_letters, level_starts = streams[level]
+                letters[level] += level_letters.translate(_ENCODE).encode("latin-1") + b"\0"
+                starts[level].extend(level_starts)
+                starts[level].append(-1)
+                doc_starts[level].append(len(letters[level]))
+            offset_positions.extend(offsets.positions)
+            offset_shifts.extend(offsets.shifts)
+            offset_doc_starts.append(len(offset_positions))
+        reader.close()
+
+        arrays = {"offset_positions": np.frombuffer(offset_positions, dtype=np.int64),
+                  "offset_shifts": np.frombuffer(offset_shifts, dtype=np.int64),
+                  "offset_doc_starts": np.frombuffer(offset_doc_starts, dtype=np.int64)}
+        for level in levels:
+            codes = np.frombuffer(bytes(letters[level]), dtype=np.uint8)
+            arrays[f"{level}_letters"] = codes
+            arrays[f"{level}_sa"] = cls._suffix_array(codes)
+            arrays[f"{level}_starts"] = np.frombuffer(starts[level], dtype=np.int64)
+            arrays[f"{level}_doc_starts"] = np.frombuffer(doc_starts[level], dtype=np.int64)
+
+        source_info = {"path": str(source), "options": {}}
+        if isinstance(source, RecordSource):
+            source_info["options"] = source.options()
+
+        header = {"version": cls.VERSION,
+                  "byteorder": sys.byteorder,
+                  "levels": levels,
+                  "source": source_info,
+                  "documents": documents,
+                  "failed": failed,
+                  "layout": {}}
+        offset = 0
+        for name, values in arrays.items():
+            header["layout"][name] = [offset, str(values.dtype), len(values)]
+            offset = cls._align(offset + values.nbytes)
+
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = cls._align(len(cls.MAGIC) + 4 + len(header_bytes))
+        path = Path(path)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(cls.MAGIC)
+            f.write(len(header_bytes).to_bytes(4, "little"))
+            f.write(header_bytes)
+            for name, values in arrays.items():
+                f.seek(data_start + header["layout"][name][0])
+                f.write(values.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+        return cls(path)
+
+
+    def count(self, word: str, level: str = 'word') -> int:
+        """
+        Сколько раз слово встречается среди первых букв уровня level во всём корпусе
+        """
+        start, end = self._range(level, word)
+        return end - start
+
+
+    def locate(self, word: str, level: str = 'word') -> List[Tuple[str, int]]:
+        """
+        Где слово встречается среди первых букв уровня level
+
+        Возвращает:
+            [(str, int), ...]: (документ, start_pos в исходном тексте) в порядке корпуса
+        """
+        start, end = self._range(level, word)
+        positions = np.sort(self._array(f"{level}_sa")[start:end])
+        doc_starts = self._array(f"{level}_doc_starts")
+        docs = np.searchsorted(doc_starts, positions, side="right") - 1
+        starts = self._array(f"{level}_starts")
+
+        located = []
+        for doc, position in zip(docs.tolist(), positions.tolist()):
+            offsets = self._offsets(doc)
+            located.append((self.documents[doc]["name"], offsets.to_original(int(starts[position]))))
+        return located
+
+
+    def query(self, words: Iterable[str], levels: Optional[List[str]] = None,
+              vicinity_range: int = 5, with_context: bool = True,
+              filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+              neighbour_words: int = 1, source: Optional[CorpusSource] = None) -> pd.DataFrame:
+        """
+        Ищет, где слова words встречаются в акростихах корпуса. Результат такой же,
+        как у BatchScanner.scan_directory со сканером Scanner(custom_dict_search=words,
+        min_word_size=длина самого короткого слова), но сканируются только документы,
+        в которых индекс нашёл совпадения
+
+        Аргументы:
+            words [str, ...]: искомые слова
+            levels [str, ...], optional: уровни (по умолчанию -- все уровни индекса)
+            vicinity_range (int): как у Scanner
+            with_context, filter_by_neighbours, min_neighbour_len, neighbour_words:
+            как у Scanner.scan_text (соседи ищутся среди тех же words)
+            source (CorpusSource, optional): откуда читать тексты записей корпуса в
+            одном файле для context (по умолчанию источник создаётся заново по
+            параметрам, с которыми строился индекс)
+
+        Возвращает:
+            pd.DataFrame: столбцы scan_text, source_file и столбцы метаданных
+        """
+        words = sorted({word.lower() for word in words if word})
+        if not words:
+            raise ValueError("Нужно хотя бы одно слово")
+        if levels is None:
+            levels = self.levels
+        for level in levels:
+            if level not in self.levels:
+                raise ValueError(f"Уровня {level} нет в индексе (есть: {', '.join(self.levels)})")
+
+        scanner = Scanner(min_word_size=min(map(len, words)), vicinity_range=vicinity_range,
+                          custom_dict_search=words)
+        scan_kwargs = {"levels": levels, "filter_by_neighbours": filter_by_neighbours,
+                       "min_neighbour_len": min_neighbour_len, "with_context": with_context,
+                       "neighbour_words": neighbour_words}
+
+        # документ -> уровень -> [(позиция в первых буквах документа, длина слова), ...]
+        matches: Dict[int, Dict[str, List[Tuple[int, int]]]] = {}
+        for level in dict.fromkeys(levels):
+            doc_starts = self._array(f"{level}_doc_starts")
+            sa = self._array(f"{level}_sa")
+            for word in words:
+                start, end = self._range(level, word)
+                if end == start:
+                    continue
+                positions = sa[start:end].astype(np.int64)
+                docs = np.searchsorted(doc_starts, positions, side="right") - 1
+                for doc, position in zip(docs.tolist(), (positions - doc_starts[docs]).tolist()):
+                    matches.setdefault(doc, {}).setdefault(level, []).append((position, len(word)))
+
+        texts = self._TextLoader(self, source, {self.documents[doc]["member"] for doc in matches
+                                                if self.documents[doc]["record"]})
+        results = []
+        for doc in sorted(matches):
+            streams = {level: self._streams(level, doc) for level in dict.fromkeys(levels)}
+            doc_matches = {level: sorted(found) for level, found in matches[doc].items()}
+            df = scanner.scan_streams(streams, self._offsets(doc), lambda doc=doc: texts.get(doc),
+                                      matches=doc_matches, **scan_kwargs)
+            info = self.documents[doc]
+            df['source_file'] = info["name"]
+            for column, value in info["metadata"].items():
+                df[column] = value
+            results.append(df)
+
+        if not results:
+            # столбцы метаданных -- те же, что у записей источника, по которому строился индекс
+            metadata_columns = list(self.header["source"]["options"].get("metadata", {}))
+            return pd.DataFrame(columns=[c for c in RESULT_COLUMNS if with_context or c not in CONTEXT_COLUMNS]
+                                + ['source_file'] + metadata_columns)
+        return pd.concat(results, ignore_index=True)
+
+
+    def source(self) -> CorpusSource:
+        """
+        Источник корпуса, по которому строился индекс
+        """
+        info = self.header["source"]
+        path = Path(info["path"])
+        if path.is_dir():
+            return DirectorySource(path)
+        return RECORD_SOURCES[path.suffix.lower()](path, **info["options"])
+
+
+    class _TextLoader:
+        """
+        Читает и нормализует тексты документов для context. Тексты записей корпуса
+        в одном файле достаются из источника за один проход, сразу для всех записей,
+        которые попали в результаты (members): остальные записи не хранятся, а проход
+        заканчивается, как только нашлись все нужные
+        """
+
+        def __init__(self, index: "AcrosticIndex", source: Optional[CorpusSource],
+                     members: Set[str]) -> None:
+            self.index = index
+            self.source = source
+            self.members = members
+            self.reader = CorpusReader()
+            self.normalizer = Normalizer()
+            self._records: Optional[Dict[str, str]] = None
+
+        def get(self, doc: int) -> str:
+            info = self.index.documents[doc]
+            if info["record"]:
+                text = self._record_text(info["member"])
+            else:
+                text = self.reader.read_text(Document(info["name"], Path(info["path"]), info["member"]))
+            return self.normalizer.normalize(text)
+
+        def _record_text(self, member: str) -> str:
+            if self._records is None:
+                source = self.source or self.index.source()
+                self._records = {}
+                for document in source.documents():
+                    if document.text is not None and document.member in self.members:
+                        self._records[document.member] = document.text
+                        if len(self._records) == len(self.members):
+                            break
+            return self._records[member]
+
+
+    def _range(self, level: str, word: str) -> Tuple[int, int]:
+        """
+        Границы суффиксов, начинающихся со слова, в суффиксном массиве уровня
+        """
+        if level not in self.levels:
+            raise ValueError(f"Уровня {level} нет в индексе (есть: {', '.join(self.levels)})")
+        word = word.lower()
+        if len(word) > self.MAX_DEPTH:
+            raise ValueError(f"Слишком длинное слово: больше {self.MAX_DEPTH} букв")
+        if not word or any(letter not in ALPHABET for letter in word):
+            return 0, 0
+        key = word.translate(_ENCODE).encode("latin-1")
+
+        base = self._letters_start(level)
+        sa = self._array(f"{level}_sa")
+        size = len(key)
+
+        low, high = 0, len(sa)
+        while low < high:
+            middle = (low + high) // 2
+            position = base + int(sa[middle])
+            if self._buffer[position:position + size] < key:
+                low = middle + 1
+            else:
+                high = middle
+        start = low
+
+        high = len(sa)
+        while low < high:
+            middle = (low + high) // 2
+            position = base + int(sa[middle])
+            if self._buffer[position:position + size] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return start, low
+
+
+    def _streams(self, level: str, doc: int) -> Tuple[str, array]:
+        doc_starts = self._array(f"{level}_doc_starts")
+        begin, end = int(doc_starts[doc]), int(doc_starts[doc + 1]) - 1
+        base = self._letters_start(level)
+        letters = self._buffer[base + begin:base + end].decode("latin-1").translate(_DECODE)
+        starts = array('q')
+        starts.frombytes(self._array(f"{level}_starts")[begin:end].tobytes())
+        return letters, starts
+
+
+    def _offsets(self, doc: int) -> OffsetMap:
+        doc_starts = self._array("offset_doc_starts")
+        begin, end = int(doc_starts[doc]), int(doc_starts[doc + 1])
+        offsets = OffsetMap()
+        offsets.positions.frombytes(self._array("offset_positions")[begin:end].tobytes())
+        offsets.shifts.frombytes(self._array("offset_shifts")[begin:end].tobytes())
+        return offsets
+
+
+    def _letters_start(self, level: str) -> int:
+        # где в файле начинаются буквы уровня (срезы mmap -- это bytes, их удобно сравнивать)
+        return self._data_start + self.header["layout"][f"{level}_letters"][0]
+
+
+    def _array(self, name: str) -> np.ndarray:
+        values = self._arrays.get(name)
+        if values is None:
+            offset, dtype, length = self.header["layout"][name]
+            values = np.frombuffer(self._buffer, dtype=dtype, count=length, offset=self._data_start + offset)
+            self._arrays[name] = values
+        return values
+
+
+    @classmethod
+    def _suffix_array(cls, codes: np.ndarray) -> np.ndarray:
+        """
+        Суффиксный массив удвоением префиксов: на каждом шаге суффиксы сортируются
+        по паре (ранг первых k букв, ранг следующих k букв). Останавливается, когда
+        все ранги различны или суффиксы упорядочены по первым MAX_DEPTH буквам
+        """
+        n = len(codes)
+        index_type = np.int32 if n < 2 ** 31 else np.int64
+        if n == 0:
+            return np.zeros(0, dtype=index_type)
+
+        rank = codes.astype(np.int64)
+        order = np.argsort(rank, kind="stable")
+        k = 1
+        while k < cls.MAX_DEPTH:
+            # ранг следующих k букв; за концом строки -- -1 (короткий суффикс меньше)
+            second = np.full(n, -1, dtype=np.int64)
+            second[:n - k] = rank[k:]
+            order = np.lexsort((second, rank))
+            sorted_rank, sorted_second = rank[order], second[order]
+            new_group = np.empty(n, dtype=bool)
+            new_group[0] = True
+            new_group[1:] = (sorted_rank[1:] != sorted_rank[:-1]) | (sorted_second[1:] != sorted_second[:-1])
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.cumsum(new_group) - 1
+            if new_group.all():
+                break
+            k *= 2
+        return order.astype(index_type)
+
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + 7) // 8 * 8
@@ -0,0 +1,232 @@
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .matcher import ALPHABET, SortedWords
+
+
+# свёртка по умолчанию: ъ и ь выбрасываются, ы -> и, э -> е (так словари раньше
+# приходилось сворачивать вручную)
+DEFAULT_FOLDING = {'ъ': '', 'ь': '', 'ы': 'и', 'э': 'е'}
+
+
+class LetterFolding:
+    """
+    Правила свёртки букв: буква словаря -> буква, на которую она заменяется, или
+    пустая строка (буква выбрасывается). Слова словаря сворачиваются целиком, а в
+    последовательности первых букв -- только замены: выброшенные из словаря буквы
+    там остаются (и не совпадают ни с одним свёрнутым словом), чтобы не сдвигать
+    позиции. Поэтому правила, которые выбрасывают буквы, годятся только для первых
+    букв: в последних или n-х буквах единиц такие буквы встречаются (мать -> т, ь),
+    и слово с ними не нашлось бы (см. deletes_letters)
+    """
+
+    def __init__(self, rules: Optional[Dict[str, str]] = None) -> None:
+        """
+        Аргументы:
+            rules (dict[str, str], optional): правила (по умолчанию DEFAULT_FOLDING)
+        """
+        if rules is None:
+            rules = DEFAULT_FOLDING
+        for letter, replacement in rules.items():
+            if len(letter) != 1 or letter not in ALPHABET or len(replacement) > 1 or \
+                    (replacement and replacement not in ALPHABET):
+                raise ValueError(f"Invalid folding rule: {letter}={replacement} "
+                                 f"(expected a letter and a letter or nothing)")
+        self.rules = dict(sorted(rules.items()))
+        self._words = str.maketrans({letter: replacement or None for letter, replacement in self.rules.items()})
+        self._letters = str.maketrans({letter: replacement for letter, replacement in self.rules.items()
+                                       if replacement})
+
+
+    @classmethod
+    def parse(cls, items: Iterable[str]) -> "LetterFolding":
+        """
+        Правила из строк вида 'ы=и' или 'ъ=' (как во флаге --fold); без правил --
+        DEFAULT_FOLDING
+        """
+        items = list(items)
+        if not items:
+            return cls()
+        rules = {}
+        for item in items:
+            letter, sep, replacement = item.partition("=")
+            if not sep:
+                raise ValueError(f"Invalid folding rule: {item} (expected LETTER=LETTER or LETTER=)")
+            rules[letter] = replacement
+        return cls(rules)
+
+
+    @property
+    def deletes_letters(self) -> bool:
+        """
+        Есть ли правила, которые выбрасывают букву
+        """
+        return any(not replacement for replacement in self.rules.values())
+
+
+    def fold(self, word: str) -> str:
+        """
+        Свёрнутое слово словаря
+        """
+        return word.translate(self._words)
+
+
+    def fold_letters(self, letters: str) -> str:
+        """
+        Свёрнутая последовательность первых букв (той же длины)
+        """
+        return letters.translate(self._letters)
+
+
+    def __str__(self) -> str:
+        return " ".join(f"{letter}={replacement}" for letter, replacement in self.rules.items())
+
+
+@dataclass
+class NamedDictionary:
+    """
+    Один из словарей, по которым Scanner ищет сразу (см. Scanner(dictionaries=...)):
+    файл из data/dicts или свой список слов, со своей минимальной длиной слова
+    """
+    # имя в столбце dictionary результатов
+    name: str
+    # файл словаря в data/dicts
+    file: Optional[str] = None
+    # или сами слова
+    words: Optional[List[str]] = None
+    # минимальная длина найденного слова (None -- min_word_size сканера)
+    min_word_size: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if (self.file is None) == (self.words is None):
+            raise ValueError(f"Dictionary {self.name}: expected either a file or a list of words")
+
+
+    @classmethod
+    def parse(cls, item: str) -> "NamedDictionary":
+        """
+        Словарь из строки вида ИМЯ=ИСТОЧНИК[:ДЛИНА] (как во флаге --dicts): источник,
+        оканчивающийся на .txt, -- файл в data/dicts, иначе -- слова через запятую.
+        Например 'names=names.txt:4' или 'watch=море,слово:3'
+        """
+        name, sep, source = item.partition("=")
+        if not sep or not name or not source:
+            raise ValueError(f"Invalid dictionary: {item} (expected NAME=FILE.txt[:MINLEN] "
+                             f"or NAME=WORD,WORD[:MINLEN])")
+        min_word_size = None
+        head, sep, tail = source.rpartition(":")
+        if sep and tail.isdigit():
+            source, min_word_size = head, int(tail)
+        if source.endswith(".txt"):
+            return cls(name, file=source, min_word_size=min_word_size)
+        return cls(name, words=[word.strip() for word in source.split(",") if word.strip()],
+                   min_word_size=min_word_size)
+
+
+class PackedDictionary:
+    """
+    Словарь в компактном виде (для словарей в миллионы словоформ): слова,
+    свёрнутые по правилам LetterFolding, лежат в SortedWords (байт на букву),
+    а для свёрнутых форм, которые отличаются от исходных словоформ, хранится,
+    из каких словоформ они получились, -- так в результатах можно показать
+    настоящее слово. Эти записи тоже упакованы в SortedWords: свёрнутая форма,
+    затем через байт 0 исходные словоформы
+    """
+
+    def __init__(self, words: Iterable[str], folding: Optional[LetterFolding] = None) -> None:
+        """
+        Аргументы:
+            words: словоформы (читаются один раз, можно передать генератор)
+            folding (LetterFolding, optional): свёртка букв (None -- без свёртки)
+        """
+        self.folding = folding
+        encode = SortedWords.encode
+
+        # свёрнутые формы, которые сами есть среди словоформ, и те, что получились из других
+        unchanged = set()
+        changed: Dict[bytes, List[bytes]] = {}
+        for word in words:
+            codes = encode(word)
+            if not codes or b"\0" in codes:
+                continue
+            if folding is None:
+                unchanged.add(codes)
+                continue
+            folded = encode(folding.fold(word))
+            if not folded:
+                continue
+            if folded == codes:
+                unchanged.add(codes)
+            else:
+                changed.setdefault(folded, []).append(codes)
+
+        self.words = SortedWords(unchanged | changed.keys())
+        self._wordforms = SortedWords(b"\0".join([folded] + sorted(set(originals) | ({folded} & unchanged)))
+                                      for folded, originals in changed.items())
+
+
+    @classmethod
+    def from_file(cls, path: Path, folding: Optional[LetterFolding] = None) -> "PackedDictionary":
+        """
+        Словарь из файла txt (по словоформе на строку), читается построчно
+        """
+        with open(path, encoding='utf-8') as f:
+            return cls((line.rstrip("\r\n") for line in f), folding)
+
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+
+    @property
+    def max_word_length(self) -> int:
+        return int(self.words.lengths().max()) if len(self.words) else 0
+
+
+    def length_histogram(self) -> Dict[int, int]:
+        """
+        Сколько в словаре (свёрнутых) слов каждой длины
+        """
+        counts = np.bincount(self.words.lengths())
+        return {int(length): int(count) for length, count in enumerate(counts) if count}
+
+
+    def fingerprint(self) -> str:
+        """
+        Отпечаток (sha256): без свёртки -- такой же, как у DictionaryCache.fingerprint
+        для множества тех же слов, со свёрткой -- учитывает ещё правила и исходные словоформы
+        """
+        digest = hashlib.sha256()
+        for i, word in enumerate(self.words):
+            digest.update((word if i == 0 else "\n" + word).encode("utf-8"))
+        if self.folding is not None:
+            digest.update(f"\0{self.folding}\0".encode("utf-8"))
+            digest.update(self._wordforms.buffer)
+        return digest.hexdigest()
+
+
+    def wordforms(self, letters: str) -> List[str]:
+        """
+        Словоформы, которые при свёртке дают те же буквы, что и letters (letters
+        сворачиваются так же, как последовательность первых букв)
+
+        Аргументы:
+            letters (str): найденное сочетание первых букв
+
+        Возвращает:
+            [str, ...]: исходные словоформы по алфавиту
+        """
+        folded = letters if self.folding is None else self.folding.fold_letters(letters)
+        key = SortedWords.encode(folded) + b"\0"
+        i = self._wordforms.find(key)
+        if i < len(self._wordforms) and self._wordforms[i].startswith(key):
+            return [SortedWords.decode(codes) for codes in self._wordforms[i].split(b"\0")[1:]]
+        return [folded]
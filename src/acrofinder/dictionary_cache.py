@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .matcher import CompiledTrieMatcher, TrieMatcher
+
+
+class DictionaryCache:
+    """
+    Скомпилированный словарь, сохранённый рядом с файлом словаря (<словарь>.acrocache):
+    префиксное дерево в виде плоских массивов (см. TrieMatcher.compile) и сведения
+    о словаре (отпечаток, длина самого длинного слова, распределение слов по длинам).
+
+    Формат файла: MAGIC, длина заголовка (4 байта), заголовок в JSON, массивы
+    (каждый с границы, кратной 8 байтам). Кэш действителен, пока не изменился
+    файл словаря: сначала сравниваются размер и время изменения, а если они
+    не совпали -- sha256 содержимого
+    """
+
+    MAGIC = b"ACRODICT"
+    VERSION = 1
+    SUFFIX = ".acrocache"
+
+    def __init__(self, dict_path: Path) -> None:
+        """
+        Аргументы:
+            dict_path (Path): путь к файлу словаря
+        """
+        self.dict_path = Path(dict_path)
+        self.path = self.dict_path.with_name(self.dict_path.name + self.SUFFIX)
+
+
+    def load(self, min_word_size: int) -> Optional[tuple]:
+        """
+        Открывает кэш, если он есть и соответствует файлу словаря
+
+        Возвращает:
+            (CompiledTrieMatcher, dict) -- движок поиска поверх отображённого в память
+            файла и заголовок кэша; None, если кэша нет или он устарел
+        """
+        header = self._read_header()
+        if header is None:
+            return None
+
+        stat = self.dict_path.stat()
+        if header["size"] != stat.st_size or header["mtime_ns"] != stat.st_mtime_ns:
+            if header["sha256"] != self._file_digest():
+                return None
+
+        data_start = self._data_start(header.pop("header_len"))
+        layout = {name: (data_start + offset, size) 
+                  for name, (offset, size) in header["layout"].items()}
+        matcher = CompiledTrieMatcher.open(str(self.path), layout, min_word_size)
+        return matcher, header
+
+
+    def build(self, dictionary: Set[str], trie: TrieMatcher) -> dict:
+        """
+        Компилирует дерево и записывает кэш (через временный файл, чтобы параллельные
+        запуски не прочитали недописанный кэш)
+
+        Аргументы:
+            dictionary (set[str]): словарь, загруженный из dict_path
+            trie (TrieMatcher): построенное по нему префиксное дерево
+
+        Возвращает:
+            dict: заголовок кэша (сведения о словаре)
+        """
+        arrays = trie.compile()
+        stat = self.dict_path.stat()
+
+        header = {"version": self.VERSION,
+                  "byteorder": sys.byteorder,
+                  "size": stat.st_size,
+                  "mtime_ns": stat.st_mtime_ns,
+                  "sha256": self._file_digest(),
+                  "fingerprint": self.fingerprint(dictionary),
+                  "max_word_length": max(map(len, dictionary)),
+                  "length_histogram": self.length_histogram(dictionary)}
+
+        # смещения массивов -- от начала области данных, которая идёт сразу после заголовка
+        header["layout"] = {}
+        offset = 0
+        for name, values in arrays.items():
+            size = len(values) * values.itemsize
+            header["layout"][name] = [offset, size]
+            offset = self._align(offset + size)
+
+        header_bytes = self._dump(header)
+        data_start = self._data_start(len(header_bytes))
+        tmp_path = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.MAGIC)
+            f.write(len(header_bytes).to_bytes(4, "little"))
+            f.write(header_bytes)
+            for name, values in arrays.items():
+                f.seek(data_start + header["layout"][name][0])
+                values.tofile(f)
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, self.path)
+
+        return header
+
+
+    @staticmethod
+    def fingerprint(dictionary: Set[str]) -> str:
+        """
+        Отпечаток (sha256) словаря, не зависящий от порядка слов в файле
+        """
+        return hashlib.sha256("\n".join(sorted(dictionary)).encode("utf-8")).hexdigest()
+
+
+    @staticmethod
+    def length_histogram(dictionary: Set[str]) -> Dict[int, int]:
+        """
+        Сколько в словаре слов каждой длины
+        """
+        return dict(sorted(Counter(map(len, dictionary)).items()))
+
+
+    def _read_header(self) -> Optional[dict]:
+        try:
+            with open(self.path, "rb") as f:
+                if f.read(len(self.MAGIC)) != self.MAGIC:
+                    return None
+                header_len = int.from_bytes(f.read(4), "little")
+                header = json.loads(f.read(header_len).decode("utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        if header.get("version") != self.VERSION or header.get("byteorder") != sys.byteorder:
+            return None
+        header["header_len"] = header_len
+        # ключи JSON -- строки
+        header["length_histogram"] = {int(length): count
+                                      for length, count in header["length_histogram"].items()}
+        return header
+
+
+    def _file_digest(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.dict_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+    @staticmethod
+    def _dump(header: dict) -> bytes:
+        return json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+
+    def _data_start(self, header_len: int) -> int:
+        return self._align(len(self.MAGIC) + 4 + header_len)
+
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + 7) // 8 * 8
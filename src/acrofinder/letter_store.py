@@ -0,0 +1,236 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .matcher import ALPHABET
+from .normalizer import OffsetMap
+
+
+# буква -> однобайтовый код 1..len(ALPHABET) и обратно (первые буквы -- только из ALPHABET)
+_ENCODE = str.maketrans(ALPHABET, "".join(chr(code) for code in range(1, len(ALPHABET) + 1)))
+_DECODE = str.maketrans("".join(chr(code) for code in range(1, len(ALPHABET) + 1)), ALPHABET)
+
+# что сохраняется для текста: (число символов исходного текста, карта удалений,
+# уровень -> (первые буквы, позиции начала единиц в нормализованном тексте))
+Streams = Tuple[int, OffsetMap, Dict[str, Tuple[str, array]]]
+
+
+class LetterStreamStore:
+    """
+    Хранилище извлечённых из текстов последовательностей первых букв: то, что
+    зависит только от текста и уровня (нормализация и разбор на единицы), а не
+    от словаря и параметров поиска. При повторных прогонах по тому же корпусу
+    с другим словарём, min_word_size или custom_dict_search текст не разбирается
+    заново, а исходный текст открывается, только если нужен context находок.
+
+    Каждый текст хранится в отдельном файле <sha256 текста>.letters (тексты с
+    одинаковым содержимым -- в одном файле): MAGIC, длина заголовка (4 байта),
+    заголовок в JSON, массивы (с границы, кратной 8 байтам; буквы -- по байту на
+    букву). Какой файл относится к какому документу, записано в index.jsonl:
+    путь (и член архива или id записи), размер и время изменения файла, хэш
+    текста. Записи дописываются в конец одним вызовом write, так что файл
+    можно пополнять из нескольких процессов
+    """
+
+    MAGIC = b"ACROLTRS"
+    # меняется вместе с правилами нормализации и разбора на единицы
+    VERSION = 1
+    SUFFIX = ".letters"
+    INDEX = "index.jsonl"
+
+    def __init__(self, directory: Path) -> None:
+        """
+        Аргументы:
+            directory (Path): директория хранилища (создаётся, если её нет)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index: Optional[Dict[str, dict]] = None
+
+
+    def __getstate__(self) -> dict:
+        # индекс каждый процесс читает сам
+        return {"directory": self.directory, "_index": None}
+
+
+    def lookup(self, path: Path, member: Optional[str], levels: List[str]) -> Optional[Streams]:
+        """
+        Сохранённые последовательности документа, если файл не менялся с тех пор и
+        в них есть все уровни levels, иначе None
+
+        Аргументы:
+            path (Path): файл документа (или архив, файл корпуса)
+            member (str, optional): член архива или id записи
+            levels [str, ...]: нужные уровни
+        """
+        if not self.known(path, member):
+            return None
+        return self.load(self.index[self._key(path, member)]["digest"], levels)
+
+
+    def known(self, path: Path, member: Optional[str] = None) -> bool:
+        """
+        Есть ли в индексе запись о документе, совпадающая с файлом по размеру и 
+        времени изменения (без чтения сохранённых букв)
+        """
+        record = self.index.get(self._key(path, member))
+        if record is None:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns
+
+
+    def load(self, digest: str, levels: List[str]) -> Optional[Streams]:
+        """
+        Последовательности текста с хэшем digest (None, если нет файла или в нём
+        нет какого-то из уровней levels)
+        """
+        try:
+            with open(self._path(digest), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return self._read(buffer, levels)
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+    def save(self, path: Path, member: Optional[str], text: str, chars: int, offsets: OffsetMap,
+             streams: Dict[str, Tuple[str, array]]) -> str:
+        """
+        Сохраняет последовательности текста и запись о документе в индексе. Уровни,
+        которые уже были сохранены для этого текста, но не переданы сейчас, остаются
+
+        Аргументы:
+            path (Path), member (str, optional): документ, как в lookup
+            text (str): исходный текст (по нему считается хэш)
+            chars (int): число символов исходного текста
+            offsets (OffsetMap): карта удалений при нормализации
+            streams (dict): уровень -> (первые буквы, позиции начала единиц)
+
+        Возвращает:
+            str: хэш текста
+        """
+        stat = path.stat()
+        digest = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+        stored = self.load(digest, [])
+        if stored is not None:
+            streams = {**stored[2], **streams}
+        self._write(digest, chars, offsets, streams)
+
+        record = {"path": self._key(path, member),
+                  "size": stat.st_size,
+                  "mtime_ns": stat.st_mtime_ns,
+                  "digest": digest}
+        self.index[record["path"]] = record
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.directory / self.INDEX, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return digest
+
+
+    @property
+    def index(self) -> Dict[str, dict]:
+        if self._index is None:
+            self._index = {}
+            index_path = self.directory / self.INDEX
+            if index_path.exists():
+                with open(index_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        self._index[record["path"]] = record
+        return self._index
+
+
+    def _read(self, buffer: mmap.mmap, levels: List[str]) -> Optional[Streams]:
+        if buffer[:len(self.MAGIC)] != self.MAGIC:
+            return None
+        header_len = int.from_bytes(buffer[len(self.MAGIC):len(self.MAGIC) + 4], "little")
+        header = json.loads(buffer[len(self.MAGIC) + 4:len(self.MAGIC) + 4 + header_len].decode("utf-8"))
+        if header["version"] != self.VERSION or header["byteorder"] != sys.byteorder:
+            return None
+        if not set(levels) <= set(header["levels"]):
+            return None
+
+        data_start = self._align(len(self.MAGIC) + 4 + header_len)
+
+        def integers(name: str) -> array:
+            offset, size = header["layout"][name]
+            values = array('q')
+            values.frombytes(buffer[data_start + offset:data_start + offset + size])
+            return values
+
+        offsets = OffsetMap()
+        offsets.positions = integers("offset_positions")
+        offsets.shifts = integers("offset_shifts")
+
+        streams = {}
+        for level in header["levels"]:
+            offset, size = header["layout"][f"{level}_letters"]
+            letters = buffer[data_start + offset:data_start + offset + size].decode("latin-1").translate(_DECODE)
+            streams[level] = (letters, integers(f"{level}_starts"))
+        return header["chars"], offsets, streams
+
+
+    def _write(self, digest: str, chars: int, offsets: OffsetMap,
+               streams: Dict[str, Tuple[str, array]]) -> None:
+        arrays = {"offset_positions": offsets.positions.tobytes(),
+                  "offset_shifts": offsets.shifts.tobytes()}
+        for level, (letters, starts) in streams.items():
+            arrays[f"{level}_letters"] = letters.translate(_ENCODE).encode("latin-1")
+            arrays[f"{level}_starts"] = starts.tobytes()
+
+        header = {"version": self.VERSION,
+                  "byteorder": sys.byteorder,
+                  "chars": chars,
+                  "levels": sorted(streams),
+                  "layout": {}}
+        offset = 0
+        for name, values in arrays.items():
+            header["layout"][name] = [offset, len(values)]
+            offset = self._align(offset + len(values))
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = self._align(len(self.MAGIC) + 4 + len(header_bytes))
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.MAGIC)
+            f.write(len(header_bytes).to_bytes(4, "little"))
+            f.write(header_bytes)
+            for name, values in arrays.items():
+                f.seek(data_start + header["layout"][name][0])
+                f.write(values)
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+
+    def _path(self, digest: str) -> Path:
+        # по подпапке на первые два символа хэша, чтобы не складывать десятки тысяч
+        # файлов в одну директорию
+        return self.directory / digest[:2] / (digest + self.SUFFIX)
+
+
+    @staticmethod
+    def _key(path: Path, member: Optional[str] = None) -> str:
+        key = str(path.resolve())
+        return key if member is None else f"{key}::{member}"
+
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + 7) // 8 * 8
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+class ScanManifest:
+    """
+    Манифест инкрементального сканирования директории: для каждого файла хранит
+    размер, время изменения, отпечаток конфигурации сканирования и путь к
+    сохранённым результатам. Лежит в output_dir в формате JSON Lines, новые записи
+    дописываются в конец сразу после сканирования файла (последняя запись по
+    файлу главнее), так что прерванный прогон не теряет уже сделанную работу.
+    При загрузке манифест сжимается: устаревшие записи и недописанные строки 
+    выбрасываются, чтобы он не рос с каждым прогоном
+    """
+
+    FILENAME = "manifest.jsonl"
+    RESULTS_DIRNAME = "scanned_files"
+    # меняется, когда меняется смысл сохранённых результатов (2 -- start_pos 
+    # отсчитывается от исходного текста, а не от нормализованного)
+    RESULTS_VERSION = 2
+
+    def __init__(self, output_dir: Path) -> None:
+        """
+        Загружает манифест из output_dir (если он там есть)
+
+        Аргументы:
+            output_dir (Path): директория результатов BatchScanner
+        """
+        self.path = output_dir / self.FILENAME
+        self.results_dir = output_dir / self.RESULTS_DIRNAME
+        self.records: Dict[str, dict] = {}
+
+        if self.path.exists():
+            lines = 0
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # недописанная строка, если прошлый прогон был прерван
+                        continue
+                    self.records[record["path"]] = record
+            if lines > len(self.records):
+                self._compact()
+
+
+    def lookup(self, file_path: Path, config_fingerprint: str,
+               member: Optional[str] = None) -> Optional[dict]:
+        """
+        Возвращает запись о файле, если он не менялся с прошлого сканирования,
+        сканировался с той же конфигурацией и его результаты на месте, иначе None.
+        Для текста внутри архива file_path -- архив, member -- путь внутри него
+        (текст считается изменившимся, если изменился архив)
+        """
+        record = self.records.get(self._key(file_path, member))
+        if record is None or record["config"] != config_fingerprint:
+            return None
+
+        try:
+            stat = file_path.stat()
+        except OSError:
+            # файл удалили (или он стал недоступен) после того, как его нашли
+            return None
+        if record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        if not (self.results_dir / record["results"]).exists():
+            return None
+
+        return record
+
+
+    def load_results(self, record: dict) -> pd.DataFrame:
+        """
+        Читает сохранённые результаты файла
+        """
+        df = pd.read_csv(self.results_dir / record["results"], encoding='utf-8',
+                         keep_default_na=False)
+        if 'neighbour' in df.columns:
+            df['neighbour'] = df['neighbour'].replace('', None)
+        return df
+
+
+    def save(self, file_path: Path, config_fingerprint: str,
+             df: pd.DataFrame, chars: int, member: Optional[str] = None) -> None:
+        """
+        Сохраняет результаты файла (или члена архива member) и дописывает о нём 
+        запись в манифест
+        """
+        key = self._key(file_path, member)
+        results_name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + ".csv"
+
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.results_dir / (results_name + ".tmp")
+        df.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, self.results_dir / results_name)
+
+        stat = file_path.stat()
+        record = {"path": key,
+                  "size": stat.st_size,
+                  "mtime_ns": stat.st_mtime_ns,
+                  "config": config_fingerprint,
+                  "results": results_name,
+                  "chars": chars,
+                  "candidates": len(df)}
+        self.records[key] = record
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+
+    def _compact(self) -> None:
+        """
+        Переписывает манифест: по одной, последней, записи на файл
+        """
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+    @staticmethod
+    def config_fingerprint(dictionary_fingerprint: str, config: dict) -> str:
+        """
+        Отпечаток конфигурации сканирования: словарь + параметры сканера и сканирования
+        """
+        payload = json.dumps({"dictionary": dictionary_fingerprint,
+                              "results_version": ScanManifest.RESULTS_VERSION, **config},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+    @staticmethod
+    def _key(file_path: Path, member: Optional[str] = None) -> str:
+        key = str(file_path.resolve())
+        return key if member is None else f"{key}::{member}"
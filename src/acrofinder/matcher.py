@@ -0,0 +1,650 @@
+import mmap
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+# ключ-маркер конца слова в узле префиксного дерева (буквы всегда непустые)
+_END = ''
+
+# буквы, которые могут встретиться в последовательности первых букв (в нижнем регистре)
+ALPHABET = 'abcdefghijklmnopqrstuvwxyzабвгдежзийклмнопрстуфхцчшщъыьэюяё'
+
+
+class _EncodeTable(dict):
+    """
+    Таблица для str.translate: буква -> однобайтовый код 1..len(ALPHABET), 
+    остальные символы -> 0 (такого кода нет ни у одной буквы слов словаря)
+    """
+    def __missing__(self, key: int) -> str:
+        return '\0'
+
+
+_ENCODE_TABLE = _EncodeTable(str.maketrans({letter: chr(code) for code, letter in enumerate(ALPHABET, 1)}))
+_CODE_BYTES = [bytes([code]) for code in range(256)]
+_DECODE_TABLE = str.maketrans({chr(code): letter for code, letter in enumerate(ALPHABET, 1)})
+
+
+class TrieMatcher:
+    """
+    Движок поиска словарных слов в последовательности букв на основе
+    префиксного дерева (trie)
+    """
+
+    def __init__(self, dictionary: Set[str], min_word_size: int) -> None:
+        """
+        Строит префиксное дерево по всем словам словаря
+
+        Аргументы:
+            dictionary (set[str]): множество словоформ
+            min_word_size (int): минимальная длина слова, которое попадает в результаты
+        """
+        self.min_word_size = min_word_size
+        self.root: Dict[str, dict] = {}
+        # сколько префиксов проверено при поиске (для статистики сканирования, см. ScanStats)
+        self.probes = 0
+
+        for word in dictionary:
+            node = self.root
+            for letter in word:
+                node = node.setdefault(letter, {})
+            node[_END] = True
+
+
+    def find_all(self, letters: Sequence[str], begin: int = 0, end: Optional[int] = None,
+                 min_size: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Проходит по последовательности букв и для каждой позиции спускается по дереву,
+        пока сочетание остаётся префиксом какого-либо слова из словаря. Отдаёт пары
+        (позиция начала, длина) для всех словарных слов длины >= min_word_size
+        в порядке возрастания позиции, а для одной позиции -- в порядке возрастания длины.
+        Если заданы begin/end, слова ищутся только с начальных позиций из [begin, end)
+        (сами слова могут заходить за end). min_size заменяет min_word_size (например, 
+        для поиска коротких соседних слов)
+        """
+        root = self.root
+        min_word_size = self.min_word_size if min_size is None else min_size
+        letters_count = len(letters)
+        if end is None:
+            end = letters_count
+
+        probes = 0
+        for start in range(begin, end):
+            node = root
+            for last in range(start, letters_count):
+                node = node.get(letters[last])
+                if node is None:
+                    break
+                length = last - start + 1
+                if length >= min_word_size and _END in node:
+                    yield start, length
+            probes += last - start + 1
+        self.probes += probes
+
+
+    def contains(self, word: str) -> bool:
+        """
+        Есть ли слово в словаре
+        """
+        node = self.root
+        for letter in word:
+            node = node.get(letter)
+            if node is None:
+                return False
+        return _END in node
+
+
+    def compile(self) -> Dict[str, array]:
+        """
+        Укладывает дерево в плоские массивы (обход в ширину, узел 0 -- корень):
+          - first_edge[i]..first_edge[i+1] -- рёбра узла i;
+          - edge_letters[e] -- код буквы ребра (рёбра узла отсортированы по коду);
+          - targets[e] -- узел, в который ведёт ребро;
+          - terminal[i] -- 1, если на узле i заканчивается слово.
+        Слова с символами не из ALPHABET в массивы не попадают: среди первых букв 
+        их всё равно не найти
+        """
+        first_edge = array('i', [0])
+        edge_letters = array('B')
+        targets = array('i')
+        terminal = array('B')
+
+        queue = [self.root]
+        for node in queue:
+            terminal.append(1 if _END in node else 0)
+            children = sorted((ALPHABET.index(letter) + 1, child) for letter, child in node.items()
+                              if letter != _END and letter in ALPHABET)
+            for code, child in children:
+                edge_letters.append(code)
+                targets.append(len(queue))
+                queue.append(child)
+            first_edge.append(len(edge_letters))
+
+        return {"first_edge": first_edge, "targets": targets, 
+                "edge_letters": edge_letters, "terminal": terminal}
+
+
+class CompiledTrieMatcher:
+    """
+    То же префиксное дерево, что и TrieMatcher, но уложенное в плоские массивы 
+    (см. TrieMatcher.compile), которые читаются прямо из файла кэша словаря через mmap: 
+    загрузка почти мгновенная, а процессы-воркеры делят одни и те же страницы памяти
+    """
+
+    def __init__(self, buffer, layout: Dict[str, Tuple[int, int]], min_word_size: int,
+                 path: Optional[str] = None) -> None:
+        """
+        Аргументы:
+            buffer: mmap (или bytes) с массивами
+            layout (dict): имя массива -> (смещение в buffer, длина в байтах)
+            min_word_size (int): минимальная длина слова, которое попадает в результаты
+            path (str, optional): файл, из которого открыт buffer (нужен, чтобы передать 
+            сканер в другой процесс без копирования массивов)
+        """
+        self.min_word_size = min_word_size
+        self.path = path
+        # сколько префиксов проверено при поиске (см. TrieMatcher)
+        self.probes = 0
+        self._buffer = buffer
+        self._layout = layout
+
+        view = memoryview(buffer)
+        def part(name: str, fmt: str) -> memoryview:
+            offset, size = layout[name]
+            return view[offset:offset + size].cast(fmt)
+
+        self.first_edge = part("first_edge", 'i')
+        self.targets = part("targets", 'i')
+        self.terminal = part("terminal", 'B')
+        # поиск буквы среди рёбер узла -- через find самого буфера (в C)
+        self._edges_offset = layout["edge_letters"][0]
+        # последняя закодированная последовательность (find_all часто вызывается 
+        # много раз подряд по одной и той же строке букв)
+        self._last_letters = None
+        self._last_codes = b''
+
+
+    @classmethod
+    def open(cls, path: str, layout: Dict[str, Tuple[int, int]], 
+             min_word_size: int) -> "CompiledTrieMatcher":
+        """
+        Отображает файл с массивами в память (только для чтения)
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, layout, min_word_size, path)
+
+
+    def __getstate__(self) -> dict:
+        # memoryview не сериализуется: передаём путь к файлу (или сами байты)
+        state = {"layout": self._layout, "min_word_size": self.min_word_size, "path": self.path}
+        if self.path is None:
+            state["buffer"] = bytes(self._buffer)
+        return state
+
+
+    def __setstate__(self, state: dict) -> None:
+        if state["path"] is None:
+            restored = CompiledTrieMatcher(state["buffer"], state["layout"], state["min_word_size"])
+        else:
+            restored = self.open(state["path"], state["layout"], state["min_word_size"])
+        self.__dict__.update(restored.__dict__)
+
+
+    def find_all(self, letters: Sequence[str], begin: int = 0, end: Optional[int] = None,
+                 min_size: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        То же, что TrieMatcher.find_all
+        """
+        if letters is not self._last_letters:
+            self._last_letters = letters
+            self._last_codes = self._encode(letters)
+        codes = self._last_codes
+        min_word_size = self.min_word_size if min_size is None else min_size
+        letters_count = len(codes)
+        if end is None:
+            end = letters_count
+
+        find = self._buffer.find
+        code_bytes = _CODE_BYTES
+        first_edge = self.first_edge
+        targets = self.targets
+        terminal = self.terminal
+        edges_offset = self._edges_offset
+
+        probes = 0
+        for start in range(begin, end):
+            node = 0
+            for last in range(start, letters_count):
+                edge = find(code_bytes[codes[last]], edges_offset + first_edge[node], 
+                            edges_offset + first_edge[node + 1])
+                if edge < 0:
+                    break
+                node = targets[edge - edges_offset]
+                length = last - start + 1
+                if length >= min_word_size and terminal[node]:
+                    yield start, length
+            probes += last - start + 1
+        self.probes += probes
+
+
+    def contains(self, word: str) -> bool:
+        """
+        Есть ли слово в словаре (среди слов из букв ALPHABET)
+        """
+        find = self._buffer.find
+        node = 0
+        for code in self._encode(word):
+            edge = find(_CODE_BYTES[code], self._edges_offset + self.first_edge[node], 
+                        self._edges_offset + self.first_edge[node + 1])
+            if edge < 0:
+                return False
+            node = self.targets[edge - self._edges_offset]
+        return bool(self.terminal[node])
+
+
+    @staticmethod
+    def _encode(letters: Sequence[str]) -> bytes:
+        if not isinstance(letters, str):
+            letters = "".join(letters)
+        return letters.translate(_ENCODE_TABLE).encode('latin-1')
+
+
+class SortedWords:
+    """
+    Отсортированный набор слов без повторов в одном буфере: буквы закодированы 
+    по байту (коды 1..len(ALPHABET), порядок кодов совпадает с порядком букв в 
+    Unicode), границы слов -- в массиве смещений. На слово уходит его длина в 
+    байтах плюс 8 байт смещения, а не сотня байт, как у str в set. Поиск -- 
+    двоичный, по закодированным словам
+    """
+
+    def __init__(self, codes: Iterable[bytes]) -> None:
+        """
+        Аргументы:
+            codes: закодированные слова (в любом порядке, с повторами)
+        """
+        codes = sorted(set(codes))
+        self.buffer = b"".join(codes)
+        self.offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, codes), dtype=np.int64, count=len(codes)), out=self.offsets[1:])
+
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> "SortedWords":
+        """
+        Набор из слов словаря. Слова с символами не из ALPHABET пропускаются: среди 
+        первых букв их всё равно не найти
+        """
+        return cls(codes for codes in map(cls.encode, words) if codes and b"\0" not in codes)
+
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]]
+
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self.decode(self[i])
+
+
+    def __contains__(self, codes: bytes) -> bool:
+        i = self.find(codes)
+        return i < len(self) and self[i] == codes
+
+
+    def find(self, codes: bytes) -> int:
+        """
+        Номер первого слова, которое не меньше codes (len(self), если таких нет)
+        """
+        return bisect_left(self, codes)
+
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+    def compile(self) -> Dict[str, array]:
+        """
+        Префиксное дерево слов в тех же плоских массивах, что и TrieMatcher.compile 
+        (узлы в порядке обхода в ширину, рёбра узла -- по возрастанию кода), но без 
+        построения дерева из dict: узлы глубины d -- это различные префиксы длины d, 
+        а в отсортированном наборе слово начинает новый узел глубины d, если его 
+        первые d букв не совпадают с первыми d буквами предыдущего слова. Всё 
+        считается на NumPy по глубинам, память -- несколько массивов по числу слов
+        """
+        letters = np.frombuffer(self.buffer, dtype=np.uint8)
+        starts = self.offsets[:-1]
+        lengths = self.lengths()
+
+        # узел глубины d, которому принадлежит слово (на глубине 0 -- корень)
+        node_of_word = np.zeros(len(self), dtype=np.int64)
+        # совпадают ли первые d букв слова с первыми d буквами предыдущего
+        same = np.ones(len(self), dtype=bool)
+        if len(self):
+            same[0] = False
+        alive = np.arange(len(self))
+
+        node_count = 1
+        parents, edge_letters, terminal = [], [], [np.zeros(1, dtype=np.uint8)]
+        depth = 0
+        while True:
+            alive = alive[lengths[alive] > depth]
+            if not len(alive):
+                break
+            letter = letters[starts[alive] + depth]
+            previous = np.maximum(alive - 1, 0)
+            previous_letter = letters[starts[previous] + np.minimum(depth, lengths[previous] - 1)]
+            same[alive] &= (lengths[previous] > depth) & (previous_letter == letter)
+            new = ~same[alive]
+
+            parents.append(node_of_word[alive[new]])
+            edge_letters.append(letter[new])
+            terminal.append((lengths[alive[new]] == depth + 1).astype(np.uint8))
+            node_of_word[alive] = node_count + np.cumsum(new) - 1
+            node_count += int(new.sum())
+            depth += 1
+
+        parents = np.concatenate(parents) if parents else np.zeros(0, dtype=np.int64)
+        first_edge = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(parents, minlength=node_count), out=first_edge[1:])
+
+        return {"first_edge": array('i', first_edge.astype(np.int32).tobytes()),
+                "targets": array('i', np.arange(1, node_count, dtype=np.int32).tobytes()),
+                "edge_letters": array('B', np.concatenate([np.zeros(0, dtype=np.uint8)] + edge_letters).tobytes()),
+                "terminal": array('B', np.concatenate(terminal).tobytes())}
+
+
+    @staticmethod
+    def encode(word: str) -> bytes:
+        return word.translate(_ENCODE_TABLE).encode('latin-1')
+
+
+    @staticmethod
+    def decode(codes: bytes) -> str:
+        return codes.decode('latin-1').translate(_DECODE_TABLE)
+
+
+class CompactTrieMatcher(CompiledTrieMatcher):
+    """
+    Префиксное дерево в плоских массивах (как CompiledTrieMatcher), построенное в 
+    памяти прямо из отсортированного словаря (SortedWords.compile), без дерева из 
+    dict, которое для словарей в миллионы словоформ занимает гигабайты
+    """
+
+    def __init__(self, dictionary: Iterable[str], min_word_size: int) -> None:
+        """
+        Аргументы:
+            dictionary: словоформы (или уже готовые SortedWords)
+            min_word_size (int): минимальная длина слова, которое попадает в результаты
+        """
+        words = dictionary if isinstance(dictionary, SortedWords) else SortedWords.from_words(dictionary)
+        arrays = words.compile()
+
+        layout = {}
+        offset = 0
+        for name, values in arrays.items():
+            size = len(values) * values.itemsize
+            layout[name] = (offset, size)
+            # массивы 'i' -- с границы, кратной 4 байтам
+            offset = (offset + size + 7) // 8 * 8
+        buffer = bytearray(offset)
+        for name, values in arrays.items():
+            start, size = layout[name]
+            buffer[start:start + size] = values.tobytes()
+        super().__init__(bytes(buffer), layout, min_word_size)
+
+
+class VectorMatcher:
+    """
+    Движок поиска на NumPy: буквы кодируются числами 1..len(ALPHABET) (6 бит на букву), 
+    для каждой длины слова из словаря сразу для всех позиций считаются коды сочетаний 
+    (по 10 букв в одном uint64) и ищутся бинарным поиском в отсортированных кодах слов 
+    словаря этой длины. Python-объекты создаются только для найденных слов.
+
+    Последовательность букв обрабатывается блоками по BLOCK_SIZE позиций; последние 
+    блоки запоминаются, так что частые запросы по одной позиции (поиск соседей) 
+    тоже считаются пачками
+    """
+
+    BLOCK_SIZE = 1 << 14
+    # сколько блоков с найденными словами помнить
+    CACHED_BLOCKS = 8
+    # букв в одном коде: 10 * 6 бит <= 64
+    CHUNK = 10
+    BITS = 6
+    # по скольким первым буквам отсеиваются позиции до бинарного поиска
+    PREFIX = 3
+
+    def __init__(self, dictionary: Set[str], min_word_size: int) -> None:
+        """
+        Раскладывает словарь по длинам слов и для каждой длины готовит отсортированные 
+        коды слов. Слова с символами не из ALPHABET пропускаются: среди первых букв 
+        их всё равно не найти
+
+        Аргументы:
+            dictionary (set[str]): множество словоформ
+            min_word_size (int): минимальная длина слова, которое попадает в результаты
+        """
+        self.min_word_size = min_word_size
+        # сколько префиксов проверено при поиске (по позиции на каждую длину, см. TrieMatcher)
+        self.probes = 0
+
+        by_length: Dict[int, List[bytes]] = {}
+        for word in dictionary:
+            codes = self._encode(word)
+            if word and 0 not in codes:
+                by_length.setdefault(len(codes), []).append(codes)
+
+        # длина -> отсортированные коды первых CHUNK букв слов этой длины
+        self.first_chunks: Dict[int, np.ndarray] = {}
+        # длина -> отсортированные строки кодов всех кусков (для слов длиннее CHUNK)
+        self.rows: Dict[int, np.ndarray] = {}
+        for length, words in by_length.items():
+            letters = np.frombuffer(b"".join(words), dtype=np.uint8).reshape(len(words), length)
+            chunks = self._word_chunks(letters)
+            self.first_chunks[length] = np.unique(chunks[:, 0])
+            if chunks.shape[1] > 1:
+                self.rows[length] = np.unique(self._as_rows(chunks))
+        self.lengths = sorted(self.first_chunks)
+        self.max_length = self.lengths[-1] if self.lengths else 0
+
+        # фильтр по первым PREFIX буквам: код начала -> битовая маска длин слов словаря, 
+        # которые так начинаются (бинарный поиск нужен только там, где бит длины есть);
+        # слова короче PREFIX проверяются прямо по таблице всех кодов такой длины
+        self.prefix_lengths = np.zeros(1 << (self.BITS * self.PREFIX), dtype=np.uint64)
+        self.short_words: Dict[int, np.ndarray] = {}
+        for length, first_chunks in self.first_chunks.items():
+            if length < self.PREFIX:
+                self.short_words[length] = np.zeros(1 << (self.BITS * length), dtype=bool)
+                self.short_words[length][first_chunks] = True
+            elif length < 64:
+                shift = np.uint64(self.BITS * (min(length, self.CHUNK) - self.PREFIX))
+                np.bitwise_or.at(self.prefix_lengths, (first_chunks >> shift).astype(np.intp), 
+                                 np.uint64(1 << length))
+
+        self._reset_cache()
+
+
+    def __getstate__(self) -> dict:
+        # кэш блоков привязан к строке букв этого процесса
+        state = self.__dict__.copy()
+        for name in ("_last_letters", "_last_codes", "_blocks"):
+            state.pop(name)
+        return state
+
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._reset_cache()
+
+
+    def find_all(self, letters: Sequence[str], begin: int = 0, end: Optional[int] = None,
+                 min_size: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        То же, что TrieMatcher.find_all
+        """
+        if letters is not self._last_letters:
+            self._reset_cache()
+            self._last_letters = letters
+            self._last_codes = np.frombuffer(self._encode(letters), dtype=np.uint8)
+        codes = self._last_codes
+        min_word_size = self.min_word_size if min_size is None else min_size
+        if end is None:
+            end = len(codes)
+
+        block_size = self.BLOCK_SIZE
+        for block in range(begin // block_size, (end - 1) // block_size + 1 if end > begin else 0):
+            starts, lengths = self._block_hits(codes, block, min_word_size)
+            block_begin = block * block_size
+            first = bisect_left(starts, begin) if begin > block_begin else 0
+            last = bisect_left(starts, end) if end < block_begin + block_size else len(starts)
+            for i in range(first, last):
+                yield starts[i], lengths[i]
+
+
+    def contains(self, word: str) -> bool:
+        """
+        Есть ли слово в словаре (среди слов из букв ALPHABET)
+        """
+        codes = self._encode(word)
+        length = len(codes)
+        if length not in self.first_chunks or 0 in codes:
+            return False
+        chunks = self._word_chunks(np.frombuffer(codes, dtype=np.uint8).reshape(1, length))
+        if length in self.rows:
+            return bool(self._isin(self._as_rows(chunks), self.rows[length])[0])
+        return bool(self._isin(chunks[:, 0], self.first_chunks[length])[0])
+
+
+    def _block_hits(self, codes: np.ndarray, block: int, min_size: int) -> Tuple[list, list]:
+        """
+        Все словарные слова длины >= min_size, начинающиеся в позициях блока: 
+        (позиции начала, длины), упорядоченные по позиции, затем по длине
+        """
+        key = (block, min_size)
+        hits = self._blocks.get(key)
+        if hits is not None:
+            self._blocks.move_to_end(key)
+            return hits
+
+        block_begin = block * self.BLOCK_SIZE
+        block_end = min(block_begin + self.BLOCK_SIZE, len(codes))
+        window = codes[block_begin:block_end + self.max_length - 1].astype(np.uint64)
+        prefixes = self._prefix_codes(window)
+
+        prefix_lengths = self.prefix_lengths[prefixes[self.PREFIX].astype(np.intp)]
+
+        found_starts = []
+        found_lengths = []
+        for length in self.lengths:
+            if length < min_size:
+                continue
+            count = min(block_end - block_begin, len(window) - length + 1)
+            if count <= 0:
+                break
+            self.probes += count
+            if length < self.PREFIX:
+                positions = np.flatnonzero(self.short_words[length][prefixes[length][:count].astype(np.intp)])
+                found_starts.append(positions)
+                found_lengths.append(np.full(len(positions), length))
+                continue
+
+            if length < 64:
+                positions = np.flatnonzero(prefix_lengths[:count] & np.uint64(1 << length))
+            else:
+                positions = np.arange(count)
+            full, rest = divmod(length, self.CHUNK)
+            if length > self.PREFIX and len(positions):
+                first = prefixes[min(length, self.CHUNK)][positions]
+                positions = positions[self._isin(first, self.first_chunks[length])]
+            if length in self.rows and len(positions):
+                chunks = [prefixes[self.CHUNK][positions + i * self.CHUNK] for i in range(full)]
+                if rest:
+                    chunks.append(prefixes[rest][positions + full * self.CHUNK])
+                rows = self._as_rows(np.stack(chunks, axis=1))
+                positions = positions[self._isin(rows, self.rows[length])]
+            found_starts.append(positions)
+            found_lengths.append(np.full(len(positions), length))
+
+        if found_starts:
+            starts = np.concatenate(found_starts)
+            lengths = np.concatenate(found_lengths)
+            order = np.lexsort((lengths, starts))
+            hits = ((starts[order] + block_begin).tolist(), lengths[order].tolist())
+        else:
+            hits = ([], [])
+
+        self._blocks[key] = hits
+        if len(self._blocks) > self.CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return hits
+
+
+    def _prefix_codes(self, window: np.ndarray) -> List[np.ndarray]:
+        """
+        prefixes[l][i] -- код букв window[i:i + l] для l = 1..CHUNK 
+        (в конце окна недостающие буквы считаются нулями)
+        """
+        prefixes = [None, window]
+        for length in range(2, self.CHUNK + 1):
+            shifted = np.zeros_like(window)
+            if len(window) >= length:
+                shifted[:len(window) - length + 1] = window[length - 1:]
+            prefixes.append((prefixes[-1] << np.uint64(self.BITS)) | shifted)
+        return prefixes
+
+
+    def _word_chunks(self, letters: np.ndarray) -> np.ndarray:
+        """
+        Коды слов одной длины (матрица букв слов) по кускам из CHUNK букв
+        """
+        length = letters.shape[1]
+        chunks = []
+        for chunk_begin in range(0, length, self.CHUNK):
+            code = np.zeros(letters.shape[0], dtype=np.uint64)
+            for i in range(chunk_begin, min(chunk_begin + self.CHUNK, length)):
+                code = (code << np.uint64(self.BITS)) | letters[:, i].astype(np.uint64)
+            chunks.append(code)
+        return np.stack(chunks, axis=1)
+
+
+    def _reset_cache(self) -> None:
+        self._last_letters = None
+        self._last_codes = np.zeros(0, dtype=np.uint8)
+        self._blocks: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+    @staticmethod
+    def _as_rows(chunks: np.ndarray) -> np.ndarray:
+        """
+        Строки матрицы кодов как одиночные значения (чтобы сортировать и искать целиком)
+        """
+        chunks = np.ascontiguousarray(chunks)
+        return chunks.view(np.dtype((np.void, chunks.dtype.itemsize * chunks.shape[1]))).ravel()
+
+
+    @staticmethod
+    def _isin(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+        """
+        Маска values, которые есть в отсортированном массиве без повторов
+        """
+        index = np.searchsorted(sorted_values, values)
+        np.minimum(index, len(sorted_values) - 1, out=index)
+        return sorted_values[index] == values
+
+
+    @staticmethod
+    def _encode(letters: Sequence[str]) -> bytes:
+        return CompiledTrieMatcher._encode(letters)
+
+
+# доступные движки поиска, выбираются по имени в Scanner(matcher=...)
+MATCHERS = {'trie': TrieMatcher, 'numpy': VectorMatcher, 'compact': CompactTrieMatcher}
@@ -0,0 +1,158 @@
+from typing import Dict, Iterator, Optional
+
+
+class NeighbourIndex:
+    """
+    Таблицы словарных слов, которые начинаются и заканчиваются в каждой позиции
+    последовательности первых букв: позиция -> битовая маска длин слов (бит L -- есть
+    слово длины L). По ним проверка соседей кандидата -- это пара обращений к таблицам
+    вместо побуквенного наращивания строк слева и справа.
+
+    Кандидаты встречаются редко, поэтому таблицы заполняются не сплошным проходом,
+    а по мере надобности: позиция, с которой уже спускались по дереву, больше не
+    проверяется (так у рыб, рыба, рыбак, рыбаки один и тот же сосед слева ищется
+    один раз)
+    """
+
+    def __init__(self, matcher, first_letters: str, shortest: int, longest: int) -> None:
+        """
+        Аргументы:
+            matcher: движок поиска словарных слов (TrieMatcher или CompiledTrieMatcher)
+            first_letters (str): последовательность первых букв
+            shortest (int): минимальная длина соседнего слова
+            longest (int): максимальная длина соседнего слова
+        """
+        self.matcher = matcher
+        self.first_letters = first_letters
+        self.shortest = shortest
+        self.longest = longest
+        self._starting: Dict[int, int] = {}
+        self._ending: Dict[int, int] = {}
+        self._shortest_ending: Dict[int, int] = {}
+
+
+    def find(self, id: int, size: int, words: int = 1) -> Optional[str]:
+        """
+        Ищет соседей кандидата first_letters[id:id + size]
+
+        Аргументы:
+            id (int): позиция первой буквы кандидата
+            size (int): длина кандидата
+            words (int): 1 -- одно соседнее слово (слева или справа, самое короткое,
+            слева в приоритете); 2 -- два соседних слова подряд: одно слева и одно
+            справа, оба слева или оба справа
+
+        Возвращает:
+            str: соседнее слово (для двух слов -- оба через пробел в порядке текста)
+            или None, если подходящих соседей нет
+        """
+        right_start = id + size
+
+        if words == 1:
+            length = self.shortest_ending(id - 1)
+            if length:
+                return self._word_before(id, length)
+            right = self.starting(right_start)
+            if right:
+                return self._word_after(right_start, self._shortest(right))
+            return None
+
+        left = self.ending(id - 1)
+        right = self.starting(right_start)
+        if left and right:
+            return (self._word_before(id, self._shortest(left)) + " " +
+                    self._word_after(right_start, self._shortest(right)))
+
+        for length in self._lengths(left):
+            outer = self.ending(id - 1 - length)
+            if outer:
+                return (self._word_before(id - length, self._shortest(outer)) + " " +
+                        self._word_before(id, length))
+
+        for length in self._lengths(right):
+            outer = self.starting(right_start + length)
+            if outer:
+                return (self._word_after(right_start, length) + " " +
+                        self._word_after(right_start + length, self._shortest(outer)))
+
+        return None
+
+
+    def starting(self, position: int) -> int:
+        """
+        Маска длин словарных слов, начинающихся в position. Слова, доходящие до
+        последней буквы последовательности, не учитываются (так было и при поиске
+        соседа справа побуквенно)
+        """
+        mask = self._starting.get(position)
+        if mask is None:
+            mask = 0
+            letters_count = len(self.first_letters)
+            if 0 <= position < letters_count:
+                for _, length in self.matcher.find_all(self.first_letters, position, position + 1,
+                                                       min_size=self.shortest):
+                    if length > self.longest or position + length >= letters_count:
+                        break
+                    mask |= 1 << length
+            self._starting[position] = mask
+        return mask
+
+
+    def ending(self, position: int) -> int:
+        """
+        Маска длин словарных слов, заканчивающихся в position
+        """
+        mask = self._ending.get(position)
+        if mask is None:
+            mask = 0
+            for length in range(self.shortest, self.longest + 1):
+                if position - length + 1 < 0:
+                    break
+                if self.starting(position - length + 1) >> length & 1:
+                    mask |= 1 << length
+            self._ending[position] = mask
+        return mask
+
+
+    def shortest_ending(self, position: int) -> int:
+        """
+        Длина самого короткого словарного слова, заканчивающегося в position (0 -- таких 
+        нет). В отличие от ending, перебирает длины только до первого найденного слова
+        """
+        length = self._shortest_ending.get(position)
+        if length is None:
+            length = 0
+            mask = self._ending.get(position)
+            if mask is not None:
+                length = self._shortest(mask) if mask else 0
+            else:
+                for candidate in range(self.shortest, min(self.longest, position + 1) + 1):
+                    if self.starting(position - candidate + 1) >> candidate & 1:
+                        length = candidate
+                        break
+            self._shortest_ending[position] = length
+        return length
+
+
+    def _word_before(self, position: int, length: int) -> str:
+        return self.first_letters[position - length:position]
+
+
+    def _word_after(self, position: int, length: int) -> str:
+        return self.first_letters[position:position + length]
+
+
+    @staticmethod
+    def _shortest(mask: int) -> int:
+        return (mask & -mask).bit_length() - 1
+
+
+    @staticmethod
+    def _lengths(mask: int) -> Iterator[int]:
+        """
+        Длины из маски по возрастанию
+        """
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
@@ -0,0 +1,181 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from .tokenizer import LETTERS
+
+
+class OffsetMap:
+    """
+    Соответствие позиций нормализованного текста позициям исходного. Нормализация
+    только удаляет символы (пробелы и дефисы внутри разрядки), поэтому хватает
+    ступенчатой функции: с позиции positions[i] нормализованного текста исходная
+    позиция -- нормализованная плюс shifts[i]. Ступенька добавляется только там,
+    где что-то удалено, так что для обычного текста карта почти пустая
+    """
+
+    def __init__(self) -> None:
+        self.positions = array('q')
+        self.shifts = array('q')
+
+
+    def add(self, position: int, shift: int) -> None:
+        """
+        Начиная с нормализованной позиции position, исходная позиция больше на shift
+        """
+        if self.shifts and self.shifts[-1] == shift:
+            return
+        if not self.shifts and shift == 0:
+            return
+        if self.positions and self.positions[-1] == position:
+            self.shifts[-1] = shift
+            return
+        self.positions.append(position)
+        self.shifts.append(shift)
+
+
+    def to_original(self, position: int) -> int:
+        """
+        Позиция в исходном тексте по позиции в нормализованном
+        """
+        i = bisect_right(self.positions, position) - 1
+        return position + self.shifts[i] if i >= 0 else position
+
+
+    def forget_before(self, position: int) -> None:
+        """
+        Забывает ступеньки, которые уже не нужны для позиций >= position
+        (при потоковом сканировании)
+        """
+        i = bisect_right(self.positions, position) - 1
+        if i > 0:
+            del self.positions[:i]
+            del self.shifts[:i]
+
+
+class Normalizer:
+    """
+    Убирает из текста разрядку пробелами (вот т а к а я) и дефисами (т-а-к-а-я),
+    чтобы буквы разрядки не считались первыми буквами отдельных слов, и запоминает,
+    где что удалено (OffsetMap), чтобы позиции находок можно было отсчитывать
+    от исходного текста.
+
+    Текст проходится одним регулярным выражением, которое находит места, где может 
+    быть разрядка; вокруг каждого берётся цепочка букв через пробелы или дефисы, и 
+    обе замены (сначала пробелы, потом дефисы -- так, как их раньше делали двумя 
+    проходами по всему тексту) применяются только внутри цепочки
+    """
+
+    # затравка: одиночная буква между разделителями, за которой идёт ещё одна буква 
+    # разрядки; внутри любой разрядки (и пробелами, и дефисами) такая есть
+    SEED_PATTERN = re.compile(rf'[\s\-–—][{LETTERS}](?:\s{{1,3}}[{LETTERS}](?!\w)|[-–—])')
+    SPACED_PATTERN = re.compile(rf'\b(?:[{LETTERS}](?:\s{{1,3}}[{LETTERS}]){{2,}})\b')
+    HYPHENATED_PATTERN = re.compile(rf'(?:[{LETTERS}](?:[-–—]{{1,3}}[{LETTERS}]){{2,}})')
+    DASHES = '-–—'
+    LETTER_SET = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+                           'АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдежзийклмнопрстуфхцчшщъыьэюяЁё')
+
+    def normalize(self, text: str, offsets: Optional[OffsetMap] = None,
+                  base: int = 0, original_base: int = 0) -> str:
+        """
+        Нормализует текст
+
+        Аргументы:
+            text (str): исходный текст (или его кусок)
+            offsets (OffsetMap, optional): карта, в которую дописываются удаления
+            base (int): позиция начала нормализованного куска в нормализованном
+            тексте целиком (при потоковом сканировании)
+            original_base (int): позиция начала куска в исходном тексте
+
+        Возвращает:
+            str: нормализованный текст
+        """
+        pieces = []
+        last = 0
+        removed = 0
+        if offsets is not None:
+            offsets.add(base, original_base - base)
+
+        position = 0
+        while True:
+            seed = self.SEED_PATTERN.search(text, position)
+            if seed is None:
+                break
+            start, end = self._chain_around(text, seed.start() + 1)
+            position = end
+            kept = self._kept_positions(text, start, end)
+            if len(kept) == end - start:
+                continue
+
+            pieces.append(text[last:start])
+            pieces.append("".join(text[i] for i in kept))
+            if offsets is not None:
+                normalized_start = base + start - removed
+                for j, i in enumerate(kept):
+                    offsets.add(normalized_start + j, original_base + i - normalized_start - j)
+            removed += end - start - len(kept)
+            last = end
+
+        if not pieces:
+            return text
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+
+    def _chain_around(self, text: str, position: int) -> Tuple[int, int]:
+        """
+        Границы цепочки букв, соединённых 1-3 пробелами или дефисами, в которую 
+        входит буква text[position]: разрядка никогда не выходит за такую цепочку
+        """
+        start = position
+        while True:
+            i = start - 1
+            while i >= 0 and start - i <= 4 and self._is_separator(text[i]):
+                i -= 1
+            if i < 0 or not 1 <= start - 1 - i <= 3 or text[i] not in self.LETTER_SET:
+                break
+            start = i
+
+        end = position + 1
+        while True:
+            i = end
+            while i < len(text) and i - end <= 3 and self._is_separator(text[i]):
+                i += 1
+            if i == len(text) or not 1 <= i - end <= 3 or text[i] not in self.LETTER_SET:
+                break
+            end = i + 1
+
+        return start, end
+
+
+    def _is_separator(self, char: str) -> bool:
+        return char.isspace() or char in self.DASHES
+
+
+    def _kept_positions(self, text: str, start: int, end: int) -> List[int]:
+        """
+        Позиции символов цепочки text[start:end], которые остаются после нормализации
+        """
+        # разрядка пробелами: \b зависит от соседей цепочки, поэтому ищем по всему тексту
+        # (совпадения всё равно не выходят за пределы цепочки)
+        kept = []
+        position = start
+        endpos = min(len(text), end + 1)
+        while position < end:
+            match = self.SPACED_PATTERN.search(text, position, endpos)
+            if match is None or match.start() >= end:
+                break
+            kept.extend(range(position, match.start()))
+            kept.extend(i for i in range(match.start(), match.end()) if text[i] != ' ')
+            position = match.end()
+        kept.extend(range(position, end))
+
+        # разрядка дефисами -- в цепочке после удаления пробелов
+        chain = "".join(text[i] for i in kept)
+        removed = set()
+        for match in self.HYPHENATED_PATTERN.finditer(chain):
+            removed.update(j for j in range(match.start(), match.end()) if chain[j] in self.DASHES)
+        if removed:
+            kept = [i for j, i in enumerate(kept) if j not in removed]
+        return kept
@@ -0,0 +1,221 @@
+import bz2
+import codecs
+import gzip
+import threading
+import tarfile
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# ошибки чтения и распаковки, которые попадают в отчёт, а не роняют сканирование
+READ_ERRORS = (OSError, EOFError, UnicodeDecodeError, zlib.error,
+               zipfile.BadZipFile, tarfile.TarError)
+
+
+@dataclass
+class Document:
+    """
+    Один текст корпуса: файл .txt, сжатый файл (.txt.gz, .txt.bz2), .txt внутри
+    архива (.zip, .tar и сжатые .tar) или запись корпуса в одном файле (см. sources)
+    """
+    # имя в результатах (source_file): имя файла или архив/путь внутри архива
+    name: str
+    # файл на диске (сам текст или архив)
+    path: Path
+    # путь внутри архива или id записи (None -- отдельный файл)
+    member: Optional[str] = None
+    # что не так с архивом или записью, если их не удалось прочитать
+    error: Optional[str] = None
+    # текст записи, уже прочитанный источником
+    text: Optional[str] = None
+    # метаданные записи (столбцы результатов)
+    metadata: Dict[str, Optional[str]] = field(default_factory=dict)
+    # размер в байтах, если известен (для сжатого файла -- размер на диске): по нему 
+    # BatchScanner показывает прогресс
+    size: Optional[int] = None
+
+    @property
+    def in_archive(self) -> bool:
+        return self.member is not None and self.text is None
+
+
+class CorpusReader:
+    """
+    Находит тексты в директории (в том числе внутри архивов, не распаковывая их
+    на диск) и читает их: байты читаются один раз, кодировка (UTF-8, cp1251 или
+    KOI8-R) определяется по началу текста
+    """
+
+    # сколько байт смотреть при определении кодировки
+    SAMPLE_SIZE = 1 << 16
+    TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+    def __init__(self) -> None:
+        # открытые архивы: члены архива читаются по порядку из одного объекта
+        self._zips: Dict[Path, zipfile.ZipFile] = {}
+        self._tars: Dict[Path, tarfile.TarFile] = {}
+        # открытые архивы читаются из нескольких потоков (BatchScanner с prefetch)
+        self._archive_lock = threading.Lock()
+
+
+    def __getstate__(self) -> dict:
+        # открытые архивы не передаются в другие процессы
+        return {}
+
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+
+
+    def list_documents(self, directory: Path) -> List[Document]:
+        """
+        Все тексты директории в порядке имён файлов (члены архива -- в порядке
+        внутри архива)
+
+        Аргументы:
+            directory (Path): директория корпуса
+
+        Возвращает:
+            [Document, ...]: тексты; архив, который не удалось открыть, --
+            документ с заполненным error
+        """
+        documents = []
+        for path in sorted(directory.iterdir()):
+            if path.is_dir():
+                continue
+            name = path.name.lower()
+            if name.endswith('.txt') or name.endswith('.txt.gz') or name.endswith('.txt.bz2'):
+                documents.append(Document(path.name, path, size=self._file_size(path)))
+            elif name.endswith('.zip') or name.endswith(self.TAR_SUFFIXES):
+                try:
+                    documents.extend(self._list_archive(path))
+                except READ_ERRORS as e:
+                    documents.append(Document(path.name, path, error=f"{type(e).__name__}: {e}"))
+        return documents
+
+
+    def read_bytes(self, document: Document) -> bytes:
+        """
+        Читает (и распаковывает) байты текста
+        """
+        path = document.path
+        name = path.name.lower()
+        if document.member is None:
+            if name.endswith('.gz'):
+                with gzip.open(path, 'rb') as f:
+                    return f.read()
+            if name.endswith('.bz2'):
+                with bz2.open(path, 'rb') as f:
+                    return f.read()
+            return path.read_bytes()
+
+        with self._archive_lock:
+            if name.endswith('.zip'):
+                archive = self._zips.get(path)
+                if archive is None:
+                    archive = self._zips[path] = zipfile.ZipFile(path)
+                return archive.read(document.member)
+
+            archive = self._open_tar(path)
+            member = archive.extractfile(document.member)
+            if member is None:
+                raise tarfile.TarError(f"not a regular file: {document.member}")
+            return member.read()
+
+
+    def read_text(self, document: Document, data: Optional[bytes] = None) -> str:
+        """
+        Читает текст и декодирует его в определённой по началу кодировке
+
+        Аргументы:
+            document (Document): текст корпуса
+            data (bytes, optional): уже прочитанные байты текста
+
+        Возвращает:
+            str: текст
+        """
+        if document.text is not None:
+            return document.text
+        if data is None:
+            data = self.read_bytes(document)
+        return self.decode(data)
+
+
+    def decode(self, data: bytes) -> str:
+        """
+        Декодирует байты текста. Если начало выглядит как UTF-8, а дальше в файле
+        встретилось что-то другое, кодировка определяется заново по всему файлу
+        """
+        encoding = self.detect_encoding(data)
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            if encoding not in ('utf-8', 'utf-8-sig'):
+                raise
+        return data.decode(self._detect_single_byte(data))
+
+
+    def detect_encoding(self, data: bytes) -> str:
+        """
+        Кодировка по первым SAMPLE_SIZE байтам: UTF-8 (в том числе с BOM), если
+        начало -- корректный UTF-8, иначе cp1251 или KOI8-R
+        """
+        if data.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+
+        sample = data[:self.SAMPLE_SIZE]
+        try:
+            # последний символ выборки может оказаться обрезанным посередине
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(sample) == len(data))
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return self._detect_single_byte(sample)
+
+
+    def close(self) -> None:
+        with self._archive_lock:
+            for archive in list(self._zips.values()) + list(self._tars.values()):
+                archive.close()
+            self._zips.clear()
+            self._tars.clear()
+
+
+    @staticmethod
+    def _file_size(path: Path) -> Optional[int]:
+        # файл, который не удаётся прочитать, попадёт в отчёт при чтении, а не здесь
+        try:
+            return path.stat().st_size
+        except OSError:
+            return None
+
+
+    @staticmethod
+    def _detect_single_byte(sample: bytes) -> str:
+        """
+        cp1251 или KOI8-R: строчных букв в русском тексте гораздо больше, чем прописных,
+        а в cp1251 строчные -- это байты 0xE0-0xFF, в KOI8-R -- 0xC0-0xDF
+        """
+        upper_half = len(sample) - len(sample.translate(None, bytes(range(0xE0, 0x100))))
+        lower_half = len(sample) - len(sample.translate(None, bytes(range(0xC0, 0xE0))))
+        return 'koi8-r' if lower_half > upper_half else 'windows-1251'
+
+
+    def _list_archive(self, path: Path) -> List[Document]:
+        if path.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(path) as archive:
+                members = [(info.filename, info.file_size) for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith('.txt')]
+        else:
+            members = [(info.name, info.size) for info in self._open_tar(path).getmembers()
+                       if info.isfile() and info.name.lower().endswith('.txt')]
+        return [Document(f"{path.name}/{member}", path, member, size=size) for member, size in members]
+
+
+    def _open_tar(self, path: Path) -> tarfile.TarFile:
+        archive = self._tars.get(path)
+        if archive is None:
+            archive = self._tars[path] = tarfile.open(path, 'r:*')
+        return archive
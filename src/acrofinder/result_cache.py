@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+
+class ResultCache:
+    """
+    Кэш результатов сканирования по содержимому (см. Scanner.scan_text): ключ -- sha256
+    нормализованного текста вместе с конфигурацией (отпечаток словаря, параметры
+    сканера и поиска), значение -- таблица кандидатов. Последние max_entries таблиц
+    держатся в памяти (LRU), а если задана directory -- все таблицы ещё и на диске
+    (<ключ>.csv), так что их находят и следующие прогоны, и другие процессы
+    """
+
+    # меняется, когда меняется смысл сохранённых таблиц
+    VERSION = 1
+    SUFFIX = ".csv"
+    INT_COLUMNS = ('start_pos', 'n_gram_size')
+
+    def __init__(self, max_entries: int = 64, directory: Optional[Path] = None) -> None:
+        """
+        Аргументы:
+            max_entries (int): сколько таблиц держать в памяти (0 -- нисколько)
+            directory (Path, optional): директория кэша на диске (создаётся, если её нет)
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must be >= 0")
+        self.max_entries = max_entries
+        self.directory = None if directory is None else Path(directory)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+
+
+    def __getstate__(self) -> dict:
+        # в другие процессы передаются только настройки, таблицы там набираются заново
+        return {"max_entries": self.max_entries, "directory": self.directory}
+
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._entries = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.directory is not None
+
+
+    @classmethod
+    def key(cls, text: str, config: dict) -> str:
+        """
+        Ключ таблицы: sha256 текста и конфигурации (словарь со значениями, которые
+        сериализуются в JSON)
+        """
+        digest = hashlib.sha256(text.encode("utf-8", "surrogatepass"))
+        digest.update(json.dumps({"version": cls.VERSION, **config}, sort_keys=True,
+                                 ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Копия сохранённой таблицы или None
+        """
+        df = self._entries.get(key)
+        if df is not None:
+            self._entries.move_to_end(key)
+            return df.copy()
+        if self.directory is None:
+            return None
+
+        path = self._path(key)
+        try:
+            df = pd.read_csv(path, encoding='utf-8', dtype=str, keep_default_na=False)
+        except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError):
+            return None
+        for column in self.INT_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype('int64')
+        if 'neighbour' in df.columns:
+            df['neighbour'] = df['neighbour'].replace('', None)
+        self._remember(key, df)
+        return df.copy()
+
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Сохраняет копию таблицы
+        """
+        df = df.copy()
+        self._remember(key, df)
+        if self.directory is not None:
+            path = self._path(key)
+            # запись во временный файл и переименование: другой процесс не увидит
+            # недописанную таблицу
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            df.to_csv(tmp_path, index=False, encoding='utf-8')
+            os.replace(tmp_path, path)
+
+
+    def clear(self) -> None:
+        """
+        Очищает кэш в памяти (таблицы на диске остаются)
+        """
+        self._entries.clear()
+
+
+    def _remember(self, key: str, df: pd.DataFrame) -> None:
+        if not self.max_entries:
+            return
+        self._entries[key] = df
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
@@ -1,22 +1,33 @@
 import re
-from typing import List, Set, Dict, Optional
+import json
+import hashlib
+from itertools import chain
+from typing import Callable, List, Set, Dict, Optional, Tuple, Iterable, Iterator
 import pandas as pd
 from pathlib import Path
+from array import array
 
-from dataclasses import dataclass, asdict
+from .dictionary import LetterFolding, NamedDictionary, PackedDictionary
+from .dictionary_cache import DictionaryCache
+from .matcher import MATCHERS, SortedWords, TrieMatcher
+from .neighbours import NeighbourIndex
+from .normalizer import Normalizer, OffsetMap
+from .result_cache import ResultCache
+from .stats import ScanStats, timed
+from .tokenizer import FIRST, LEVELS, LETTERS, Tokenizer, TokenizerState, canonical_position, stream_name
 
-@dataclass
-class AcrosticCandidate:
-    start_pos: int
-    n_gram_size: int
-    word: str
-    vicinity: str
-    context: str
-    level: str
-    neighbour: str
 
-    def to_dict(self):
-        return asdict(self)
+# столбцы таблицы результатов; vicinity и context можно не строить (with_context=False)
+RESULT_COLUMNS = ['start_pos', 'n_gram_size', 'word',
+                  'vicinity', 'neighbour', 'context', 'level']
+CONTEXT_COLUMNS = ['vicinity', 'context']
+
+# сколько символов после начала последней единицы кандидата попадает в context
+CONTEXT_TAIL = 10
+
+# места, где текст можно разрезать, не меняя результат нормализации: после символа, 
+# который не буква/цифра, не пробел и не дефис, или посреди четырёх букв подряд
+SAFE_CUT_PATTERN = re.compile(rf'[^\w\s\-–—]|(?<=[{LETTERS}]{{2}})(?=[{LETTERS}]{{2}})')
 
 
 class Scanner:
@@ -25,12 +36,17 @@ class Scanner:
     """
 
     def __init__(self, min_word_size: int = 5, vicinity_range: int = 5,
-                 dictionary_name: str ="", custom_dict_search: Optional[List[str]] = None) -> None:
+                 dictionary_name: str ="", custom_dict_search: Optional[List[str]] = None,
+                 matcher: str = 'trie', use_cache: bool = True,
+                 folding: Optional[Dict[str, str]] = None,
+                 dictionaries: Optional[List[NamedDictionary]] = None,
+                 result_cache_size: int = 0,
+                 result_cache_dir: Optional[Path] = None) -> None:
 
         """
         Создаёт объект Scanner, инициализирует конфигурацию (vicinity-, context-, 
-        addendum-range, паттерны поиска), загружает словарь, делает из него 
-        словари n-грамм для более эффективного поиска
+        addendum-range, токенизатор), загружает словарь, строит по нему 
+        движок поиска словарных слов в последовательности букв
 
         Аргументы:
             min_word_size (int): скольким буквам нужно совпасть со словом из словаря, 
@@ -41,31 +57,151 @@ class Scanner:
             на основе которого будет вестись поиск
             custom_dict_search ([str, str, ...]): отдельный набор слов, который мы хотим 
             найти среди акростихов
+            matcher (str): название движка поиска из MATCHERS (по умолчанию 'trie' -- 
+            префиксное дерево; 'numpy' -- векторизованный поиск по кодам сочетаний; 
+            'compact' -- дерево в плоских массивах, построенное из отсортированного словаря, 
+            для словарей в миллионы словоформ)
+            use_cache (bool): для словаря из файла и движка 'trie' -- брать скомпилированное 
+            дерево из кэша рядом со словарём (и создавать кэш, если его нет или словарь 
+            изменился); дерево из кэша отображается в память, а не строится заново
+            folding (dict[str, str], optional): свёртка букв при загрузке словаря (см. 
+            LetterFolding, например DEFAULT_FOLDING: ъ и ь выбрасываются, ы -> и, э -> е); 
+            первые буквы текста сворачиваются так же, а в столбце word вместо букв 
+            показываются исходные словоформы (через |, если их несколько). Словарь 
+            тогда хранится в PackedDictionary, а кэш рядом со словарём не используется
+            dictionaries ([NamedDictionary, ...], optional): несколько словарей вместо 
+            dictionary_name и custom_dict_search, каждый со своей минимальной длиной 
+            слова. Они объединяются в один движок поиска (первые буквы проходятся один 
+            раз), а в результатах появляется столбец dictionary -- имена словарей, в 
+            которых есть найденное слово (через |)
+            result_cache_size (int): сколько последних таблиц scan_text держать в памяти 
+            (ResultCache): повторный текст с тем же нормализованным содержимым и теми же 
+            параметрами не сканируется заново (по умолчанию 0 -- без кэша в памяти; 
+            пока кэш выключен, scan_text не считает хэш текста)
+            result_cache_dir (Path, optional): директория, где таблицы scan_text 
+            сохраняются ещё и на диск -- их находят следующие прогоны и другие процессы
         """    
-        self.PATTERNS = {'paragraph': r'(?<=\n)[^A-Za-zА-Яа-яЁё\n]*[A-Za-zА-Яа-яЁё]',
-                         'sentence': r'(?<=\n)[^A-Za-zА-Яа-яЁё\n]*[A-Za-zА-Яа-яЁё]|(?<=[\.\!\?])[^A-Za-zА-Яа-яЁё\n]*[A-Za-zА-Яа-яЁё]',
-                         'word': r'\b[A-Za-zА-Яа-яЁё]'}
-    
+        self.normalizer = Normalizer()
+        self.tokenizer = Tokenizer()
+
         # сколько букв показываем слева и справа от найденного сочетания
         self.vicinity_range = vicinity_range
 
-        self.cache_results = {}
+        # результаты scan_text по содержимому нормализованного текста и конфигурации
+        self.cache_results = ResultCache(result_cache_size, result_cache_dir)
+
+        # статистика сканирования: если задана (ScanStats()), scan_text, prepare_text, 
+        # scan_streams и scan_stream добавляют туда время этапов и счётчики по уровням
+        self.stats: Optional[ScanStats] = None
+
+        self.min_word_size = min_word_size
 
-        if custom_dict_search:
-            self.dictionary = set(custom_dict_search)
+        if matcher not in MATCHERS:
+            raise ValueError(f"Invalid matcher: {matcher}. Expected one of: {', '.join(MATCHERS)}")
+
+        self.dictionary_name = dictionary_name
+        self.folding = None if folding is None else LetterFolding(folding)
+        self._dictionary = None
+        self._dictionary_fingerprint = None
+        self._length_histogram = None
+        # компактный словарь (со свёрткой букв или для движка 'compact')
+        self._packed: Optional[PackedDictionary] = None
+        # несколько словарей: (имя, минимальная длина слова, свёрнутые слова)
+        self._named: Optional[List[Tuple[str, int, SortedWords]]] = None
+
+        if dictionaries:
+            self._load_named_dictionaries(dictionaries, matcher)
+        elif self.folding is not None or matcher == 'compact':
+            if custom_dict_search:
+                self._packed = PackedDictionary(custom_dict_search, self.folding)
+            else:
+                self._packed = PackedDictionary.from_file(self._get_dict_path(dictionary_name), 
+                                                          self.folding)
+            words = self._packed.words if matcher == 'compact' else set(self._packed)
+            self.matcher = MATCHERS[matcher](words, self.min_word_size)
+            self.max_word_length = self._packed.max_word_length
+        elif custom_dict_search:
+            self._dictionary = set(custom_dict_search)
+            self.matcher = MATCHERS[matcher](self._dictionary, self.min_word_size)
+        elif use_cache and matcher == 'trie':
+            self.matcher = self._load_cached_matcher(dictionary_name)
         else:
-            self.dictionary = self._load_dictionary(dictionary_name)
+            self._dictionary = self._load_dictionary(dictionary_name)
+            self.matcher = MATCHERS[matcher](self._dictionary, self.min_word_size)
 
-        # TODO здесь потенциал оптимизации -- если длинных слов слишком мало
-        # то проверять все n-граммы, добивая их до max_word_length малоосмысленно
-        self.max_word_length = len(max(self.dictionary, key=len))
+        if self._dictionary is not None:
+            self.max_word_length = len(max(self._dictionary, key=len))
         # print(f'{self.max_word_length = }') # в 20к словаре было  19
-        self.min_word_size = min_word_size
-        self.n_dict = self._get_n_gram_dict(self.dictionary, self.min_word_size)
+
+
+    @property
+    def dictionary(self) -> Set[str]:
+        """
+        Множество словоформ; если дерево взято из кэша, словарь читается из файла 
+        только при первом обращении (для компактного словаря -- свёрнутые формы)
+        """
+        if self._dictionary is None and self._packed is not None:
+            return set(self._packed)
+        if self._dictionary is None:
+            self._dictionary = self._load_dictionary(self.dictionary_name)
+        return self._dictionary
+
+
+    @property
+    def dictionary_fingerprint(self) -> str:
+        """
+        Отпечаток (sha256) словаря: не зависит от порядка слов в файле, считается 
+        один раз при первом обращении (или берётся из кэша словаря)
+        """
+        if self._dictionary_fingerprint is None and self._packed is not None:
+            self._dictionary_fingerprint = self._packed.fingerprint()
+        if self._dictionary_fingerprint is None:
+            self._dictionary_fingerprint = DictionaryCache.fingerprint(self.dictionary)
+        return self._dictionary_fingerprint
+
+
+    @property
+    def length_histogram(self) -> Dict[int, int]:
+        """
+        Сколько в словаре слов каждой длины
+        """
+        if self._length_histogram is None and self._packed is not None:
+            self._length_histogram = self._packed.length_histogram()
+        if self._length_histogram is None:
+            self._length_histogram = DictionaryCache.length_histogram(self.dictionary)
+        return self._length_histogram
+
+
+    def result_columns(self, with_context: bool = True, 
+                       positions: Optional[List[str]] = None) -> List[str]:
+        """
+        Столбцы таблицы результатов: RESULT_COLUMNS (без vicinity и context, если 
+        with_context=False), dictionary после word, если словарей несколько, и 
+        position после level, если среди positions есть не только первые буквы
+        """
+        columns = [c for c in RESULT_COLUMNS if with_context or c not in CONTEXT_COLUMNS]
+        if self._named is not None:
+            columns.insert(columns.index('word') + 1, 'dictionary')
+        if positions is not None and any(canonical_position(p) != FIRST for p in positions):
+            columns.append('position')
+        return columns
+
+
+    @staticmethod
+    def stream_names(levels: List[str], positions: Optional[List[str]] = None) -> List[str]:
+        """
+        Имена потоков букв (см. tokenizer.stream_name), которые нужны для поиска на 
+        уровнях levels по позициям positions (по умолчанию -- только первые буквы)
+        """
+        positions = [FIRST] if positions is None else positions
+        return list(dict.fromkeys(stream_name(level, position) 
+                                  for level in levels for position in positions))
 
 
     def scan_text(self, text: str, levels:List[str] = ['word'], 
-                  filter_by_neighbours: bool = False, min_neighbour_len: int = 1) -> pd.DataFrame:
+                  filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+                  with_context: bool = True, neighbour_words: int = 1,
+                  positions: List[str] = [FIRST]) -> pd.DataFrame:
         """
         Ищет все возможные акростихи в переданном тексте, возвращает датафрейм с 
         кандидатами (+ окрестности слева и справа) и контекстом в тексте 
@@ -82,6 +218,16 @@ class Scanner:
             min_neighbour_len (int): если включена фильтрация по наличию слов среди соседей
             найденной формы, минимальная длина соседей (чтобы можно было исключать одно-
             и двух-буквенные слова, попадающиеся случайно)
+            with_context (bool): если False, то столбцы vicinity и context не строятся 
+            и в таблицу не попадают (для подсчёта кандидатов и построения индексов)
+            neighbour_words (int): сколько соседних слов искать: 1 -- одно слово слева 
+            или справа; 2 -- два слова подряд (одно слева и одно справа, оба слева или 
+            оба справа), оба попадают в столбец neighbour через пробел
+            positions [str, ...]: какие буквы единиц складывать в последовательности: 
+            'first' -- первые (акростих), 'last' -- последние (телестих), номер буквы 
+            (например, '2' или 2) -- n-е (мезостих). Все последовательности извлекаются 
+            за один проход по тексту и ищутся на каждом уровне; если среди них есть не 
+            только первые буквы, в таблице появляется столбец position
 
         Возвращает:
             results (pd.DataFrame): сводная таблица результатов поиска 
@@ -92,219 +238,592 @@ class Scanner:
         # TO DO: реализовать последующую фильтрацию найденных кандидатов, пытаясь достроить до
         # full_word, чтобы отсечь побольше случайных совпадений
 
-        valid_levels = ['paragraph', 'sentence', 'word']
-        for level in levels:
-            if level not in valid_levels:
-                raise ValueError(f"Invalid level: {level}. Expected one of: 'paragraph', 'sentence', 'word'")
+        self._check_scan_args(levels, filter_by_neighbours, min_neighbour_len, neighbour_words, positions)
+        offsets = OffsetMap()
+        with timed(self.stats, 'normalization'):
+            text = self.normalizer.normalize(text, offsets)
 
-        if filter_by_neighbours and min_neighbour_len < 1:
-            raise ValueError("min_neighbour_len must be >= 1 when filter_by_neighbours is True")
-
-        all_candidates = []  
+        # при сборе статистики (self.stats) кэш не используется: измеряется само сканирование
+        key = None
+        if self.cache_results.enabled and self.stats is None:
+            key = self.result_key(text, levels, filter_by_neighbours, min_neighbour_len,
+                                  with_context, neighbour_words, positions)
+        return self.scan_normalized(text, offsets, levels, filter_by_neighbours, min_neighbour_len,
+                                    with_context, neighbour_words, positions, key=key)
 
 
-        for level in levels:
-            candidates = self._get_candidates(text, level, 
-                                              filter_by_neighbours, min_neighbour_len)
-            all_candidates.extend(candidates)  
+    def scan_normalized(self, text: str, offsets: OffsetMap, levels: List[str] = ['word'], 
+                        filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+                        with_context: bool = True, neighbour_words: int = 1,
+                        positions: List[str] = [FIRST], key: Optional[str] = None) -> pd.DataFrame:
+        """
+        scan_text для уже нормализованного текста (например, когда по нему сначала 
+        считается result_key)
 
-        # Создаём ОДИН DataFrame в конце
-        columns = ['start_pos', 'n_gram_size', 'word', 
-                   'vicinity', 'neighbour', 'context', 'level']
-        results = pd.DataFrame([c.to_dict() for c in all_candidates], 
-                               columns=columns) if all_candidates else pd.DataFrame(columns=columns)
+        Аргументы:
+            text (str): нормализованный текст
+            offsets (OffsetMap): карта из его позиций в позиции исходного текста 
+            (заполненная Normalizer.normalize)
+            levels, filter_by_neighbours, min_neighbour_len, with_context, 
+            neighbour_words, positions: как в scan_text
+            key (str, optional): result_key текста; если он задан и кэш результатов 
+            включён, таблица берётся из кэша или сохраняется в него (кроме сбора 
+            статистики, как в scan_text)
 
+        Возвращает:
+            pd.DataFrame: таблица scan_text
+        """
+        self._check_scan_args(levels, filter_by_neighbours, min_neighbour_len, neighbour_words, positions)
+        names = self.stream_names(levels, positions)
+
+        if key is None or not self.cache_results.enabled or self.stats is not None:
+            streams = self._extract_streams(text, names)
+            return self.scan_streams(streams, offsets, lambda: text, levels, filter_by_neighbours,
+                                     min_neighbour_len, with_context, neighbour_words, 
+                                     positions=positions)
+
+        # в кэше start_pos -- позиции в нормализованном тексте: тексты, которые 
+        # нормализуются одинаково, дают одну таблицу, а в исходные позиции каждого 
+        # она переводится по его карте смещений
+        results = self.cache_results.get(key)
+        if results is None:
+            streams = self._extract_streams(text, names)
+            results = self.scan_streams(streams, None, lambda: text, levels, filter_by_neighbours,
+                                        min_neighbour_len, with_context, neighbour_words, 
+                                        positions=positions)
+            self.cache_results.put(key, results)
+        results['start_pos'] = [offsets.to_original(position) for position in results['start_pos']]
         return results
 
 
+    def result_key(self, text: str, levels: List[str] = ['word'], 
+                   filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+                   with_context: bool = True, neighbour_words: int = 1,
+                   positions: List[str] = [FIRST]) -> str:
+        """
+        Ключ таблицы scan_text для нормализованного текста text, как в ResultCache: 
+        sha256 текста вместе с отпечатком словаря и параметрами сканера и поиска. У 
+        текстов с одним ключом одна и та же таблица (с точностью до перевода start_pos 
+        в позиции исходного текста)
+        """
+        return ResultCache.key(text, self._result_config(levels, filter_by_neighbours, min_neighbour_len,
+                                                         with_context, neighbour_words, positions))
 
 
-    def _get_candidates(self, text: str, level: str, 
-                        filter_by_neighbours: bool, min_neighbour_len) -> List[AcrosticCandidate]:
+    def prepare_text(self, text: str, 
+                     levels: List[str]) -> Tuple[str, OffsetMap, Dict[str, Tuple[str, array]]]:
         """
-        Формирует список слов-кандидатов из последовательности первых букв элементов текста
-        на заданном уровне (слова, предложения или абзацы).
-
-        Алгоритм:
-          1. Извлекает первые буквы всех единиц указанного уровня.
-          2. Строит из них скользящим окном n-граммы фиксированной длины = self.min_word_size.
-          3. Для каждой n-граммы, если она совпадает с началом (префиксом) какого-либо 
-         слова из словаря n-грамм:
-             - постепенно расширяет её, добавляя следующие буквы из последовательности;
-             - на каждом шаге, если текущая строка есть в словаре полных словоформ,
-               проверяет наличие соседнего осмысленного слова слева или справа (тоже из словаря,
-               тоже расширяя по букве);
-             - если такое слово найдено — добавляет текущую строку как кандидата в акростих.
-          4. Возвращает всех подходящих кандидатов с информацией о позиции, окрестностях и контексте.
+        Нормализует текст и за один проход извлекает первые буквы для всех уровней. 
+        Результат зависит только от текста и уровней (не от словаря и параметров 
+        поиска), поэтому его можно сохранить и сканировать потом с другим словарём
 
-         Если filter_by_neighbours = True:
-          Кандидат добавляется ТОЛЬКО если рядом (слева или справа в последовательности n-грамм)
-          найдено ещё хотя бы одно слово из словаря минимальной длины min_neighbours_len — это 
-          снижает количество случайных совпадений.
+        Аргументы:
+            text (str): исходный текст
+            levels [str, str, ...]: уровни (или имена потоков других букв единиц, 
+            см. stream_names)
 
         Возвращает:
-            List[AcrosticCandidate]: найденные слова-кандидаты и сопутствующая информация.
+            (str, OffsetMap, dict): нормализованный текст, карта из его позиций в 
+            позиции исходного текста и уровень -> (первые буквы, позиции начала единиц 
+            в нормализованном тексте)
         """
+        offsets = OffsetMap()
+        with timed(self.stats, 'normalization'):
+            text = self.normalizer.normalize(text, offsets)
+        return text, offsets, self._extract_streams(text, levels)
+
+
+    def scan_streams(self, streams: Dict[str, Tuple[str, array]], offsets: OffsetMap,
+                     get_text: Callable[[], str], levels: List[str] = ['word'],
+                     filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+                     with_context: bool = True, neighbour_words: int = 1,
+                     matches: Optional[Dict[str, List[Tuple[int, int]]]] = None,
+                     positions: List[str] = [FIRST]) -> pd.DataFrame:
+        """
+        Ищет акростихи в уже извлечённых первых буквах (см. prepare_text)
 
-        text = self._normalize_text(text)
-        first_letters, matches = self._get_first_letters_and_matches(text, level)
-
-        candidates = []
+        Аргументы:
+            streams (dict): уровень (имя потока, см. stream_names) -> (буквы, позиции 
+            начала единиц)
+            offsets (OffsetMap): карта из позиций нормализованного текста в позиции исходного
+            get_text (Callable[[], str]): возвращает нормализованный текст; вызывается, 
+            только если нужен context и есть хотя бы один кандидат
+            levels, filter_by_neighbours, min_neighbour_len, with_context, 
+            neighbour_words, positions: как в scan_text
+            matches (dict, optional): уже найденные словарные слова по уровням -- 
+            [(позиция в первых буквах, длина), ...] по возрастанию (например, из 
+            AcrosticIndex); тогда движок поиска по буквам не проходит
 
-        n_grams = self._get_n_grams(self.min_word_size, first_letters)
-        all_n_grams = range(len(n_grams))
-            
-        for id in all_n_grams:
-            possible_word = n_grams[id]
-            if possible_word in self.n_dict:
-                n_addenda = range(self.max_word_length - len(possible_word))
-                
-                for _ in n_addenda:
-                    if possible_word in self.dictionary:
-                        
-                        # если нет фильтрации по соседям, или есть, и подходящие соседи есть
-                        has_neighbour, neighbour, = self._has_neighbour_word(first_letters, id, 
-                                                                             len(possible_word),
-                                                                             min_neighbour_len) 
+        Возвращает:
+            results (pd.DataFrame): таблица результатов, как у scan_text
+        """
+        self._check_scan_args(levels, filter_by_neighbours, min_neighbour_len, neighbour_words, positions)
 
-                        if not filter_by_neighbours or has_neighbour:
-                            candidate = self._make_candidate(text, possible_word, level, 
-                                                    first_letters, matches, id, 
-                                                    len(possible_word), neighbour)
-                            candidates.append(candidate)
+        columns = self.result_columns(with_context, positions)
+        data = {column: [] for column in columns}
 
-                    last_len = len(possible_word)
-                    possible_word = self._add_letter(first_letters, id, possible_word)
-                    if last_len == len(possible_word):
-                        break
+        hits = []
+        for level in levels:
+            for position in dict.fromkeys(map(canonical_position, positions)):
+                name = stream_name(level, position)
+                first_letters, starts = streams[name]
+                ids, sizes, neighbours = self._get_candidates(first_letters, filter_by_neighbours, 
+                                                              min_neighbour_len, 
+                                                              neighbour_words=neighbour_words,
+                                                              matches=None if matches is None 
+                                                                      else matches.get(name, []),
+                                                              level=name)
+                hits.append((level, position, first_letters, starts, ids, sizes, neighbours))
+
+        # нормализованный текст нужен только для context находок
+        text = None
+        if with_context and any(ids for _, _, _, _, ids, _, _ in hits):
+            text = get_text()
+
+        for level, position, first_letters, starts, ids, sizes, neighbours in hits:
+            with timed(self.stats, 'columns', stream_name(level, position)):
+                self._extend_columns(data, text, level, first_letters, starts, 
+                                     ids, sizes, neighbours, offsets=offsets, position=position)
 
+        # Создаём ОДИН DataFrame в конце
+        with timed(self.stats, 'dataframe'):
+            results = pd.DataFrame(data, columns=columns)
 
-        return candidates
+        return results
 
 
-    def _has_neighbour_word(self, first_letters: List[str], id: int, word_len: int, min_len: int) -> bool:
+    def sweep_streams(self, streams: Dict[str, Tuple[str, array]], offsets: OffsetMap,
+                      get_text: Callable[[], str], levels: List[str] = ['word'],
+                      neighbour_settings: List[Tuple[int, int]] = [(1, 1)],
+                      with_context: bool = True) -> pd.DataFrame:
         """
-        Проверяет, есть ли у заданного сочетания букв, соседнее сочетание,
-        примыкающее слева или справа и образующее словоформу заданной
-        минимальной длины
-        """
-        
-        has_neighbour = False
-        neighbour = None
+        Для подбора параметров (BatchScanner.sweep): ищет кандидатов, как scan_streams 
+        без фильтрации по соседям, но соседей ищет для каждой пары (min_neighbour_len, 
+        neighbour_words) из neighbour_settings -- вместо столбца neighbour в таблице 
+        столбцы sweep_column(min_neighbour_len, neighbour_words). Словарь проходится один 
+        раз, соседи для остальных пар ищутся только у уже найденных кандидатов.
 
-        left_word = ""
-        neighbour_range = range(1, self.max_word_length) 
+        Результат scan_streams с min_word_size (не меньше, чем у сканера) и одной из 
+        пар -- это строки отсюда с n_gram_size >= min_word_size (при фильтрации по 
+        соседям -- ещё и с непустым соседом), где neighbour -- столбец этой пары
 
-        for additional_letter_position in neighbour_range:
-            if id - additional_letter_position < 0:
-                break
-            left_word = first_letters[id-additional_letter_position] + left_word
-            if left_word in self.dictionary and len(left_word) >= min_len:
-                has_neighbour = True
-                neighbour = left_word
-                break                                    
-
-        if not has_neighbour:
-            right_word = ""
-            neighbour_range = range(1, self.max_word_length) 
-            for additional_letter_position in neighbour_range:
-                if id+word_len+additional_letter_position >= len(first_letters):
-                    break
-                right_word = right_word + first_letters[id+word_len+additional_letter_position-1]
-                if right_word in self.dictionary and len(right_word) >= min_len:
-                    has_neighbour = True
-                    neighbour = right_word
-                    break
+        Аргументы:
+            streams, offsets, get_text, levels, with_context: как в scan_streams
+            neighbour_settings [(int, int), ...]: пары (min_neighbour_len, neighbour_words)
 
-        return has_neighbour, neighbour            
+        Возвращает:
+            pd.DataFrame: столбцы scan_streams без neighbour и столбцы соседей по парам
+        """
+        neighbour_settings = list(dict.fromkeys(neighbour_settings))
+        # каждая пара используется и для наборов с фильтрацией по соседям
+        for min_neighbour_len, neighbour_words in neighbour_settings:
+            self._check_scan_args(levels, True, min_neighbour_len, neighbour_words)
 
-    def _normalize_text(self, text: str) -> str:
-        text = self._normalize_spaced_letters(text)
-        text = self._normalize_hyphenated_letters(text)
+        columns = [c for c in self.result_columns(with_context) if c != 'neighbour']
+        data = {column: [] for column in columns + ['neighbour']}
+        swept = {self.sweep_column(*setting): [] for setting in neighbour_settings}
 
-        return text
+        hits = []
+        for level in levels:
+            first_letters, starts = streams[level]
+            (min_neighbour_len, neighbour_words), *rest = neighbour_settings
+            ids, sizes, neighbours = self._get_candidates(first_letters, False, min_neighbour_len,
+                                                          neighbour_words=neighbour_words, level=level)
+            found = list(zip(ids, sizes))
+            all_neighbours = [neighbours] + [self._get_candidates(first_letters, False, min_neighbour_len,
+                                                                  neighbour_words=neighbour_words,
+                                                                  matches=found)[2]
+                                             for min_neighbour_len, neighbour_words in rest]
+            hits.append((level, first_letters, starts, ids, sizes, all_neighbours))
+
+        text = None
+        if with_context and any(ids for _, _, _, ids, _, _ in hits):
+            text = get_text()
+
+        for level, first_letters, starts, ids, sizes, all_neighbours in hits:
+            with timed(self.stats, 'columns', level):
+                self._extend_columns(data, text, level, first_letters, starts,
+                                     ids, sizes, all_neighbours[0], offsets=offsets)
+                for column, neighbours in zip(swept, all_neighbours):
+                    swept[column].extend(neighbours)
+
+        data.pop('neighbour')
+        with timed(self.stats, 'dataframe'):
+            return pd.DataFrame({**data, **swept}, columns=columns + list(swept))
+
+
+    @staticmethod
+    def sweep_column(min_neighbour_len: int, neighbour_words: int) -> str:
+        """
+        Столбец соседей с параметрами min_neighbour_len и neighbour_words в sweep_streams
+        """
+        return f"neighbour_{min_neighbour_len}_{neighbour_words}"
 
 
-    def _normalize_spaced_letters(self, text: str) -> str:
+    def scan_stream(self, chunks: Iterable[str], levels: List[str] = ['word'],
+                    filter_by_neighbours: bool = False, min_neighbour_len: int = 1,
+                    with_context: bool = True, neighbour_words: int = 1) -> Iterator[pd.DataFrame]:
         """
-        Убирает из текста вот т а к у ю разрядку пробелами, чтобы исключить 
-        ложные срабатывания при поиске кандидатов
-        """
-        pattern = re.compile(r'\b(?:[A-Za-zА-Яа-яЁё](?:\s{1,3}[A-Za-zА-Яа-яЁё]){2,})\b')
+        Потоковый вариант scan_text для текстов, которые не хочется целиком держать 
+        в памяти: читает текст по кускам и по мере продвижения отдаёт таблицы с 
+        кандидатами. Вместе эти таблицы содержат ровно те же строки, что и 
+        scan_text(весь текст), и в том же порядке внутри каждого уровня 
+        (но уровни перемешаны между таблицами).
+
+        Между кусками хранится только нужный для поиска хвост: ненормализованный 
+        текст после последнего безопасного места разреза, последние буквы каждого 
+        уровня (до (neighbour_words + 1) max_word_length плюс vicinity_range) и нормализованный текст, 
+        начиная с первой единицы, для которой ещё может понадобиться context. 
+        Память ограничена размером куска и этим окном (если единицы уровня не 
+        бесконечно длинные, как абзац из всей книги).
 
-        def replacer(match: re.Match) -> str:
-            return match.group(0).replace(" ", "")
+        Аргументы:
+            chunks (Iterable[str]): куски текста по порядку (например, файл, 
+            прочитанный по 1 МБ)
+            levels, filter_by_neighbours, min_neighbour_len, with_context, 
+            neighbour_words: как в scan_text
 
-        return pattern.sub(replacer, text)
+        Возвращает:
+            Iterator[pd.DataFrame]: непустые таблицы кандидатов со столбцами как у 
+            scan_text; позиции start_pos отсчитываются от начала всего текста
+        """
 
-    def _normalize_hyphenated_letters(self, text: str) -> str:
+        self._check_scan_args(levels, filter_by_neighbours, min_neighbour_len, neighbour_words)
+
+        columns = self.result_columns(with_context)
+        unique_levels = list(dict.fromkeys(levels))
+
+        # сколько букв справа от начала кандидата нужно знать, чтобы обработать его 
+        # так же, как при сканировании всего текста (слово + соседи справа + vicinity)
+        lookahead = (neighbour_words + 1) * self.max_word_length + self.vicinity_range
+        # сколько букв слева от необработанных позиций хранить (соседи слева + vicinity)
+        keep_behind = max(neighbour_words * self.max_word_length, self.vicinity_range)
+
+        state = TokenizerState()
+        raw = ""            # ещё не нормализованный хвост
+        raw_base = 0        # позиция raw[0] в исходном тексте целиком
+        offsets = OffsetMap()
+        text = ""           # окно нормализованного текста
+        text_base = 0       # позиция text[0] в нормализованном тексте целиком
+        # уровень -> [буквы, позиции начала, номер первой буквы окна, первая необработанная]
+        windows = {level: ["", array('q'), 0, 0] for level in unique_levels}
+
+        for chunk in self._with_end_marker(chunks):
+            is_last = chunk is None
+            if not is_last:
+                raw += chunk
+            cut = len(raw) if is_last else self._find_safe_cut(raw)
+            if cut == 0 and not is_last:
+                continue
+
+            with timed(self.stats, 'normalization'):
+                piece = self.normalizer.normalize(raw[:cut], offsets, base=text_base + len(text),
+                                                  original_base=raw_base)
+            raw = raw[cut:]
+            raw_base += cut
+
+            with timed(self.stats, 'extraction'):
+                streams = self.tokenizer.tokenize(piece, unique_levels, state, 
+                                                  base=text_base + len(text))
+            if self.stats is not None:
+                for level, (new_letters, _) in streams.items():
+                    self.stats.count(level, letters=len(new_letters))
+            text += piece
+            text_end = text_base + len(text)
+
+            data = {column: [] for column in columns}
+            level_hits = {}
+
+            for level in unique_levels:
+                window = windows[level]
+                new_letters, new_starts = streams[level]
+                window[0] += new_letters
+                window[1].extend(new_starts)
+                first_letters, starts, letters_base, next_id = window
+                known = letters_base + len(first_letters)
+
+                limit = known
+                if not is_last:
+                    limit = known - lookahead
+                    # context кандидата должен целиком попасть в уже нормализованный текст
+                    while (limit > next_id and 
+                           starts[limit - 1 + self.max_word_length - letters_base] + CONTEXT_TAIL > text_end):
+                        limit -= 1
+
+                if limit > next_id:
+                    ids, sizes, neighbours = self._get_candidates(first_letters, filter_by_neighbours,
+                                                                  min_neighbour_len,
+                                                                  neighbour_words=neighbour_words,
+                                                                  begin=next_id - letters_base,
+                                                                  end=limit - letters_base,
+                                                                  level=level)
+                    level_hits[level] = (first_letters, starts, ids, sizes, neighbours)
+                    window[3] = next_id = limit
+
+                # сдвигаем окно букв
+                new_base = max(letters_base, next_id - keep_behind)
+                window[0] = first_letters[new_base - letters_base:]
+                window[1] = starts[new_base - letters_base:]
+                window[2] = new_base
+
+            for level in levels:
+                if level in level_hits:
+                    first_letters, starts, ids, sizes, neighbours = level_hits[level]
+                    with timed(self.stats, 'columns', level):
+                        self._extend_columns(data, text, level, first_letters, starts,
+                                             ids, sizes, neighbours, text_base=text_base,
+                                             offsets=offsets)
+
+            if data['word']:
+                with timed(self.stats, 'dataframe'):
+                    df = pd.DataFrame(data, columns=columns)
+                yield df
+
+            # сдвигаем окно текста: оставляем его с начала первой единицы, которая ещё 
+            # может попасть в context (или ещё не получила свою первую букву)
+            low = text_end
+            for level, (first_letters, starts, letters_base, next_id) in windows.items():
+                if next_id < letters_base + len(first_letters):
+                    low = min(low, starts[next_id - letters_base])
+            if state.first_pending:
+                low = 0
+            if 'sentence' in windows and state.sentence_pending is not None:
+                low = min(low, state.sentence_pending)
+            if 'paragraph' in windows and state.paragraph_pending is not None:
+                low = min(low, state.paragraph_pending)
+            text = text[low - text_base:]
+            text_base = low
+            offsets.forget_before(low)
+
+
+    def _result_config(self, levels: List[str], filter_by_neighbours: bool, min_neighbour_len: int,
+                       with_context: bool, neighbour_words: int, positions: List[str]) -> dict:
+        """
+        Всё, кроме текста, от чего зависит таблица scan_text (для ключа ResultCache)
         """
-        Убирает из текста вот т-а-к-о-й вариант написания, чтобы исключить
-        ложные срабатывания
+        return {"dictionary": self.dictionary_fingerprint,
+                "named": None if self._named is None else [(name, size) for name, size, _ in self._named],
+                "min_word_size": self.min_word_size,
+                "vicinity_range": self.vicinity_range,
+                "levels": list(levels),
+                "filter_by_neighbours": filter_by_neighbours,
+                "min_neighbour_len": min_neighbour_len,
+                "with_context": with_context,
+                "neighbour_words": neighbour_words,
+                "positions": [canonical_position(position) for position in positions]}
+
+
+    def _check_scan_args(self, levels: List[str], filter_by_neighbours: bool, 
+                         min_neighbour_len: int, neighbour_words: int = 1,
+                         positions: List[str] = [FIRST]) -> None:
         """
+        Проверяет уровни, позиции букв и параметры фильтрации по соседям
+        """
+        for level in levels:
+            if level not in LEVELS:
+                raise ValueError(f"Invalid level: {level}. Expected one of: 'paragraph', 'sentence', 'word'")
 
-        pattern = re.compile(r'(?:[A-Za-zА-Яа-яЁё](?:[-–—]{1,3}[A-Za-zА-Яа-яЁё]){2,})')
+        if filter_by_neighbours and min_neighbour_len < 1:
+            raise ValueError("min_neighbour_len must be >= 1 when filter_by_neighbours is True")
 
-        def replacer(match: re.Match) -> str:
-            return re.sub(r'[-–—]', '', match.group(0))  # убрать все виды дефисов
+        if neighbour_words not in (1, 2):
+            raise ValueError(f"Invalid neighbour_words: {neighbour_words}. Expected 1 or 2")
 
-        return pattern.sub(replacer, text)
+        if not positions:
+            raise ValueError("At least one position is required")
+        for position in positions:
+            if canonical_position(position) != FIRST and self.folding is not None \
+                    and self.folding.deletes_letters:
+                raise ValueError(f"Folding rules that delete letters ({self.folding}) "
+                                 f"can only be used with the 'first' position, got: {position}")
 
 
-    def _add_letter(self, first_letters: List[str], id: int, possible_word: str) -> str:
+    @staticmethod
+    def _with_end_marker(chunks: Iterable[str]) -> Iterator[Optional[str]]:
         """
-        Возвращает потенциальное слово с прибавленной следующей буквой из first_letters 
-        из [р, ы, б, а, к, и] и рыба вернет рыбак 
+        Отдаёт куски текста, а после них None -- признак конца текста
         """
+        yield from chunks
+        yield None
+
+
+    def _find_safe_cut(self, text: str) -> int:
+        """
+        Возвращает последнюю позицию в text, по которой его можно разрезать так, что
+        нормализация и токенизация двух частей по отдельности дают то же, что и 
+        целого текста (0, если такой позиции нет)
+        """
+        window = 1024
+        while True:
+            begin = max(0, len(text) - window)
+            last = None
+            for last in SAFE_CUT_PATTERN.finditer(text, begin):
+                pass
+            if last is not None:
+                return last.end()
+            if begin == 0:
+                return 0
+            window *= 4
+
+
+
+
+    def _get_candidates(self, first_letters: str, filter_by_neighbours: bool, 
+                        min_neighbour_len: int, begin: int = 0, end: Optional[int] = None,
+                        neighbour_words: int = 1, 
+                        matches: Optional[Iterable[Tuple[int, int]]] = None,
+                        level: Optional[str] = None) -> Tuple[array, array, List[Optional[str]]]:
+        """
+        Формирует список слов-кандидатов из последовательности первых букв элементов текста
+        на заданном уровне (слова, предложения или абзацы).
 
-        next_letter = ""
+        Алгоритм:
+          1. Получает первые буквы всех единиц указанного уровня и позиции их начала
+             (извлекаются заранее, за один проход по тексту для всех уровней).
+          2. Движок поиска (self.matcher) один раз проходит по последовательности букв 
+             и для каждой позиции отдаёт все словарные слова длины >= self.min_word_size, 
+             которые с неё начинаются (спуск по префиксному дереву обрывается, как только 
+             сочетание перестаёт быть началом какого-либо слова).
+          3. Для каждого найденного слова ищет соседнее осмысленное слово (или два) 
+             слева или справа -- по таблицам NeighbourIndex: какие словарные слова 
+             начинаются и заканчиваются в каждой позиции.
+          4. Возвращает всех подходящих кандидатов по столбцам: позиции в последовательности 
+             букв, длины и соседей (слово, окрестности и контекст собираются потом, 
+             в _extend_columns, только для оставшихся кандидатов).
 
-        if id+len(possible_word) < len(first_letters):
-            next_letter = first_letters[id+len(possible_word)]
+         Если filter_by_neighbours = True:
+          Кандидат добавляется ТОЛЬКО если рядом (слева или справа в последовательности n-грамм)
+          найдено ещё хотя бы одно слово (или neighbour_words слов подряд) из словаря 
+          минимальной длины min_neighbours_len — это снижает количество случайных совпадений.
 
-        return possible_word + next_letter 
+         begin/end ограничивают позиции, с которых могут начинаться кандидаты 
+         (при потоковом сканировании first_letters -- это окно букв). Если переданы 
+         matches (уже найденные слова: позиция и длина), шаг 2 пропускается. level -- 
+         уровень, под которым время этапов и счётчики попадают в self.stats (если она задана).
 
+        Возвращает:
+            (array, array, list): номера первых букв кандидатов в first_letters, 
+            их длины и найденные соседние слова (или None).
+        """
 
-    def _make_candidate(self, text: str, word: str, level: str, 
-                        first_letters: List[str], matches: List[re.Match],
-                        id: int, n_gram_size: int, neighbour: str) -> AcrosticCandidate:
+        ids = array('q')
+        sizes = array('q')
+        neighbours = []
+
+        # свёртка букв не меняет их число, так что позиции остаются прежними
+        if self.folding is not None:
+            first_letters = self.folding.fold_letters(first_letters)
+
+        # соседи -- слова короче max_word_length
+        neighbour_index = NeighbourIndex(self.matcher, first_letters, 
+                                         shortest=max(min_neighbour_len, 1),
+                                         longest=self.max_word_length - 1)
+
+        stats = self.stats if level is not None else None
+
+        if matches is None:
+            matches = self.matcher.find_all(first_letters, begin, end)
+            if stats is not None:
+                # со статистикой совпадения собираются заранее, чтобы время поиска 
+                # по словарю не смешивалось со временем поиска соседей
+                probes = self.matcher.probes
+                with stats.timer('matching', level):
+                    matches = list(matches)
+                stats.count(level, probes=self.matcher.probes - probes)
+        elif stats is not None:
+            matches = list(matches)
+
+        if stats is not None:
+            stats.count(level, hits=len(matches))
+
+        dropped = 0
+        with timed(stats, 'neighbours', level):
+            for id, n_gram_size in matches:
+                # слово из общего движка должно быть в словаре, для которого оно достаточно длинное
+                if self._named is not None and not self._dictionary_names(first_letters[id:id+n_gram_size]):
+                    continue
+
+                neighbour = neighbour_index.find(id, n_gram_size, neighbour_words)
+
+                # если нет фильтрации по соседям, или есть, и подходящие соседи есть
+                if not filter_by_neighbours or neighbour is not None:
+                    ids.append(id)
+                    sizes.append(n_gram_size)
+                    neighbours.append(neighbour)
+                else:
+                    dropped += 1
+
+        if stats is not None:
+            stats.count(level, dropped=dropped, candidates=len(ids))
+
+        return ids, sizes, neighbours
+
+
+    def _extend_columns(self, data: Dict[str, list], text: Optional[str], level: str,
+                        first_letters: str, starts: array, ids: array, sizes: array,
+                        neighbours: List[Optional[str]], text_base: int = 0,
+                        offsets: Optional[OffsetMap] = None, position: str = FIRST) -> None:
         """
-        Собирает на входящих параметрах из слова, окрестностей и контекста
-        строчку про кандидата в соответствующей форме.
+        Дописывает в столбцы результатов кандидатов одного уровня. Слово, окрестности 
+        и контекст собираются здесь, один раз для каждого оставшегося кандидата, 
+        а vicinity и context -- только если эти столбцы запрошены. text_base -- позиция
+        text[0] в тексте целиком (при потоковом сканировании text -- это окно), 
+        offsets -- карта из позиций нормализованного текста в позиции исходного, 
+        position -- какие буквы единиц в first_letters (для столбца position).
         """
-        
-        vicinity = self._get_vicinity(first_letters, id, n_gram_size)
-        context = self._get_context(text, matches, id, id+n_gram_size)
-
-        start_position = matches[id].span()[0]
-
-        candidate = AcrosticCandidate(start_pos=start_position,
-                                      n_gram_size=n_gram_size,
-                                      word=word,
-                                      vicinity=vicinity,
-                                      context=context,
-                                      level=level,
-                                      neighbour=neighbour)
-        return candidate
+
+        if offsets is None:
+            data['start_pos'].extend(starts[id] for id in ids)
+        else:
+            data['start_pos'].extend(offsets.to_original(starts[id]) for id in ids)
+        data['n_gram_size'].extend(sizes)
+        if self.folding is None:
+            data['word'].extend(first_letters[id:id+size] for id, size in zip(ids, sizes))
+        else:
+            data['word'].extend("|".join(self._packed.wordforms(first_letters[id:id+size])) 
+                                for id, size in zip(ids, sizes))
+        data['neighbour'].extend(neighbours)
+        if 'dictionary' in data:
+            fold = self.folding.fold_letters if self.folding is not None else str
+            data['dictionary'].extend(self._dictionary_names(fold(first_letters[id:id+size]))
+                                      for id, size in zip(ids, sizes))
+        data['level'].extend([level] * len(ids))
+        if 'position' in data:
+            data['position'].extend([position] * len(ids))
+
+        if 'vicinity' in data:
+            data['vicinity'].extend(self._get_vicinity(first_letters, id, size) 
+                                    for id, size in zip(ids, sizes))
+        if 'context' in data:
+            data['context'].extend(self._get_context(text, starts, id, id+size, text_base) 
+                                   for id, size in zip(ids, sizes))
     
+    def _extract_streams(self, text: str, levels: List[str]) -> Dict[str, Tuple[str, array]]:
+        """
+        Первые буквы нормализованного текста по уровням (см. prepare_text) с учётом 
+        в self.stats
+        """
+        with timed(self.stats, 'extraction'):
+            streams = self._get_first_letters_and_matches(text, levels)
+        if self.stats is not None:
+            for level, (first_letters, _) in streams.items():
+                self.stats.count(level, letters=len(first_letters))
+        return streams
+
 
     def _get_first_letters_and_matches(self, text: str, 
-                                       level: str) -> tuple[List[str], List[re.Match]]:
+                                       levels: List[str]) -> Dict[str, Tuple[str, array]]:
         """
-        Проходит по тексту и возвращает первые буквы каждого объекта 
-        соответствующего уровня (параграфы, предложения, слова), а также
-        соответствующие мэтч-объекты
+        Проходит по тексту один раз и возвращает для каждого из уровней (параграфы, 
+        предложения, слова) строку из первых букв каждого объекта, а также компактный 
+        массив позиций начала соответствующих совпадений в тексте (и так же для 
+        потоков других букв единиц, если они есть в levels)
         """
 
-        very_first_letter = r'^[^A-Za-zА-Яа-яЁё\n]*[A-Za-zА-Яа-яЁё]|'
-        pattern = very_first_letter+self.PATTERNS[level]
-        matches = list(re.finditer(pattern, text))
-        first_letters = [m.group()[-1].lower() for m in matches]
-
-        return first_letters, matches
+        return self.tokenizer.tokenize(text, levels)
 
 
-    def _get_vicinity(self, first_letters: List[str], id: int, n_gram_size: int) -> str:
+    def _get_vicinity(self, first_letters: str, id: int, n_gram_size: int) -> str:
         """
         Возвращает окрестности слева и справа для заданных позиций (т.е. для позиций в списке
         первых букв найденного кандидата в акростихи), если слева не хватает символов, заполняет их
@@ -317,9 +836,9 @@ class Scanner:
         left = first_letters[max(0, word_start - self.vicinity_range):word_start]
         right = first_letters[word_end:word_end + self.vicinity_range]
 
-        left = "".join(left).rjust(self.vicinity_range, "_")
-        right = "".join(right).ljust(self.vicinity_range, "_")
-        word = "".join(first_letters[word_start:word_end]).upper()
+        left = left.rjust(self.vicinity_range, "_")
+        right = right.ljust(self.vicinity_range, "_")
+        word = first_letters[word_start:word_end].upper()
 
         return f"{left}_{word}_{right}"
 
@@ -346,43 +865,104 @@ class Scanner:
         # return "".join(left_vicinity) + "_" + word.upper() + "_" + "".join(right_vicinity)
 
 
-    def _get_context(self, text:str, matches: List[re.Match], id_start: int, id_end: int) -> str:
+    def _get_context(self, text:str, starts: array, id_start: int, id_end: int, 
+                     text_base: int = 0) -> str:
         """
         Получает контекст по позиции найденного совпадения
         """
-        position_start = matches[id_start].span()[0]
+        position_start = starts[id_start] - text_base
         
-        id_end = min(len(matches) - 1, id_end) 
-        position_end = matches[id_end].span()[0]
+        id_end = min(len(starts) - 1, id_end) 
+        position_end = starts[id_end] - text_base
 
-        enough_word_length = 10
-
-        context = text[position_start: position_end + enough_word_length]
+        context = text[position_start: position_end + CONTEXT_TAIL]
 
         return context
 
 
-    def _get_n_gram_dict(self, dictionary: Set[str], n_gram_size: int) -> Set[str]:
+    def _load_cached_matcher(self, dictionary_name: str):
         """
-        Принимает на вход множество слов и единственный размер n-граммы, 
-        возвращает словарь n-грам (n-обрезков), сделанных из слов длины >= n
+        Берёт скомпилированное дерево из кэша словаря, а если кэша нет или он устарел -- 
+        загружает словарь, строит дерево и сохраняет кэш для следующих запусков
         """
+        cache = DictionaryCache(self._get_dict_path(dictionary_name))
+
+        cached = cache.load(self.min_word_size)
+        if cached is None:
+            self._dictionary = self._load_dictionary(dictionary_name)
+            trie = TrieMatcher(self._dictionary, self.min_word_size)
+            try:
+                header = cache.build(self._dictionary, trie)
+            except OSError:
+                # папка со словарём может быть недоступна для записи -- работаем без кэша
+                return trie
+            matcher = trie
+        else:
+            matcher, header = cached
+            self.max_word_length = header["max_word_length"]
 
-        n_dict = [word[0:n_gram_size] for word in dictionary if len(word) >= n_gram_size]
-        return set(n_dict)
+        self._dictionary_fingerprint = header["fingerprint"]
+        self._length_histogram = header["length_histogram"]
+        return matcher
 
 
-    def _get_n_grams(self, n_gram_size: int, letters: list[str]) -> List[str]:
+    def _load_named_dictionaries(self, dictionaries: List[NamedDictionary], matcher: str) -> None:
         """
-        Принимает на вход размер n-граммы, список букв, и составляет скользящим окном
-        из букв n-граммы заданного размера
+        Загружает несколько словарей: для каждого -- его (свёрнутые) слова в SortedWords, 
+        чтобы помечать находки, и общий движок поиска по объединению всех словарей 
+        с наименьшей из их минимальных длин
         """
-        
-        n_grams = []
-        for i in range(len(letters)):
-            n_grams.append(''.join(letters[i:i+n_gram_size]))
-   
-        return n_grams
+        names = [dictionary.name for dictionary in dictionaries]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Dictionary names must be unique: {', '.join(names)}")
+
+        def words_of(dictionary: NamedDictionary) -> Iterable[str]:
+            if dictionary.words is not None:
+                return dictionary.words
+            return self._read_words(dictionary.file)
+
+        fold = self.folding.fold if self.folding is not None else str
+        self._named = [(dictionary.name, dictionary.min_word_size or self.min_word_size,
+                        SortedWords.from_words(map(fold, words_of(dictionary))))
+                       for dictionary in dictionaries]
+        self.min_word_size = min(size for _, size, _ in self._named)
+
+        all_words = chain.from_iterable(words_of(dictionary) for dictionary in dictionaries)
+        if self.folding is not None or matcher == 'compact':
+            self._packed = PackedDictionary(all_words, self.folding)
+            words = self._packed.words if matcher == 'compact' else set(self._packed)
+            self.max_word_length = self._packed.max_word_length
+        else:
+            self._dictionary = words = set(all_words)
+        self.matcher = MATCHERS[matcher](words, self.min_word_size)
+
+        # отпечаток всех словарей вместе с их именами, длинами и свёрткой
+        fingerprint = hashlib.sha256(json.dumps({"folding": str(self.folding or ""),
+                                                 "dictionaries": [[name, size, hashlib.sha256(words.buffer).hexdigest()]
+                                                                  for name, size, words in self._named]},
+                                                ensure_ascii=False).encode("utf-8"))
+        for _, _, words in self._named:
+            fingerprint.update(words.offsets.tobytes())
+        self._dictionary_fingerprint = fingerprint.hexdigest()
+
+
+    def _dictionary_names(self, letters: str) -> str:
+        """
+        Через | имена словарей, в которых есть (уже свёрнутое) сочетание letters и 
+        для которых оно не короче их минимальной длины ('' -- таких словарей нет)
+        """
+        codes = SortedWords.encode(letters)
+        return "|".join(name for name, min_word_size, words in self._named
+                        if len(letters) >= min_word_size and codes in words)
+
+
+    def _read_words(self, dictionary_name: str) -> Iterator[str]:
+        """
+        Слова файла словаря по одному (файл читается построчно)
+        """
+        with open(self._get_dict_path(dictionary_name), encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip("\r\n")
 
 
     def _load_dictionary(self, dictionary_name: str) -> Set[str]:
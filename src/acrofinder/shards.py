@@ -0,0 +1,198 @@
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+from .batch_scanner import SINKS
+from .sources import ShardedSource
+
+
+# BOM, с которым CsvSink начинает файл результатов
+CSV_BOM = b'\xef\xbb\xbf'
+
+
+class ShardMerge:
+    """
+    Собирает результаты шардов корпуса (см. ShardedSource), просканированных, например,
+    на разных машинах, в один файл результатов и один отчёт. Шарды находятся по их
+    сводкам (<дата>_<время>_shard.json рядом с результатами); перед сборкой
+    проверяется, что есть все шарды, каждый -- один раз, и что все они сканировались
+    одним словарём, с одними параметрами и на одном и том же корпусе
+    """
+
+    # что должно совпадать у всех шардов: название для сообщения и как его достать из сводки
+    SAME = (("число шардов", lambda summary: summary["shard"]["count"]),
+            ("отпечаток словаря", lambda summary: summary["dictionary_fingerprint"]),
+            ("параметры сканирования", lambda summary: summary["config"]),
+            ("формат результатов", lambda summary: summary["format"]),
+            ("документов в корпусе", lambda summary: summary["corpus_documents"]),
+            ("байт в корпусе", lambda summary: summary["corpus_bytes"]))
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        """
+        Аргументы:
+            paths [Path, ...]: сводки шардов или директории, в которых они лежат
+        """
+        self.shards: List[dict] = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files = sorted(path.glob(f"*{ShardedSource.SUMMARY_SUFFIX}"))
+            elif path.is_file():
+                files = [path]
+            else:
+                files = []
+            if not files:
+                raise FileNotFoundError(f"Сводки шардов не найдены: {path}")
+            for file in files:
+                summary = json.loads(file.read_text(encoding='utf-8'))
+                summary["path"] = file
+                self.shards.append(summary)
+        if not self.shards:
+            raise FileNotFoundError("Не переданы сводки шардов")
+        self.shards.sort(key=lambda summary: summary["shard"]["index"])
+
+
+    @property
+    def count(self) -> int:
+        return self.shards[0]["shard"]["count"]
+
+
+    def check(self) -> None:
+        """
+        Проверяет, что шарды можно собрать вместе, иначе ValueError с описанием, что не так
+        """
+        for label, get in self.SAME:
+            values = [get(summary) for summary in self.shards]
+            if any(value != values[0] for value in values):
+                differences = "; ".join(f"{self._label(summary)} ({summary['path'].name}): {value}"
+                                        for summary, value in zip(self.shards, values))
+                raise ValueError(f"У шардов разные значения «{label}»: {differences}")
+
+        seen = {}
+        for summary in self.shards:
+            index = summary["shard"]["index"]
+            if index in seen:
+                raise ValueError(f"Шард {self._label(summary)} встречается больше одного раза: "
+                                 f"{seen[index].name}, {summary['path'].name}")
+            seen[index] = summary["path"]
+        missing = [f"{index}/{self.count}" for index in range(1, self.count + 1) if index not in seen]
+        if missing:
+            raise ValueError(f"Не хватает шардов: {', '.join(missing)}")
+
+
+    def merge(self, output_dir: Path) -> Tuple[Path, Path]:
+        """
+        Проверяет шарды (check) и сохраняет в output_dir результаты всех шардов одним
+        файлом (<дата>_<время>_results в формате шардов; строки -- по порядку шардов,
+        внутри шарда -- как в его результатах) и сводный отчёт <дата>_<время>_meta.txt
+
+        Возвращает:
+            (Path, Path): файл результатов и отчёт
+        """
+        self.check()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        merge_time = datetime.now()
+        prefix = f"{merge_time.strftime('%y%m%d')}_{int(merge_time.timestamp())}"
+
+        output_format = self.shards[0]["format"]
+        results_path = output_dir / f"{prefix}_results.{SINKS[output_format].EXTENSION}"
+        if output_format == 'csv':
+            self._merge_csv(results_path)
+        elif output_format == 'jsonl':
+            with open(results_path, 'wb') as out:
+                for summary in self.shards:
+                    with open(self._results_path(summary), 'rb') as f:
+                        shutil.copyfileobj(f, out)
+        else:
+            # ParquetSink сам сообщит, если pyarrow не установлен
+            sink = SINKS[output_format](results_path)
+            import pyarrow.parquet
+            for summary in self.shards:
+                path = self._results_path(summary)
+                # parquet не создаётся, если в шарде не было ни одного прочитанного файла
+                if path.exists():
+                    for batch in pyarrow.parquet.ParquetFile(path).iter_batches():
+                        sink.write(batch.to_pandas())
+            sink.close()
+
+        report_path = output_dir / f"{prefix}_meta.txt"
+        report_path.write_text(self.report(merge_time), encoding='utf-8')
+        return results_path, report_path
+
+
+    def report(self, merge_time: datetime) -> str:
+        """
+        Сводный отчёт: итоги по всем шардам, параметры и время каждого шарда
+        """
+        first = self.shards[0]
+        files = sum(summary["files_processed"] for summary in self.shards)
+        chars = sum(summary["chars"] for summary in self.shards)
+        candidates = sum(summary["candidates"] for summary in self.shards)
+        failed_files = [failed for summary in self.shards for failed in summary["failed_files"]]
+        totals = [summary["timings"].get("total", 0.0) for summary in self.shards]
+
+        lines = []
+        lines.append("📊 СВОДНЫЙ ОТЧЁТ ПО ШАРДАМ")
+        lines.append("=" * 50)
+        lines.append(f"📅 Дата и время:     {merge_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append(f"📂 Источник:          {first['source']}")
+        lines.append(f"🧩 Шардов:            {self.count}")
+        lines.append("")
+        lines.append("⚙️  ПАРАМЕТРЫ:")
+        for key, value in first["params"].items():
+            lines.append(f"   • {key:<20} {value}")
+        lines.append(f"   • {'словарь (sha256)':<20} {first['dictionary_fingerprint']}")
+        lines.append("")
+        lines.append(f"📁 Файлов обработано: {files}")
+        lines.append(f"📝 Символов всего:    {chars:,}".replace(",", " "))
+        lines.append(f"🎯 Кандидатов найдено: {candidates}")
+        if failed_files:
+            lines.append(f"⚠️  Не удалось прочитать: {len(failed_files)}")
+            for name, error in failed_files:
+                lines.append(f"   • {name}: {error}")
+        lines.append("")
+        lines.append(f"⏱️  ВРЕМЯ ПО ШАРДАМ (с): самый долгий {max(totals):.2f}, всего {sum(totals):.2f}")
+        for summary, total in zip(self.shards, totals):
+            speed = f"{summary['chars'] / total:,.0f} симв/с".replace(",", " ") if total else "-"
+            lines.append(f"   • {self._label(summary):<6} {total:.2f} ({speed}; файлов {summary['files_processed']}, "
+                         f"кандидатов {summary['candidates']}; {summary['scan_time']}, {summary['report']})")
+        lines.append("")
+        lines.append("✅ Готово.")
+
+        return "\n".join(lines)
+
+
+    def _merge_csv(self, results_path: Path) -> None:
+        """
+        Склеивает CSV шардов побайтно: заголовок (с BOM) -- один раз, из первого
+        непустого шарда, у остальных он должен совпадать
+        """
+        header = None
+        with open(results_path, 'wb') as out:
+            for summary in self.shards:
+                with open(self._results_path(summary), 'rb') as f:
+                    line = f.readline()
+                    if line.startswith(CSV_BOM):
+                        line = line[len(CSV_BOM):]
+                    if not line:
+                        continue
+                    if header is None:
+                        header = line
+                        out.write(CSV_BOM + header)
+                    elif line != header:
+                        raise ValueError(f"Столбцы результатов шарда {self._label(summary)} "
+                                         f"отличаются от столбцов первого шарда")
+                    shutil.copyfileobj(f, out)
+            if header is None:
+                out.write(CSV_BOM)
+
+
+    @staticmethod
+    def _results_path(summary: dict) -> Path:
+        return summary["path"].parent / summary["results"]
+
+
+    @staticmethod
+    def _label(summary: dict) -> str:
+        return f"{summary['shard']['index']}/{summary['shard']['count']}"
@@ -0,0 +1,304 @@
+import csv
+import hashlib
+import json
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .reader import CorpusReader, Document
+
+
+class CorpusSource:
+    """
+    Источник текстов корпуса для BatchScanner: выдаёт документы (Document) по одному,
+    так что весь корпус не держится в памяти
+    """
+
+    # как источник называется в отчёте о сканировании
+    LABEL = "Источник"
+
+    def documents(self) -> Iterable[Document]:
+        raise NotImplementedError
+
+
+    def metadata_columns(self) -> List[str]:
+        """
+        Столбцы метаданных, которые добавляются к результатам каждого документа
+        """
+        return []
+
+
+class DirectorySource(CorpusSource):
+    """
+    Тексты директории: файлы .txt, сжатые файлы и архивы (см. CorpusReader)
+    """
+
+    LABEL = "Директория"
+
+    def __init__(self, directory: Path, reader: Optional[CorpusReader] = None) -> None:
+        if not directory.exists() or not directory.is_dir():
+            raise FileNotFoundError(f"Директория с текстами не найдена: {directory}")
+        self.directory = directory
+        self.reader = reader or CorpusReader()
+
+
+    def documents(self) -> List[Document]:
+        # список имён файлов небольшой, а его длина нужна для прогресс-бара
+        return self.reader.list_documents(self.directory)
+
+
+    def __str__(self) -> str:
+        return str(self.directory.resolve())
+
+
+class RecordSource(CorpusSource):
+    """
+    Корпус в одном файле, где каждая запись -- отдельный текст со своими метаданными.
+    Записи читаются по одной; документ записи называется <имя файла>/<id записи>
+    (id -- значение поля id_field или номер записи, начиная с 0)
+    """
+
+    LABEL = "Файл корпуса"
+
+    def __init__(self, path: Path, text_field: str = "text",
+                 metadata: Optional[Union[Dict[str, str], Iterable[str]]] = None,
+                 id_field: Optional[str] = None) -> None:
+        """
+        Аргументы:
+            path (Path): файл корпуса
+            text_field (str): поле записи с текстом
+            metadata (dict[str, str] | list[str], optional): столбцы метаданных в
+            результатах: {столбец: поле записи} или список полей (столбцы называются
+            так же, как поля)
+            id_field (str, optional): поле записи с её id
+        """
+        if not path.is_file():
+            raise FileNotFoundError(f"Файл корпуса не найден: {path}")
+        self.path = path
+        self.text_field = text_field
+        if metadata is None:
+            metadata = {}
+        elif not isinstance(metadata, dict):
+            metadata = {field: field for field in metadata}
+        self.metadata = metadata
+        self.id_field = id_field
+
+
+    def documents(self) -> Iterator[Document]:
+        for n, (record_id, text, metadata, error) in enumerate(self._records()):
+            record_id = str(n) if record_id in (None, "") else str(record_id)
+            yield Document(f"{self.path.name}/{record_id}", self.path, record_id,
+                           error=error, text=text, metadata=metadata,
+                           size=None if text is None else len(text.encode('utf-8')))
+
+
+    def metadata_columns(self) -> List[str]:
+        return list(self.metadata)
+
+
+    def options(self) -> dict:
+        """
+        Параметры, с которыми источник можно создать заново (кроме path)
+        """
+        return {"text_field": self.text_field, "metadata": self.metadata, "id_field": self.id_field}
+
+
+    def __str__(self) -> str:
+        return str(self.path.resolve())
+
+
+    def _records(self) -> Iterator[Tuple[Optional[str], Optional[str], Dict[str, Optional[str]], Optional[str]]]:
+        """
+        Записи файла: (id, текст, метаданные, ошибка)
+        """
+        raise NotImplementedError
+
+
+    def _from_mapping(self, record: dict) -> Tuple[Optional[str], Optional[str], Dict[str, Optional[str]], Optional[str]]:
+        record_id = record.get(self.id_field) if self.id_field else None
+        metadata = {column: self._as_str(record.get(field)) for column, field in self.metadata.items()}
+        text = record.get(self.text_field)
+        if not isinstance(text, str):
+            return record_id, None, metadata, f"KeyError: нет текста в поле '{self.text_field}'"
+        return record_id, text, metadata, None
+
+
+    @staticmethod
+    def _as_str(value) -> Optional[str]:
+        return None if value is None else str(value)
+
+
+class JsonlSource(RecordSource):
+    """
+    JSON Lines: по записи-объекту на строку
+    """
+
+    def _records(self):
+        with open(self.path, encoding='utf-8-sig') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield None, None, dict.fromkeys(self.metadata), f"JSONDecodeError: строка {line_number}: {e}"
+                    continue
+                if not isinstance(record, dict):
+                    yield None, None, dict.fromkeys(self.metadata), f"ValueError: строка {line_number}: не объект"
+                    continue
+                yield self._from_mapping(record)
+
+
+class CsvSource(RecordSource):
+    """
+    CSV с заголовком: текст -- в столбце text_field
+    """
+
+    def _records(self):
+        # тексты бывают длиннее стандартного ограничения на размер поля
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        with open(self.path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None or self.text_field not in reader.fieldnames:
+                raise ValueError(f"В {self.path.name} нет столбца с текстом '{self.text_field}'")
+            for record in reader:
+                yield self._from_mapping(record)
+
+
+class XmlSource(RecordSource):
+    """
+    XML: записи -- элементы record_tag на любой глубине. Файл разбирается
+    инкрементально (iterparse), и каждая запись удаляется из дерева сразу после
+    того, как прочитана, так что память не зависит от размера файла.
+
+    Поля записи -- пути относительно её элемента (как в Element.find, например
+    'text' или 'meta/author'), '@имя' -- атрибут самого элемента записи. По
+    умолчанию подходит для all.xml из PoetryCorpus
+    """
+
+    def __init__(self, path: Path, record_tag: str = "item", text_field: str = "text",
+                 metadata: Optional[Union[Dict[str, str], Iterable[str]]] = None,
+                 id_field: Optional[str] = None) -> None:
+        """
+        Аргументы:
+            record_tag (str): тег элемента записи
+            (остальные -- как у RecordSource)
+        """
+        if metadata is None:
+            metadata = {"author": "author", "title": "name"}
+        super().__init__(path, text_field, metadata, id_field)
+        self.record_tag = record_tag
+
+
+    def _records(self):
+        parents = []
+        for event, element in ET.iterparse(self.path, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if element.tag != self.record_tag:
+                continue
+            record = {field: self._field(element, field)
+                      for field in {self.text_field, self.id_field, *self.metadata.values()} if field}
+            yield self._from_mapping(record)
+
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+
+
+    def options(self) -> dict:
+        return {**super().options(), "record_tag": self.record_tag}
+
+
+    @staticmethod
+    def _field(element: ET.Element, path: str) -> Optional[str]:
+        if path.startswith("@"):
+            return element.get(path[1:])
+        found = element.find(path)
+        return None if found is None else "".join(found.itertext())
+
+
+# источники корпуса в одном файле по расширению
+RECORD_SOURCES = {'.xml': XmlSource, '.jsonl': JsonlSource, '.csv': CsvSource}
+
+
+class ShardedSource(CorpusSource):
+    """
+    Одна из count частей (шардов) другого источника -- чтобы сканировать большой корпус 
+    на нескольких машинах: каждая запускается со своим index, а результаты потом 
+    собираются вместе (см. shards.ShardMerge). Документ попадает в шард по хэшу 
+    своего имени (пути внутри корпуса): sha256(имя) mod count. Разбиение зависит только 
+    от имени документа, так что на всех машинах оно одинаковое, а если в корпусе 
+    появляются или пропадают документы, остальные остаются в прежних шардах (и их 
+    результаты прошлых прогонов можно переиспользовать). Байты по шардам при этом 
+    делятся поровну лишь в среднем. Внутри шарда документы идут в том же порядке, 
+    что и в источнике
+    """
+
+    # сводка шарда, которую BatchScanner.scan_directory сохраняет рядом с результатами
+    SUMMARY_SUFFIX = "_shard.json"
+
+    def __init__(self, source: CorpusSource, index: int, count: int) -> None:
+        """
+        Аргументы:
+            source (CorpusSource): весь корпус
+            index (int): номер шарда, от 1 до count
+            count (int): на сколько шардов делится корпус
+        """
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Номер шарда должен быть от 1 до {count}: {index}")
+        self.source = source
+        self.index = index
+        self.count = count
+        self.LABEL = source.LABEL
+        # сколько документов и байт во всём корпусе (известно после прохода по documents)
+        self.corpus_documents: Optional[int] = None
+        self.corpus_bytes: Optional[int] = None
+
+
+    @staticmethod
+    def parse(spec: str) -> Tuple[int, int]:
+        """
+        Номер шарда и число шардов из строки вида K/N (например 2/5)
+        """
+        index, slash, count = spec.partition("/")
+        if not slash or not index.strip().isdigit() or not count.strip().isdigit():
+            raise ValueError(f"Шард задаётся как K/N (например 2/5): {spec}")
+        index, count = int(index), int(count)
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Номер шарда должен быть от 1 до {count}: {spec}")
+        return index, count
+
+
+    def documents(self) -> Iterable[Document]:
+        documents = self.source.documents()
+        if isinstance(documents, list):
+            # список документов (директория) остаётся списком: по нему считается прогресс
+            return list(self._by_hash(documents))
+        return self._by_hash(documents)
+
+
+    def metadata_columns(self) -> List[str]:
+        return self.source.metadata_columns()
+
+
+    def __str__(self) -> str:
+        return f"{self.source} (шард {self.index}/{self.count})"
+
+
+    def _by_hash(self, documents: Iterable[Document]) -> Iterator[Document]:
+        self.corpus_documents = self.corpus_bytes = 0
+        for document in documents:
+            self.corpus_documents += 1
+            self.corpus_bytes += document.size or 0
+            if self._hash(document.name) % self.count == self.index - 1:
+                yield document
+
+
+    @staticmethod
+    def _hash(name: str) -> int:
+        return int.from_bytes(hashlib.sha256(name.encode("utf-8", "surrogatepass")).digest()[:8], "big")
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, Optional
+
+
+# этапы сканирования в порядке выполнения
+STAGES = ('normalization', 'extraction', 'matching', 'neighbours', 'columns', 'dataframe')
+# как этапы называются в отчётах
+STAGE_LABELS = {'normalization': 'нормализация', 'extraction': 'первые буквы', 
+                'matching': 'поиск по словарю', 'neighbours': 'соседи и фильтр', 
+                'columns': 'столбцы', 'dataframe': 'DataFrame'}
+# этапы, время которых считается и по уровням (нормализация и извлечение первых букв
+# делаются за один проход для всех уровней, а таблица строится одна на все уровни)
+LEVEL_STAGES = ('matching', 'neighbours', 'columns')
+# счётчики по уровням: первые буквы, проверенные движком поиска префиксы, словарные
+# совпадения, совпадения без подходящих соседей (при фильтрации по соседям) и кандидаты
+COUNTERS = ('letters', 'probes', 'hits', 'dropped', 'candidates')
+
+
+class ScanStats:
+    """
+    Таймеры этапов и счётчики сканирования (см. Scanner.stats). Собираются для одного
+    текста или суммируются по корпусу (merge); to_dict -- в виде для JSON
+    """
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        # уровень -> счётчики и "seconds" -- время этапов LEVEL_STAGES на этом уровне
+        self.levels: Dict[str, dict] = {}
+
+
+    @contextmanager
+    def timer(self, stage: str, level: Optional[str] = None) -> Iterator[None]:
+        """
+        Добавляет к этапу stage (и к нему же на уровне level) время выполнения блока with
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, level)
+
+
+    def add_time(self, stage: str, seconds: float, level: Optional[str] = None) -> None:
+        self.seconds[stage] += seconds
+        if level is not None and stage in LEVEL_STAGES:
+            self._level(level)["seconds"][stage] += seconds
+
+
+    def count(self, level: str, **counters: int) -> None:
+        """
+        Прибавляет значения счётчиков уровня, например count('word', hits=10)
+        """
+        level_stats = self._level(level)
+        for name, value in counters.items():
+            level_stats[name] += value
+
+
+    def merge(self, other: "ScanStats") -> None:
+        """
+        Прибавляет к этой статистике другую (например, статистику следующего файла)
+        """
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] += seconds
+        for level, other_stats in other.levels.items():
+            level_stats = self._level(level)
+            for name in COUNTERS:
+                level_stats[name] += other_stats[name]
+            for stage in LEVEL_STAGES:
+                level_stats["seconds"][stage] += other_stats["seconds"][stage]
+
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.seconds.values())
+
+
+    def to_dict(self) -> dict:
+        return {
+            "seconds": {stage: round(seconds, 6) for stage, seconds in self.seconds.items()},
+            "levels": {level: {**{name: level_stats[name] for name in COUNTERS},
+                               "seconds": {stage: round(seconds, 6)
+                                           for stage, seconds in level_stats["seconds"].items()}}
+                       for level, level_stats in self.levels.items()},
+        }
+
+
+    def _level(self, level: str) -> dict:
+        if level not in self.levels:
+            self.levels[level] = {**dict.fromkeys(COUNTERS, 0), "seconds": dict.fromkeys(LEVEL_STAGES, 0.0)}
+        return self.levels[level]
+
+
+def timed(stats: Optional[ScanStats], stage: str, level: Optional[str] = None) -> ContextManager:
+    """
+    stats.timer(stage, level), а если статистика не собирается (stats=None) -- пустой блок
+    """
+    return nullcontext() if stats is None else stats.timer(stage, level)
@@ -0,0 +1,264 @@
+import io
+import re
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+
+LEVELS = ('paragraph', 'sentence', 'word')
+
+LETTERS = 'A-Za-zА-Яа-яЁё'
+
+# какую букву единицы брать: первую (акростих), последнюю (телестих) или n-ю 
+# (мезостих; позиция -- номер буквы, начиная с 1)
+FIRST = 'first'
+LAST = 'last'
+
+# всё, что не буква (внутри слова -- цифры и _)
+NOT_LETTERS_PATTERN = re.compile(f'[^{LETTERS}]+')
+
+
+def canonical_position(position: Union[str, int]) -> str:
+    """
+    Позиция буквы в единице в виде, в котором она пишется в имени потока и в 
+    столбце position: 'first', 'last' или номер буквы строкой ('3'); номер 1 -- это 'first'
+    """
+    if position in (FIRST, LAST):
+        return position
+    if isinstance(position, int) or (isinstance(position, str) and position.isdigit()):
+        number = int(position)
+        if number >= 1:
+            return FIRST if number == 1 else str(number)
+    raise ValueError(f"Invalid position: {position}. Expected 'first', 'last' or a letter number >= 1")
+
+
+def stream_name(level: str, position: Union[str, int] = FIRST) -> str:
+    """
+    Имя потока букв: для первых букв -- сам уровень ('word'), для остальных -- 
+    уровень и позиция ('word:last', 'sentence:3')
+    """
+    position = canonical_position(position)
+    return level if position == FIRST else f"{level}:{position}"
+
+
+def parse_stream_name(name: str) -> Tuple[str, str]:
+    """
+    (уровень, позиция) по имени потока (см. stream_name)
+    """
+    level, _, position = name.partition(':')
+    return level, position or FIRST
+
+
+@dataclass
+class TokenizerState:
+    """
+    Состояние токенизатора между кусками текста при потоковом сканировании
+    """
+    # позиции, с которых начнётся следующее предложение/абзац (None -- уже начались)
+    sentence_pending: Optional[int] = 0
+    paragraph_pending: Optional[int] = 0
+    # самая первая буква текста ещё не встречена и до неё не было перевода строки
+    first_pending: bool = True
+    # последний символ предыдущего куска -- часть слова (\w)
+    prev_is_word_char: bool = False
+
+
+class _UnitLetters:
+    """
+    Последняя и n-е буквы единиц одного уровня: буквы единицы добавляются по мере 
+    прохода по тексту, последняя записывается, когда начинается следующая единица 
+    (или кончается текст). Позиция каждой буквы в потоке -- начало её единицы
+    """
+
+    def __init__(self, nth: Dict[int, Tuple[io.StringIO, array]], 
+                 last: Optional[Tuple[io.StringIO, array]]) -> None:
+        self.nth = nth
+        self.last = last
+        self.start: Optional[int] = None
+        self.count = 0
+        self.last_letter = ''
+
+    def begin(self, start: int) -> None:
+        self.close()
+        self.start = start
+
+    def add(self, letters: str) -> None:
+        if self.start is None or not letters:
+            return
+        for number, (buffer, starts) in self.nth.items():
+            if self.count < number <= self.count + len(letters):
+                buffer.write(letters[number - self.count - 1])
+                starts.append(self.start)
+        self.count += len(letters)
+        self.last_letter = letters[-1]
+
+    def close(self) -> None:
+        if self.start is not None and self.last is not None and self.last_letter:
+            self.last[0].write(self.last_letter)
+            self.last[1].append(self.start)
+        self.start = None
+        self.count = 0
+        self.last_letter = ''
+
+
+class Tokenizer:
+    """
+    За один проход по тексту извлекает первые буквы единиц сразу для всех
+    запрошенных уровней (абзацы, предложения, слова) и позиции, с которых
+    эти единицы начинаются, а если нужно -- ещё и последние или n-е буквы единиц
+    """
+
+    # перевод строки | конец предложения | буква и хвост слова после неё
+    TOKEN_PATTERN = re.compile(rf'\n|[.!?]|[{LETTERS}]\w*')
+
+    def tokenize(self, text: str, levels: List[str], state: Optional[TokenizerState] = None, 
+                 base: int = 0) -> Dict[str, Tuple[str, array]]:
+        """
+        Проходит по тексту один раз и для каждого уровня из levels возвращает
+        первые буквы единиц (в нижнем регистре) и позиции начала единиц в тексте.
+
+        Правила те же, что были у регулярок по уровням:
+          - абзац начинается в начале текста и после каждого перевода строки,
+            его первая буква -- первая буква до следующего перевода строки, позиция --
+            начало строки;
+          - предложение начинается так же, как абзац, а ещё после первого из знаков
+            .!? (до следующей буквы в той же строке);
+          - слово -- буква, перед которой нет буквенно-цифрового символа; самая первая
+            буква текста (если до неё не было перевода строки) считается началом
+            единицы с позиции 0 на любом уровне.
+
+        Кроме уровней, в levels можно передать имена потоков других букв единиц 
+        (см. stream_name): 'word:last' -- последние буквы слов, 'sentence:3' -- третьи 
+        буквы предложений и т.п. Буквы единицы -- все буквы от её начала до начала 
+        следующей единицы того же уровня (у слова -- до конца слова); единицы, в 
+        которых меньше n букв, в поток n-х букв не попадают. Все потоки извлекаются 
+        за тот же один проход; позиция буквы в любом потоке -- начало её единицы.
+
+        Аргументы:
+            text (str): нормализованный текст
+            levels [str, str, ...]: уровни (или имена потоков), для которых нужны 
+            последовательности букв
+            state (TokenizerState, optional): состояние после предыдущего куска текста; 
+            передаётся при потоковом сканировании и обновляется по итогам этого куска 
+            (только для первых букв: последняя буква единицы известна, лишь когда 
+            единица кончилась)
+            base (int): позиция начала text в общем тексте (к ней отсчитываются позиции)
+
+        Возвращает:
+            dict: уровень (имя потока) -> (строка букв, массив позиций начала единиц array('q'))
+        """
+        # буквы пишем сразу в строковый буфер, позиции -- в компактный массив,
+        # чтобы не держать в памяти по объекту на каждое слово текста
+        buffers = {level: (io.StringIO(), array('q')) for level in levels}
+
+        # уровень -> последние и n-е буквы его единиц (если они запрошены)
+        units: Dict[str, _UnitLetters] = {}
+        for name, buffer in buffers.items():
+            level, position = parse_stream_name(name)
+            position = canonical_position(position)
+            if position == FIRST:
+                continue
+            unit = units.setdefault(level, _UnitLetters({}, None))
+            if position == LAST:
+                unit.last = buffer
+            else:
+                unit.nth[int(position)] = buffer
+        if units and state is not None:
+            raise ValueError("Only first letters can be extracted from a text in chunks")
+
+        word_letters, word_starts = buffers.get('word', (None, None))
+        sentence_letters, sentence_starts = buffers.get('sentence', (None, None))
+        paragraph_letters, paragraph_starts = buffers.get('paragraph', (None, None))
+        word_units = units.get('word')
+        sentence_units = units.get('sentence')
+        paragraph_units = units.get('paragraph')
+        has_words = word_letters is not None or word_units is not None
+
+        if state is None:
+            state = TokenizerState()
+
+        sentence_pending = state.sentence_pending
+        paragraph_pending = state.paragraph_pending
+        first_pending = state.first_pending
+
+        for match in self.TOKEN_PATTERN.finditer(text):
+            position = match.start()
+            char = text[position]
+
+            if char == '\n':
+                sentence_pending = paragraph_pending = base + position + 1
+                first_pending = False
+                continue
+
+            if char in '.!?':
+                if sentence_pending is None:
+                    sentence_pending = base + position + 1
+                continue
+
+            letter = char.lower()
+
+            # позиция начала слова, если с этой буквы слово начинается
+            word_start = None
+            if has_words:
+                if first_pending:
+                    word_start = 0
+                elif position == 0:
+                    if not state.prev_is_word_char:
+                        word_start = base
+                elif not self._is_word_char(text[position - 1]):
+                    word_start = base + position
+                if word_start is not None and word_letters is not None:
+                    word_letters.write(letter)
+                    word_starts.append(word_start)
+
+            if sentence_pending is not None:
+                if sentence_letters is not None:
+                    sentence_letters.write(letter)
+                    sentence_starts.append(sentence_pending)
+                if sentence_units is not None:
+                    sentence_units.begin(sentence_pending)
+                sentence_pending = None
+
+            if paragraph_pending is not None:
+                if paragraph_letters is not None:
+                    paragraph_letters.write(letter)
+                    paragraph_starts.append(paragraph_pending)
+                if paragraph_units is not None:
+                    paragraph_units.begin(paragraph_pending)
+                paragraph_pending = None
+
+            first_pending = False
+
+            if units:
+                token = match.group()
+                letters = (token if token.isalpha() else NOT_LETTERS_PATTERN.sub('', token)).lower()
+                if word_units is not None:
+                    # буквы после цифр ("2й") ни к какому слову не относятся
+                    if word_start is not None:
+                        word_units.begin(word_start)
+                        word_units.add(letters)
+                    else:
+                        word_units.close()
+                if sentence_units is not None:
+                    sentence_units.add(letters)
+                if paragraph_units is not None:
+                    paragraph_units.add(letters)
+
+        for unit in units.values():
+            unit.close()
+
+        state.sentence_pending = sentence_pending
+        state.paragraph_pending = paragraph_pending
+        state.first_pending = first_pending
+        if text:
+            state.prev_is_word_char = self._is_word_char(text[-1])
+
+        return {level: (letters.getvalue(), starts) for level, (letters, starts) in buffers.items()}
+
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        """
+        Символ, который регулярки считают частью слова (\\w)
+        """
+        return char.isalnum() or char == '_'
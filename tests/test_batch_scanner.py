@@ -0,0 +1,350 @@
+import sys
+from pathlib import Path
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.scanner import Scanner
+from acrofinder.batch_scanner import BatchScanner
+from acrofinder.manifest import ScanManifest
+
+
+TEXT = 'Каждый охотник грозился достать аркебузу. Кот ел.\n'
+
+
+def make_corpus(directory: Path) -> Path:
+    texts = directory / "texts"
+    texts.mkdir()
+    for i in range(4):
+        (texts / f"t{i}.txt").write_text(TEXT * (i + 1), encoding='utf-8')
+    (texts / "cp1251.txt").write_bytes(TEXT.encode('windows-1251'))
+    return texts
+
+
+def test_parallel_scan_matches_sequential(tmp_path):
+    texts = make_corpus(tmp_path)
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+
+    sequential = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(save_results=False)
+    parallel = BatchScanner(scanner, texts, tmp_path / "out", workers=2).scan_directory(save_results=False)
+
+    assert len(sequential) == 11
+    assert sequential.equals(parallel)
+
+
+def test_unreadable_file_is_reported(tmp_path):
+    texts = make_corpus(tmp_path)
+    (texts / "broken.txt").symlink_to(tmp_path / "missing.txt")
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+
+    res = BatchScanner(scanner, texts, tmp_path / "out", workers=2).scan_directory()
+
+    assert "broken.txt" not in set(res.source_file)
+    report = next((tmp_path / "out").glob("*_meta.txt")).read_text(encoding='utf-8')
+    assert "broken.txt" in report
+
+
+def test_incremental_scan_reuses_unchanged_files(tmp_path):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    batch = BatchScanner(scanner, texts, out)
+
+    full = batch.scan_directory(levels=['word', 'sentence'], save_results=False)
+    first = batch.scan_directory(levels=['word', 'sentence'], save_results=False, incremental=True)
+    assert first.equals(full)
+
+    (texts / "t0.txt").write_text(TEXT * 3, encoding='utf-8')
+    (texts / "new.txt").write_text(TEXT, encoding='utf-8')
+    scanned = []
+    original_scan_text = scanner.scan_text
+    scanner.scan_text = lambda text, **kwargs: scanned.append(text) or original_scan_text(text, **kwargs)
+
+    second = batch.scan_directory(levels=['word', 'sentence'], incremental=True)
+
+    assert sorted(map(len, scanned)) == [len(TEXT), len(TEXT) * 3]
+    assert second.equals(batch.scan_directory(levels=['word', 'sentence'], save_results=False))
+    report = next(out.glob("*_meta.txt")).read_text(encoding='utf-8')
+    assert "взято из прошлых прогонов: 4" in report
+
+
+def test_incremental_scan_rescans_when_parameters_change(tmp_path):
+    texts = make_corpus(tmp_path)
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    batch = BatchScanner(scanner, texts, tmp_path / "out")
+
+    batch.scan_directory(levels=['word'], save_results=False, incremental=True)
+    scanned = []
+    original_scan_text = scanner.scan_text
+    scanner.scan_text = lambda text, **kwargs: scanned.append(text) or original_scan_text(text, **kwargs)
+
+    batch.scan_directory(levels=['word'], save_results=False, incremental=True, 
+                         filter_by_neighbours=True)
+
+    assert len(scanned) == 5
+
+
+def test_manifest_is_compacted_and_survives_deleted_files(tmp_path):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    batch = BatchScanner(Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False), texts, out)
+    for filter_by_neighbours in (False, True, False):
+        batch.scan_directory(levels=['word'], save_results=False, incremental=True, 
+                             filter_by_neighbours=filter_by_neighbours)
+
+    manifest = ScanManifest(out)
+
+    # каждый прогон дописывает 5 записей, при загрузке остаётся по одной на файл
+    assert len(manifest.path.read_text(encoding='utf-8').splitlines()) == len(manifest.records) == 5
+    config = next(iter(manifest.records.values()))["config"]
+    assert manifest.lookup(texts / "t0.txt", config) is not None
+    (texts / "t0.txt").unlink()
+    assert manifest.lookup(texts / "t0.txt", config) is None
+
+
+def test_interrupted_scan_keeps_written_results(tmp_path):
+    import zipfile
+    texts = make_corpus(tmp_path)
+    with zipfile.ZipFile(texts / "packed.zip", "w") as archive:
+        archive.writestr("z.txt", TEXT)
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    scanned = []
+    original_scan_text = scanner.scan_text
+
+    def scan_text(text, **kwargs):
+        scanned.append(text)
+        if len(scanned) == 3:
+            raise RuntimeError("сканирование прервано")
+        return original_scan_text(text, **kwargs)
+
+    scanner.scan_text = scan_text
+    batch = BatchScanner(scanner, texts, out, write_behind=1)
+    with pytest.raises(RuntimeError):
+        batch.scan_directory(output_format='jsonl')
+
+    # результаты файлов, просканированных до ошибки, записаны, а архив закрыт
+    assert len(next(out.glob("*_results.jsonl")).read_text(encoding='utf-8').splitlines()) == 2
+    assert not batch.reader._zips
+
+
+def test_results_are_streamed_to_csv_and_jsonl(tmp_path):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    batch = BatchScanner(scanner, texts, out, workers=2)
+    expected = batch.scan_directory(save_results=False)
+
+    assert batch.scan_directory(return_results=False) is None
+    csv = pd.read_csv(next(out.glob("*_results.csv")), encoding='utf-8-sig')
+    assert list(csv.word) == list(expected.word)
+    assert list(csv.source_file) == list(expected.source_file)
+
+    batch.scan_directory(output_format='jsonl', return_results=False)
+    jsonl = pd.read_json(next(out.glob("*_results.jsonl")), lines=True)
+    assert list(jsonl.start_pos) == list(expected.start_pos)
+
+
+def test_results_are_streamed_to_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    batch = BatchScanner(Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False), texts, out)
+
+    expected = batch.scan_directory(output_format='parquet')
+
+    result = pd.read_parquet(next(out.glob("*_results.parquet")))
+    assert list(result.word) == list(expected.word)
+    assert next(out.glob("*_meta.txt")).exists()
+
+
+def test_koi8r_file_is_detected(tmp_path):
+    texts = make_corpus(tmp_path)
+    (texts / "koi8.txt").write_bytes(TEXT.encode('koi8-r'))
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+
+    res = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(save_results=False)
+
+    koi8 = res[res.source_file == "koi8.txt"].drop(columns='source_file').reset_index(drop=True)
+    utf8 = res[res.source_file == "t0.txt"].drop(columns='source_file').reset_index(drop=True)
+    assert len(koi8) and koi8.equals(utf8)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compressed_corpus_matches_plain_files(tmp_path, workers):
+    import gzip, tarfile, zipfile
+
+    texts = make_corpus(tmp_path)
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    expected = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(save_results=False)
+
+    packed = tmp_path / "packed"
+    packed.mkdir()
+    with zipfile.ZipFile(packed / "a.zip", "w") as archive:
+        archive.write(texts / "cp1251.txt", "dir/cp1251.txt")
+        archive.write(texts / "t0.txt", "dir/t0.txt")
+    with tarfile.open(packed / "b.tar.gz", "w:gz") as archive:
+        archive.add(texts / "t1.txt", "t1.txt")
+        archive.add(texts / "t2.txt", "t2.txt")
+    (packed / "t3.txt.gz").write_bytes(gzip.compress((texts / "t3.txt").read_bytes()))
+
+    res = BatchScanner(scanner, packed, tmp_path / "out", workers=workers).scan_directory(save_results=False)
+
+    assert list(res.source_file.unique()) == ["a.zip/dir/cp1251.txt", "a.zip/dir/t0.txt",
+                                              "b.tar.gz/t1.txt", "b.tar.gz/t2.txt", "t3.txt.gz"]
+    names = {"a.zip/dir/cp1251.txt": "cp1251.txt", "a.zip/dir/t0.txt": "t0.txt", 
+             "b.tar.gz/t1.txt": "t1.txt", "b.tar.gz/t2.txt": "t2.txt", "t3.txt.gz": "t3.txt"}
+    res['source_file'] = res.source_file.map(names)
+    assert res.equals(expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipelined_scan_matches_sequential(tmp_path, workers):
+    import zipfile
+
+    texts = make_corpus(tmp_path)
+    with zipfile.ZipFile(texts / "packed.zip", "w") as archive:
+        archive.write(texts / "t2.txt", "t2.txt")
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    expected = BatchScanner(scanner, texts, out).scan_directory(save_results=False)
+
+    batch = BatchScanner(scanner, texts, out, workers=workers, prefetch=2, io_threads=2, write_behind=1)
+    res = batch.scan_directory(levels=['word'])
+
+    assert res.equals(expected)
+    csv = pd.read_csv(next(out.glob("*_results.csv")), encoding='utf-8-sig')
+    assert list(csv.word) == list(expected.word)
+    report = next(out.glob("*_meta.txt")).read_text(encoding='utf-8')
+    assert "ожидание чтения" in report and "сканирование" in report
+
+
+def test_sweep_matches_separate_scans(tmp_path):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    levels = ['word', 'sentence']
+    batch = BatchScanner(Scanner(min_word_size=2, dictionary_name="test_dict.txt", use_cache=False), texts, out)
+
+    summary = batch.sweep(levels=levels, min_word_sizes=[2, 4], min_neighbour_lens=[1, 3],
+                          neighbour_words=[1, 2], with_context=True, config_results=True)
+
+    assert len(summary) == 2 * 2 * 2 * 2 * len(levels)
+    assert len(list(out.glob("*_sweep.csv"))) == 1
+    for (size, filter_by_neighbours, min_neighbour_len, words), rows in summary.groupby(
+            ['min_word_size', 'filter_by_neighbours', 'min_neighbour_len', 'neighbour_words']):
+        scanner = Scanner(min_word_size=size, dictionary_name="test_dict.txt", use_cache=False)
+        expected = BatchScanner(scanner, texts, out).scan_directory(
+            levels=levels, filter_by_neighbours=filter_by_neighbours,
+            min_neighbour_len=min_neighbour_len, neighbour_words=words, save_results=False)
+        counts = expected.level.value_counts()
+        assert rows.candidates.tolist() == [counts.get(level, 0) for level in rows.level]
+
+        name = f"*_m{size}_n{int(filter_by_neighbours)}_mn{min_neighbour_len}_nw{words}_results.csv"
+        res = pd.read_csv(next(out.glob(name)), encoding='utf-8-sig', keep_default_na=False)
+        assert list(res.columns) == list(expected.columns)
+        assert res.word.tolist() == expected.word.tolist()
+        assert res.neighbour.astype(str).tolist() == expected.neighbour.fillna('').astype(str).tolist()
+
+    # значения соседей, недопустимые для фильтрации по соседям, не подменяются молча
+    for min_neighbour_lens, neighbour_words in (([0, 2], [1]), ([1], [3])):
+        with pytest.raises(ValueError):
+            batch.sweep(levels=levels, min_neighbour_lens=min_neighbour_lens, neighbour_words=neighbour_words)
+    with pytest.raises(ValueError):
+        batch.scanner.sweep_streams({}, None, str, levels, neighbour_settings=[(1, 1), (0, 1)])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_stats_are_reported(tmp_path, workers):
+    import json
+
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=2, dictionary_name="test_dict.txt", use_cache=False)
+    res = BatchScanner(scanner, texts, out, workers=workers).scan_directory(
+        levels=['word', 'sentence'], filter_by_neighbours=True, min_neighbour_len=2, stats=True)
+
+    assert scanner.stats is None
+    sidecar = json.loads(next(out.glob("*_stats.json")).read_text(encoding='utf-8'))
+    assert len(sidecar["files"]) == sidecar["files_processed"] == 5
+    assert sidecar["candidates"] == len(res)
+    for level, counters in sidecar["stages"]["levels"].items():
+        assert counters["candidates"] == (res.level == level).sum()
+        assert counters["hits"] == counters["candidates"] + counters["dropped"]
+        assert counters["probes"] >= counters["letters"] > 0
+    assert sidecar["stages"]["levels"]["word"]["dropped"] > 0
+    report = next(out.glob("*_meta.txt")).read_text(encoding='utf-8')
+    assert "ЭТАПЫ СКАНИРОВАНИЯ" in report and "отброшено соседями" in report
+
+
+def test_single_file_is_profiled(tmp_path):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    batch = BatchScanner(Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False), texts, out)
+
+    report = batch.profile_file("t2.txt").read_text(encoding='utf-8')
+
+    assert next(out.glob("*_profile.prof")).stat().st_size > 0
+    assert "tokenize" in report and "tracemalloc" in report
+    with pytest.raises(FileNotFoundError):
+        batch.profile_file("missing.txt")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_duplicate_texts_are_scanned_once(tmp_path, workers):
+    texts = make_corpus(tmp_path)
+    out = tmp_path / "out"
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    expected = BatchScanner(scanner, texts, out).scan_directory(save_results=False)
+
+    # ещё одна копия: текст другой, но нормализуется так же (слово вразрядку склеивается)
+    (texts / "t4.txt").write_text(TEXT.replace('Каждый', 'К а ж д ы й'), encoding='utf-8')
+    scanned = []
+    if workers == 1:
+        original_scan_normalized = scanner.scan_normalized
+        scanner.scan_normalized = lambda text, *args, **kwargs: scanned.append(text) or \
+            original_scan_normalized(text, *args, **kwargs)
+
+    res = BatchScanner(scanner, texts, out, workers=workers).scan_directory(dedupe=True)
+
+    assert list(res.source_file.unique()) == ["cp1251.txt", "t1.txt", "t2.txt", "t3.txt"]
+    pd.testing.assert_frame_equal(res.reset_index(drop=True), 
+                                  expected[expected.source_file != "t0.txt"].reset_index(drop=True))
+    if workers == 1:
+        # копии не сканируются
+        assert len(scanned) == 4
+    report = next(out.glob("*_meta.txt")).read_text(encoding='utf-8')
+    assert "Файлов обработано: 4" in report and "cp1251.txt = t0.txt, t4.txt" in report
+    with pytest.raises(ValueError):
+        BatchScanner(scanner, texts, out).scan_directory(dedupe=True, incremental=True)
+
+
+def test_shards_are_merged_into_one_result(tmp_path):
+    from acrofinder.shards import ShardMerge
+    from acrofinder.sources import DirectorySource, ShardedSource
+
+    texts = make_corpus(tmp_path)
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    expected = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(save_results=False)
+
+    for index in (1, 2):
+        BatchScanner(scanner, texts, tmp_path / f"shard{index}", 
+                     source=ShardedSource(DirectorySource(texts), index, 2)).scan_directory()
+    results_path, report_path = ShardMerge([tmp_path / "shard1", tmp_path / "shard2"]).merge(tmp_path / "merged")
+
+    merged = pd.read_csv(results_path, encoding='utf-8-sig')
+    assert len(merged) == len(expected)
+    assert sorted(merged.source_file) == sorted(expected.source_file)
+    pd.testing.assert_frame_equal(merged.sort_values(['source_file', 'start_pos'], kind='stable').reset_index(drop=True)
+                                  .drop(columns='neighbour'),
+                                  expected.sort_values(['source_file', 'start_pos'], kind='stable').reset_index(drop=True)
+                                  .drop(columns='neighbour'))
+    report = report_path.read_text(encoding='utf-8')
+    assert "Файлов обработано: 5" in report and f"Кандидатов найдено: {len(expected)}" in report
+    assert "1/2" in report and "2/2" in report
+
+    with pytest.raises(ValueError, match="Не хватает шардов"):
+        ShardMerge([tmp_path / "shard1"]).merge(tmp_path / "merged")
+    BatchScanner(scanner, texts, tmp_path / "other", 
+                 source=ShardedSource(DirectorySource(texts), 2, 2)).scan_directory(min_neighbour_len=3)
+    with pytest.raises(ValueError, match="параметры сканирования"):
+        ShardMerge([tmp_path / "shard1", tmp_path / "other"]).merge(tmp_path / "merged")
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.scanner import Scanner
+from acrofinder.batch_scanner import BatchScanner
+from acrofinder.corpus_index import AcrosticIndex
+from acrofinder.sources import DirectorySource, XmlSource
+
+
+TEXT = 'Каждый охотник грозился достать аркебузу. Кот ел. Вот т а к о й Ёжик!\n'
+LEVELS = ['word', 'sentence', 'paragraph']
+
+
+def same_values(left, right):
+    # у пустых таблиц, склеенных pd.concat, числовые столбцы бывают float
+    return left.astype(str).replace(r'\.0$', '', regex=True).equals(
+        right.astype(str).replace(r'\.0$', '', regex=True))
+
+
+def test_suffix_array_orders_suffixes():
+    codes = np.random.default_rng(0).integers(0, 4, 500).astype(np.uint8)
+    expected = sorted(range(len(codes)), key=lambda i: codes[i:].tobytes())
+    assert AcrosticIndex._suffix_array(codes).tolist() == expected
+
+
+def test_query_matches_custom_dictionary_scan(tmp_path):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "a.txt").write_text(TEXT, encoding='utf-8')
+    (texts / "b.txt").write_text('Кто как. Как кто?\n\nАист.\n' + TEXT, encoding='utf-8')
+    (texts / "c.txt").write_text('Ничего тут нет.\n', encoding='utf-8')
+    index = AcrosticIndex.build(tmp_path / "corpus.acroindex", DirectorySource(texts), LEVELS)
+
+    assert index.count("как", "word") == 1
+    assert index.count("кев", "word") == 2
+    assert index.locate("кев", "word") == [("a.txt", 42), ("b.txt", 67)]
+    assert index.locate("как", "paragraph") == [("b.txt", 0)]
+
+    for words in (["как", "кев"], ["кк", "ка", "когда"], ["ёж"]):
+        for kwargs in ({}, {"filter_by_neighbours": True, "min_neighbour_len": 2}, {"neighbour_words": 2}):
+            scanner = Scanner(min_word_size=min(map(len, words)), custom_dict_search=words)
+            expected = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(
+                levels=LEVELS, save_results=False, **kwargs)
+            assert same_values(index.query(words, **kwargs), expected)
+
+
+def test_query_record_corpus_with_metadata(tmp_path):
+    path = tmp_path / "all.xml"
+    path.write_text('<items><item><author>Фет</author><name>Одно</name><text>Кот ел.</text></item>'
+                    f'<item><author>Блок</author><name>Другое</name><text>{TEXT}</text></item></items>',
+                    encoding='utf-8')
+    index = AcrosticIndex.build(tmp_path / "corpus.acroindex", XmlSource(path), ['word'])
+    path.rename(tmp_path / "moved.xml")
+
+    assert len(index.query(["кев"], with_context=False)) == 1
+
+    path = (tmp_path / "moved.xml").rename(path)
+    res = index.query(["кев"])
+    scanner = Scanner(min_word_size=3, custom_dict_search=["кев"])
+    expected = BatchScanner(scanner, path, tmp_path / "out", source=XmlSource(path)).scan_directory(
+        levels=['word'], save_results=False)
+    assert same_values(res, expected)
+    assert res.author.tolist() == ["Блок"] and res.source_file.tolist() == ["all.xml/1"]
+    # без совпадений столбцы те же
+    assert list(index.query(["ёж"]).columns) == list(res.columns)
+
+
+def test_query_reads_only_needed_records(tmp_path):
+    class CountingSource:
+        def __init__(self, source):
+            self.source = source
+            self.read = 0
+
+        def documents(self):
+            for document in self.source.documents():
+                self.read += 1
+                yield document
+
+    path = tmp_path / "all.xml"
+    path.write_text(f'<items><item><text>{TEXT}</text></item>'
+                    + '<item><text>Кот ел.</text></item>' * 3 + '</items>', encoding='utf-8')
+    index = AcrosticIndex.build(tmp_path / "corpus.acroindex", XmlSource(path), ['word'])
+    source = CountingSource(XmlSource(path))
+
+    res = index.query(["кев"], source=source)
+
+    assert res.source_file.tolist() == ["all.xml/0"] and "Ёжик" in res.context[0]
+    # нужная запись -- первая: остальные не читаются
+    assert source.read == 1
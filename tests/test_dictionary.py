@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.scanner import Scanner
+from acrofinder.dictionary import DEFAULT_FOLDING, LetterFolding, NamedDictionary, PackedDictionary
+from acrofinder.dictionary_cache import DictionaryCache
+
+
+WORDS = ['день', 'дань', 'эхо', 'ехо', 'съел', 'сел', 'мел', 'мель', 'кот-ёж']
+
+
+def test_folded_forms_map_back_to_wordforms():
+    packed = PackedDictionary(WORDS, LetterFolding())
+
+    assert list(packed) == ['дан', 'ден', 'ехо', 'мел', 'сел']
+    assert packed.wordforms('сел') == ['сел', 'съел']
+    assert packed.wordforms('эхо') == ['ехо', 'эхо']
+    assert packed.wordforms('дан') == ['дань']
+    assert packed.length_histogram() == {3: 5}
+    # без свёртки отпечаток тот же, что у словаря-множества
+    assert PackedDictionary(WORDS[:-1]).fingerprint() == DictionaryCache.fingerprint(set(WORDS[:-1]))
+
+
+def test_scanner_with_folding_reports_wordforms():
+    text = 'Дом, если нет ь. Эхо хорошо отдаётся. Мы едем лесом.'
+    for matcher in ('trie', 'compact'):
+        scanner = Scanner(min_word_size=3, custom_dict_search=WORDS, folding=DEFAULT_FOLDING,
+                          matcher=matcher)
+        res = scanner.scan_text(text, ['word'])
+        assert res.word.tolist() == ['день', 'ехо|эхо', 'мел|мель']
+        assert res.start_pos.tolist() == [0, 17, 38]
+    # без свёртки в word -- сами буквы
+    assert Scanner(min_word_size=3, custom_dict_search=WORDS).scan_text(text, ['word']).word.tolist() == \
+        ['день', 'эхо', 'мел']
+
+
+def test_folding_that_deletes_letters_is_only_for_first_letters():
+    # последние буквы -- м, а, т, ь: выброшенный из словаря ь остался бы в последовательности
+    text = 'Зам дома кот мель.'
+    folded = Scanner(min_word_size=3, custom_dict_search=['мать'], folding=LetterFolding.parse([]).rules)
+    assert LetterFolding().deletes_letters and not LetterFolding({'ё': 'е'}).deletes_letters
+    with pytest.raises(ValueError):
+        folded.scan_text(text, ['word'], positions=['last'])
+    with pytest.raises(ValueError):
+        folded.scan_text(text, ['word'], positions=['first', '2'])
+    assert folded.scan_text(text, ['word']).empty
+    # замены без выбрасывания букв годятся для любых позиций
+    replaced = Scanner(min_word_size=4, custom_dict_search=['мать'], folding={'ё': 'е'})
+    res = replaced.scan_text(text, ['word'], positions=['last'])
+    assert res[['word', 'n_gram_size', 'position']].values.tolist() == [['мать', 4, 'last']]
+
+
+def test_named_dictionaries_tag_hits_in_one_pass():
+    text = 'Каждый охотник грозился достать аркебузу. Кот ел. Мы едем лесом.'
+    dictionaries = [NamedDictionary('common', file='test_dict.txt', min_word_size=5),
+                    NamedDictionary.parse('watch=кот,мел,когда,ке:3'),
+                    NamedDictionary('names', words=['мел', 'ке'], min_word_size=2)]
+    scanner = Scanner(min_word_size=5, dictionaries=dictionaries)
+
+    res = scanner.scan_text(text, ['word', 'sentence'])
+
+    assert list(res.columns[:4]) == ['start_pos', 'n_gram_size', 'word', 'dictionary']
+    # 'ке' короче минимальной длины словаря watch, но не словаря names
+    assert res[['word', 'dictionary']].values.tolist() == [['когда', 'common|watch'], ['ке', 'names'],
+                                                          ['мел', 'watch|names']]
+    single = Scanner(min_word_size=5, dictionary_name='test_dict.txt', use_cache=False).scan_text(text, ['word', 'sentence'])
+    assert single.word.tolist() == ['когда']
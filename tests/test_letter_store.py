@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.scanner import Scanner
+from acrofinder.batch_scanner import BatchScanner
+from acrofinder.letter_store import LetterStreamStore
+from acrofinder.reader import CorpusReader
+
+
+TEXT = 'Каждый охотник грозился достать аркебузу. Кот ел. Вот т а к о й Ёжик!\n'
+
+
+def test_stored_streams_round_trip(tmp_path):
+    source = tmp_path / "t.txt"
+    source.write_text(TEXT, encoding='utf-8')
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    _, offsets, streams = scanner.prepare_text(TEXT, ['word', 'sentence'])
+    store = LetterStreamStore(tmp_path / "store")
+
+    store.save(source, None, TEXT, len(TEXT), offsets, streams)
+    chars, loaded_offsets, loaded = LetterStreamStore(tmp_path / "store").lookup(source, None, ['word'])
+
+    assert chars == len(TEXT)
+    assert loaded == streams
+    assert loaded_offsets.positions == offsets.positions and loaded_offsets.shifts == offsets.shifts
+    assert store.lookup(source, None, ['paragraph']) is None
+    source.write_text(TEXT + TEXT, encoding='utf-8')
+    assert store.lookup(source, None, ['word']) is None
+
+
+def test_rescan_with_new_dictionary_reads_texts_only_for_hits(tmp_path, monkeypatch):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "hit.txt").write_text(TEXT, encoding='utf-8')
+    (texts / "miss.txt").write_text('Ничего тут нет.\n', encoding='utf-8')
+    store = tmp_path / "store"
+    levels = ['word', 'sentence']
+
+    first = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    expected = BatchScanner(first, texts, tmp_path / "out").scan_directory(levels=levels, save_results=False)
+    stored = BatchScanner(first, texts, tmp_path / "out", 
+                          stream_store=store).scan_directory(levels=levels, save_results=False)
+    assert stored.equals(expected)
+
+    opened = []
+    original_read_text = CorpusReader.read_text
+    monkeypatch.setattr(CorpusReader, "read_text", 
+                        lambda self, document, data=None: opened.append(document.name) or 
+                                                          original_read_text(self, document, data))
+    second = Scanner(min_word_size=3, custom_dict_search=["как", "дак"])
+    for workers in (1, 2):
+        res = BatchScanner(second, texts, tmp_path / "out", workers=workers,
+                           stream_store=store).scan_directory(levels=levels, save_results=False)
+        monkeypatch.setattr(CorpusReader, "read_text", original_read_text)
+        assert res.equals(BatchScanner(second, texts, tmp_path / "out").scan_directory(levels=levels, 
+                                                                                      save_results=False))
+        assert len(res) and set(res.source_file) == {"hit.txt"}
+    assert opened == ["hit.txt"]
+
+
+def test_stored_streams_of_last_and_nth_letters(tmp_path):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "t.txt").write_text(TEXT * 3, encoding='utf-8')
+    # «утл» складывается из последних букв слов, «оло» -- из вторых
+    scanner = Scanner(min_word_size=3, custom_dict_search=["когда", "утл", "оло"])
+    kwargs = dict(levels=['word', 'sentence'], positions=['first', 'last', '2'], save_results=False)
+    expected = BatchScanner(scanner, texts, tmp_path / "out").scan_directory(**kwargs)
+    assert set(expected.position) == {'first', 'last', '2'}
+
+    for workers in (1, 2):
+        res = BatchScanner(scanner, texts, tmp_path / "out", workers=workers,
+                           stream_store=tmp_path / "store").scan_directory(**kwargs)
+        assert res.equals(expected)
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.matcher import CompactTrieMatcher, SortedWords, TrieMatcher, VectorMatcher
+
+
+def test_trie_finds_all_words_from_each_position():
+    """Для каждой позиции отдаются все слова длины >= min_word_size по возрастанию длины."""
+    m = TrieMatcher({'рыб', 'рыба', 'рыбак', 'ыба', 'кот'}, min_word_size=3)
+    assert list(m.find_all('рыбак')) == [(0, 3), (0, 4), (0, 5), (1, 3)]
+
+
+def test_trie_skips_short_words_and_dead_branches():
+    m = TrieMatcher({'он', 'окно'}, min_word_size=3)
+    assert list(m.find_all('оконо')) == []
+    assert list(m.find_all('xокно')) == [(1, 4)]
+
+
+def test_vector_matcher_matches_trie():
+    """NumPy-движок отдаёт те же пары, что и дерево, в том же порядке (в т.ч. для слов 
+    длиннее 10 букв, которые не помещаются в один код)."""
+    words = {'рыб', 'рыба', 'рыбак', 'ыба', 'кот', 'а', 'аб', 'абабабабабаб', 'с-т'}
+    letters = 'рыбакотабабабабабабабст'
+    for min_size in (1, 3):
+        trie = TrieMatcher(words, min_word_size=min_size)
+        vector = VectorMatcher(words, min_word_size=min_size)
+        assert list(vector.find_all(letters)) == list(trie.find_all(letters))
+        assert list(vector.find_all(letters, 2, 9)) == list(trie.find_all(letters, 2, 9))
+    assert vector.contains('абабабабабаб') and not vector.contains('абабабабаба')
+
+
+def test_compact_matcher_matches_trie():
+    """Дерево, построенное из отсортированного словаря, совпадает с деревом из dict."""
+    words = {'рыб', 'рыба', 'рыбак', 'ыба', 'кот', 'а', 'аб', 'абабабабабаб', 'ё', 'яё'}
+    assert SortedWords.from_words(words | {'с-т'}).compile() == TrieMatcher(words, 1).compile()
+    letters = 'рыбакотабабабабабабабст'
+    for min_size in (1, 3):
+        compact = CompactTrieMatcher(words, min_word_size=min_size)
+        assert list(compact.find_all(letters)) == list(TrieMatcher(words, min_size).find_all(letters))
+    assert list(SortedWords.from_words(words)) == sorted(words)
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.matcher import TrieMatcher
+from acrofinder.neighbours import NeighbourIndex
+
+
+WORDS = {'кот', 'ел', 'рыб', 'рыба', 'рыбак', 'он', 'я'}
+
+
+def make_index(first_letters, shortest=1, longest=5):
+    return NeighbourIndex(TrieMatcher(WORDS, min_word_size=1), first_letters, shortest, longest)
+
+
+def test_single_neighbour_prefers_shortest_left():
+    """Слева ищется самое короткое слово, заканчивающееся перед кандидатом, затем справа."""
+    index = make_index('якотрыбакелх')
+    assert index.find(4, 5) == 'кот'
+    assert index.find(1, 3) == 'я'
+    assert make_index('рыбакелх').find(0, 5) == 'ел'
+    # слово справа не может доходить до последней буквы
+    assert make_index('рыбакел').find(0, 5) is None
+
+
+def test_two_neighbours_on_each_side_or_in_a_row():
+    index = make_index('якотрыбакелх')
+    assert index.find(4, 5, words=2) == 'кот ел'
+    assert index.find(4, 3, words=2) == 'я кот'
+    assert make_index('рыбакелонх').find(0, 5, words=2) == 'ел он'
+    assert make_index('рыбакелх').find(0, 5, words=2) is None
+
+
+def test_neighbour_length_bounds():
+    index = make_index('якотрыбакелх', shortest=3)
+    assert index.find(4, 5) == 'кот'
+    assert index.find(1, 3) == 'рыб'
+    assert make_index('ярыбакх', shortest=2).find(1, 5) is None
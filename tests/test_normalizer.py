@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.normalizer import Normalizer, OffsetMap
+from acrofinder.scanner import Scanner
+
+
+def test_normalizer_removes_spaced_and_hyphenated_letters():
+    n = Normalizer()
+    assert n.normalize('вот т а к о й, и т-а-к-о-й текст') == 'вот такой, и такой текст'
+    # пробелы внутри слова, к которому примыкают буквы, не трогаем
+    assert n.normalize('кот и в дом') == 'кот и в дом'
+    assert n.normalize('а б в-г-д') == 'абвгд'
+
+
+def test_offset_map_points_to_original_characters():
+    text = 'Жил т а к о й,  к-о-т. Вот.'
+    offsets = OffsetMap()
+    normalized = Normalizer().normalize(text, offsets)
+    assert normalized == 'Жил такой,  кот. Вот.'
+    for position, char in enumerate(normalized):
+        assert text[offsets.to_original(position)] == char
+
+
+def test_start_pos_refers_to_original_text():
+    text = 'Т а к о й  о т в е т: кот ел, а кот отдыхал.'
+    s = Scanner(custom_dict_search=['кеако'], min_word_size=5)
+    result = s.scan_text(text, ['word'])
+    assert list(result.word) == ['кеако']
+    assert text[result.start_pos[0]] == 'к'
@@ -4,7 +4,7 @@ import pytest
 import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-from acrofinder.scanner import Scanner
+from acrofinder.scanner import RESULT_COLUMNS, Scanner
 
 
 # Проверяем, что тестовый словарь никуда не делся
@@ -21,23 +21,139 @@ def test_scan_text():
     отдаёт pd.DataFrame с правильной структурой и находит акростих 
     'когда' в тестовом предложении (в тестовом словаре должно быть слово когда)."""
 
-    s = Scanner(dictionary_name="test_dict.txt", min_word_sizes=[5])
+    s = Scanner(dictionary_name="test_dict.txt", min_word_size=5, use_cache=False)
     result = s.scan_text(text = 'Каждый охотник грозился достать аркебузу.',
                 levels = ['word'])
     assert isinstance(result, pd.DataFrame)
-    expected_columns = ['id', 'n_gram_size', 'word', 'vicinity', 'context', 'level']
+    expected_columns = ['start_pos', 'n_gram_size', 'word', 'vicinity', 'neighbour', 'context', 'level']
     assert list(result.columns) == expected_columns
     assert 'когда' in result.word.values
 
 
 def test_scan_text_invalid_level_raises():
-    s = Scanner(dictionary_name="test_dict.txt", min_word_sizes=[5])
+    s = Scanner(dictionary_name="test_dict.txt", min_word_size=5, use_cache=False)
     with pytest.raises(ValueError):
         s.scan_text(text="текст", levels=["invalid_level"])
 
 
 def test_scan_text_empty_text_returns_empty_df():
-    s = Scanner(dictionary_name="test_dict.txt", min_word_sizes=[5])
+    s = Scanner(dictionary_name="test_dict.txt", min_word_size=5, use_cache=False)
     result = s.scan_text(text="", levels=["word"])
     assert isinstance(result, pd.DataFrame)
     assert len(result) == 0
+
+
+def test_scan_text_finds_longest_dictionary_word():
+    """Слово максимальной длины в словаре тоже должно находиться."""
+    s = Scanner(min_word_size=3, custom_dict_search=['кот', 'когда'])
+    result = s.scan_text(text='Каждый охотник грозился достать аркебузу.', levels=['word'])
+    assert list(result.word) == ['когда']
+
+
+def test_invalid_matcher_raises():
+    with pytest.raises(ValueError):
+        Scanner(dictionary_name="test_dict.txt", matcher="unknown")
+
+
+def test_numpy_matcher_gives_same_results():
+    text = 'Каждый охотник грозился достать аркебузу. Кот ел.\nОн дал аванс.'
+    trie = Scanner(dictionary_name="test_dict.txt", min_word_size=3, use_cache=False)
+    vector = Scanner(dictionary_name="test_dict.txt", min_word_size=3, matcher='numpy', use_cache=False)
+    for filter_by_neighbours in (False, True):
+        pd.testing.assert_frame_equal(
+            vector.scan_text(text, ['word', 'sentence'], filter_by_neighbours),
+            trie.scan_text(text, ['word', 'sentence'], filter_by_neighbours))
+
+
+def test_scan_text_without_context_skips_columns():
+    s = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    result = s.scan_text(text='Каждый охотник грозился достать аркебузу.',
+                         levels=['word'], with_context=False)
+    assert list(result.columns) == ['start_pos', 'n_gram_size', 'word', 'neighbour', 'level']
+    assert list(result.word) == ['когда']
+    assert list(result.start_pos) == [0]
+
+
+def test_scan_stream_matches_scan_text():
+    """Потоковое сканирование по кускам находит то же, что и сканирование всего текста."""
+    text = ('Каждый охотник грозился достать аркебузу. Кот ел.\n'
+            'т а к о й т-е-к-с-т. Когда? Опять!\n') * 20
+    s = Scanner(min_word_size=3, dictionary_name="test_dict.txt", use_cache=False)
+    levels = ['word', 'sentence', 'paragraph']
+    expected = s.scan_text(text, levels, filter_by_neighbours=True, min_neighbour_len=1)
+
+    for size in (1, 7, 100):
+        chunks = (text[i:i + size] for i in range(0, len(text), size))
+        frames = list(s.scan_stream(chunks, levels, filter_by_neighbours=True, min_neighbour_len=1))
+        result = pd.concat(frames, ignore_index=True)
+        result = result.sort_values('level', key=lambda c: c.map(levels.index), kind='stable')
+        assert len(expected) > 0
+        assert expected.equals(result.reset_index(drop=True))
+
+
+def test_dictionary_cache_is_reused(tmp_path, monkeypatch):
+    """Второй Scanner берёт дерево из кэша рядом со словарём и находит то же самое;
+    изменённый словарь кэш сбрасывает."""
+    dict_path = tmp_path / "dict.txt"
+    dict_path.write_text(DICT_PATH.read_text(encoding='utf-8'), encoding='utf-8')
+    monkeypatch.setattr(Scanner, "_get_dict_path", lambda self, filename: tmp_path / filename)
+
+    text = 'Каждый охотник грозился достать аркебузу. Кот ел.'
+    built = Scanner(dictionary_name="dict.txt", min_word_size=3)
+    assert (tmp_path / "dict.txt.acrocache").exists()
+
+    cached = Scanner(dictionary_name="dict.txt", min_word_size=3)
+    assert cached._dictionary is None
+    assert cached.max_word_length == built.max_word_length
+    assert cached.dictionary_fingerprint == built.dictionary_fingerprint
+    pd.testing.assert_frame_equal(cached.scan_text(text, filter_by_neighbours=True), 
+                                  built.scan_text(text, filter_by_neighbours=True))
+
+    dict_path.write_text("дак\n", encoding='utf-8')
+    rebuilt = Scanner(dictionary_name="dict.txt", min_word_size=3)
+    assert list(rebuilt.scan_text(text).word) == ["дак"]
+
+
+def test_result_cache_gives_same_results(tmp_path):
+    """Повторный текст берётся из кэша результатов (в памяти и на диске) и совпадает 
+    со сканированием без кэша; позиции переводятся в координаты каждого текста."""
+    text = 'Каждый охотник грозился достать аркебузу. Кот ел.\n' * 3
+    spaced = 'К а ж д ы й охотник грозился достать аркебузу. Кот ел.\n' * 3
+    uncached = Scanner(min_word_size=3, dictionary_name="test_dict.txt", use_cache=False)
+    levels = ['word', 'sentence']
+    # по умолчанию кэш результатов выключен
+    assert not uncached.cache_results.enabled
+
+    first = Scanner(min_word_size=3, dictionary_name="test_dict.txt", result_cache_size=8, 
+                    result_cache_dir=tmp_path, use_cache=False)
+    expected = uncached.scan_text(text, levels, filter_by_neighbours=True, min_neighbour_len=1)
+    assert len(expected) > 0
+    for _ in range(2):
+        pd.testing.assert_frame_equal(first.scan_text(text, levels, filter_by_neighbours=True, 
+                                                      min_neighbour_len=1), expected)
+    assert len(first.cache_results) == 1 and len(list(tmp_path.glob("*.csv"))) == 1
+
+    second = Scanner(min_word_size=3, dictionary_name="test_dict.txt", result_cache_dir=tmp_path, use_cache=False)
+    pd.testing.assert_frame_equal(second.scan_text(text, levels, filter_by_neighbours=True, 
+                                                   min_neighbour_len=1), expected)
+    pd.testing.assert_frame_equal(second.scan_text(spaced, levels, filter_by_neighbours=True, 
+                                                   min_neighbour_len=1),
+                                  uncached.scan_text(spaced, levels, filter_by_neighbours=True, 
+                                                     min_neighbour_len=1))
+    assert len(list(tmp_path.glob("*.csv"))) == 1
+
+
+def test_telestich_is_found_with_acrostics():
+    """Последние буквы строк складываются в 'когда'; первые и последние буквы ищутся 
+    за один проход, а столбец position показывает, откуда кандидат."""
+    text = 'Стук\nОкно\nСнег\nСлед\nВода\n'
+    s = Scanner(dictionary_name="test_dict.txt", min_word_size=5, use_cache=False)
+
+    result = s.scan_text(text, ['paragraph'], positions=['first', 'last'])
+
+    assert list(result.columns) == RESULT_COLUMNS + ['position']
+    assert result[['start_pos', 'word', 'level', 'position']].values.tolist() == [[0, 'когда', 'paragraph', 'last']]
+    assert result.context[0].startswith('Стук\nОкно')
+    assert 'position' not in s.scan_text(text, ['paragraph']).columns
+    with pytest.raises(ValueError):
+        s.scan_text(text, ['paragraph'], positions=['middle'])
@@ -0,0 +1,105 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.scanner import Scanner
+from acrofinder.batch_scanner import BatchScanner
+from acrofinder.sources import CsvSource, DirectorySource, JsonlSource, ShardedSource, XmlSource
+
+
+TEXT = 'Каждый охотник грозился достать аркебузу. Кот ел.\n'
+
+XML = """<?xml version="1.0" encoding="utf-8"?>
+<items>
+  <item><author>Пушкин</author><name>Первое</name><text>{text}</text></item>
+  <item><author>Лермонтов</author><name>Второе</name><text>Кот ел.</text></item>
+  <item><author>Фет</author><name>Третье</name><text>{text}{text}</text></item>
+</items>
+"""
+
+
+def test_xml_records_become_documents_with_metadata(tmp_path):
+    path = tmp_path / "all.xml"
+    path.write_text(XML.format(text=TEXT), encoding='utf-8')
+
+    documents = list(XmlSource(path).documents())
+
+    assert [d.name for d in documents] == ["all.xml/0", "all.xml/1", "all.xml/2"]
+    assert documents[0].text == TEXT
+    assert documents[2].metadata == {"author": "Фет", "title": "Третье"}
+
+
+def test_jsonl_bad_lines_are_reported_as_failed_documents(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text(json.dumps({"id": "a", "text": TEXT, "author": "X"}, ensure_ascii=False) + "\n"
+                    + "{broken\n"
+                    + json.dumps({"id": "c", "author": "Y"}) + "\n", encoding='utf-8')
+
+    documents = list(JsonlSource(path, metadata=["author"], id_field="id").documents())
+
+    assert [d.name for d in documents] == ["corpus.jsonl/a", "corpus.jsonl/1", "corpus.jsonl/c"]
+    assert documents[0].error is None and documents[0].metadata == {"author": "X"}
+    assert documents[1].error.startswith("JSONDecodeError")
+    assert documents[2].error.startswith("KeyError")
+
+
+def test_batch_scan_of_single_file_corpus_adds_metadata_columns(tmp_path):
+    import csv
+
+    path = tmp_path / "corpus.csv"
+    with open(path, "w", encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["author_id", "text_name", "body"])
+        writer.writerow(["a1", "t1", TEXT])
+        writer.writerow(["a2", "t2", TEXT * 2])
+    scanner = Scanner(min_word_size=5, dictionary_name="test_dict.txt", use_cache=False)
+    source = CsvSource(path, text_field="body", metadata=["author_id", "text_name"], id_field="text_name")
+
+    for workers in (1, 2):
+        res = BatchScanner(scanner, output_dir=tmp_path / "out", workers=workers,
+                           source=source).scan_directory(save_results=False)
+        assert list(res.columns[-3:]) == ["source_file", "author_id", "text_name"]
+        assert list(res.source_file.unique()) == ["corpus.csv/t1", "corpus.csv/t2"]
+        assert set(res[res.source_file == "corpus.csv/t2"].author_id) == {"a2"}
+
+
+def test_shards_split_corpus_by_path_hash(tmp_path):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    for i in range(30):
+        (texts / f"t{i:02}.txt").write_text(TEXT * (i % 7 + 1), encoding='utf-8')
+    source = DirectorySource(texts)
+
+    shards = [ShardedSource(source, index, 3).documents() for index in (1, 2, 3)]
+
+    names = [d.name for shard in shards for d in shard]
+    assert sorted(names) == [d.name for d in source.documents()]
+    assert all(isinstance(shard, list) and shard for shard in shards)
+    for shard in shards:
+        assert [d.name for d in shard] == sorted(d.name for d in shard)
+    assert [d.name for d in ShardedSource(source, 2, 3).documents()] == [d.name for d in shards[1]]
+
+    # новые и удалённые файлы не переносят остальные документы в другие шарды
+    (texts / "new.txt").write_text(TEXT, encoding='utf-8')
+    (texts / "t00.txt").unlink()
+    for index, shard in enumerate(shards, 1):
+        assert {d.name for d in shard} - {"t00.txt"} <= \
+            {d.name for d in ShardedSource(DirectorySource(texts), index, 3).documents()}
+    assert ShardedSource.parse("2/3") == (2, 3)
+    for spec in ("0/3", "4/3", "2", "a/b"):
+        with pytest.raises(ValueError):
+            ShardedSource.parse(spec)
+
+
+def test_shards_of_record_corpus_split_by_hash(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text("".join(json.dumps({"id": i, "text": TEXT}) + "\n" for i in range(20)), encoding='utf-8')
+    source = JsonlSource(path, id_field="id")
+
+    shards = [list(ShardedSource(source, index, 2).documents()) for index in (1, 2)]
+
+    assert sorted(d.name for shard in shards for d in shard) == sorted(d.name for d in source.documents())
+    assert all(shards)
@@ -0,0 +1,50 @@
+import sys
+from array import array
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from acrofinder.tokenizer import Tokenizer, TokenizerState, stream_name
+
+
+TEXT = "Кот спит. Пёс\nлает! — Ёж 5да"
+
+
+def test_tokenize_all_levels_in_one_pass():
+    streams = Tokenizer().tokenize(TEXT, ['word', 'sentence', 'paragraph'])
+
+    # «5да» -- не начало слова: перед «д» стоит цифра
+    assert streams['word'] == ('ксплё', array('q', [0, 4, 10, 14, 22]))
+    assert streams['sentence'] == ('кплё', array('q', [0, 9, 14, 19]))
+    assert streams['paragraph'] == ('кл', array('q', [0, 14]))
+
+
+def test_tokenize_only_requested_levels():
+    streams = Tokenizer().tokenize(TEXT, ['sentence'])
+    assert list(streams) == ['sentence']
+
+
+def test_first_letter_after_newline_keeps_its_position():
+    streams = Tokenizer().tokenize("\n  Да", ['word', 'paragraph'])
+    assert streams['word'] == ('д', array('q', [3]))
+    assert streams['paragraph'] == ('д', array('q', [1]))
+
+
+def test_last_and_nth_letters_in_the_same_pass():
+    streams = Tokenizer().tokenize(TEXT, ['word', 'word:last', stream_name('word', 2), 
+                                          'sentence:last', 'paragraph:3'])
+
+    assert streams['word'] == ('ксплё', array('q', [0, 4, 10, 14, 22]))
+    assert streams['word:last'] == ('ттстж', array('q', [0, 4, 10, 14, 22]))
+    assert streams['word:2'] == ('опёаж', array('q', [0, 4, 10, 14, 22]))
+    # последняя буква предложения -- перед началом следующего, «5да» в него входит
+    assert streams['sentence:last'] == ('тста', array('q', [0, 9, 14, 19]))
+    assert streams['paragraph:3'] == ('те', array('q', [0, 14]))
+    # в слове «ёж» нет третьей буквы
+    assert Tokenizer().tokenize(TEXT, ['word:3'])['word:3'] == ('тисе', array('q', [0, 4, 10, 14]))
+
+
+def test_last_letters_are_not_extracted_in_chunks():
+    with pytest.raises(ValueError):
+        Tokenizer().tokenize(TEXT, ['word:last'], TokenizerState())